@@ -35,6 +35,11 @@ def run_migrations_online():
         poolclass=pool.NullPool,
     )
     with connectable.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # Only sticks on a brand-new file; lets retention use incremental_vacuum
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            # End the autobegun transaction, else Alembic defers the commit to us
+            connection.commit()
         context.configure(connection=connection, target_metadata=target_metadata)
         with context.begin_transaction():
             context.run_migrations()
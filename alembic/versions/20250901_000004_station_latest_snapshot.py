@@ -0,0 +1,43 @@
+"""add latest-snapshot pointer to stations
+
+Revision ID: 000004_station_latest_snapshot
+Revises: 000003_inventory_categories
+Create Date: 2025-09-01 00:00:04
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "000004_station_latest_snapshot"
+down_revision = "000003_inventory_categories"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("stations") as batch:
+        batch.add_column(sa.Column("last_snapshot_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("last_snapshot_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_stations_last_snapshot_at", "stations", ["last_snapshot_at"])
+
+    # Backfill from existing snapshots (newest generated_at per station)
+    op.execute("""
+        UPDATE stations SET
+          last_snapshot_at = (
+            SELECT MAX(generated_at) FROM snapshots WHERE snapshots.station_id = stations.id
+          )
+    """)
+    op.execute("""
+        UPDATE stations SET
+          last_snapshot_id = (
+            SELECT id FROM snapshots
+            WHERE snapshots.station_id = stations.id
+              AND snapshots.generated_at = stations.last_snapshot_at
+          )
+        WHERE last_snapshot_at IS NOT NULL
+    """)
+
+def downgrade():
+    op.drop_index("ix_stations_last_snapshot_at", table_name="stations")
+    with op.batch_alter_table("stations") as batch:
+        batch.drop_column("last_snapshot_at")
+        batch.drop_column("last_snapshot_id")
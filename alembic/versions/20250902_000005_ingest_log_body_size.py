@@ -0,0 +1,26 @@
+"""record ingest body encoding and sizes
+
+Revision ID: 000005_ingest_log_body_size
+Revises: 000004_station_latest_snapshot
+Create Date: 2025-09-02 00:00:05
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "000005_ingest_log_body_size"
+down_revision = "000004_station_latest_snapshot"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("ingest_log") as batch:
+        batch.add_column(sa.Column("encoding", sa.String(length=32), nullable=True))
+        batch.add_column(sa.Column("bytes_wire", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("bytes_raw", sa.Integer(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("ingest_log") as batch:
+        batch.drop_column("bytes_raw")
+        batch.drop_column("bytes_wire")
+        batch.drop_column("encoding")
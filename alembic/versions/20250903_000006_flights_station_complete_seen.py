@@ -0,0 +1,24 @@
+"""index flights for per-station keyset pagination
+
+Revision ID: 000006_flights_station_seen
+Revises: 000005_ingest_log_body_size
+Create Date: 2025-09-03 00:00:06
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000006_flights_station_seen"
+down_revision = "000005_ingest_log_body_size"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Pages of /api/stations/<name>/flights become an index range scan
+    # (rowid = id breaks ties on last_seen_at)
+    op.create_index(
+        "ix_flights_station_complete_seen", "flights",
+        ["station_id", "complete", "last_seen_at"], if_not_exists=True,
+    )
+
+def downgrade():
+    op.drop_index("ix_flights_station_complete_seen", table_name="flights", if_exists=True)
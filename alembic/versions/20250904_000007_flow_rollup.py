@@ -0,0 +1,56 @@
+"""per-station 5-minute route rollup for flow history
+
+Revision ID: 000007_flow_rollup
+Revises: 000006_flights_station_seen
+Create Date: 2025-09-04 00:00:07
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "000007_flow_rollup"
+down_revision = "000006_flights_station_seen"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "flow_rollup",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("bucket", sa.Integer(), nullable=False),
+        sa.Column("station_id", sa.Integer(), sa.ForeignKey("stations.id"), nullable=False),
+        sa.Column("origin", sa.String(length=8), nullable=False),
+        sa.Column("dest", sa.String(length=8), nullable=False),
+        sa.Column("direction", sa.String(length=10), nullable=False),
+        sa.Column("legs", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("weight_lbs", sa.Float(), nullable=False, server_default="0"),
+        sa.UniqueConstraint("station_id", "bucket", "origin", "dest", "direction",
+                            name="uq_rollup_station_bucket_route"),
+    )
+    op.create_index("ix_flow_rollup_bucket", "flow_rollup", ["bucket"])
+
+    # Backfill from the snapshots still on disk: newest per station per
+    # 300-second bucket (netops.rollup.BUCKET_SECONDS); a snapshot without
+    # flows becomes the empty ('', '', '') route, as in rollup.refresh
+    op.execute("""
+        INSERT INTO flow_rollup (bucket, station_id, origin, dest, direction, legs, weight_lbs)
+        SELECT r.bucket, r.station_id,
+               COALESCE(f.origin, ''), COALESCE(f.dest, ''), COALESCE(f.direction, ''),
+               COALESCE(SUM(f.legs), 0), COALESCE(SUM(f.weight_lbs), 0)
+        FROM (
+          SELECT id, station_id,
+                 CAST(strftime('%s', generated_at) AS INTEGER) / 300 * 300 AS bucket,
+                 ROW_NUMBER() OVER (
+                   PARTITION BY station_id, CAST(strftime('%s', generated_at) AS INTEGER) / 300
+                   ORDER BY generated_at DESC
+                 ) AS rn
+          FROM snapshots
+        ) r
+        LEFT JOIN flows f ON f.snapshot_id = r.id
+        WHERE r.rn = 1
+        GROUP BY r.bucket, r.station_id, f.origin, f.dest, f.direction
+    """)
+
+def downgrade():
+    op.drop_index("ix_flow_rollup_bucket", table_name="flow_rollup")
+    op.drop_table("flow_rollup")
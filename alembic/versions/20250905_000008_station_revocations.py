@@ -0,0 +1,25 @@
+"""log of CLI token revocations, polled by running servers
+
+Revision ID: 000008_station_revocations
+Revises: 000007_flow_rollup
+Create Date: 2025-09-05 00:00:08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "000008_station_revocations"
+down_revision = "000007_flow_rollup"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "station_revocations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("station_id", sa.Integer(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("station_revocations")
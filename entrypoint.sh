@@ -69,7 +69,18 @@ MARKERS = {
   "000002_inventory": {"stations","inventory_items"},
   "000003_inventory_categories": {"stations","inventory_items","inventory_categories"},
 }
-rank = {rev:i for i,rev in enumerate(MARKERS)}
+# Full revision order (column-only revisions have no table marker but must still rank)
+REVISIONS = [
+  "000001_init",
+  "000002_inventory",
+  "000003_inventory_categories",
+  "000004_station_latest_snapshot",
+  "000005_ingest_log_body_size",
+  "000006_flights_station_seen",
+  "000007_flow_rollup",
+  "000008_station_revocations",
+]
+rank = {rev:i for i,rev in enumerate(REVISIONS)}
 
 def detected_baseline(tables:set[str]):
     best = "base"; best_rank = -1
@@ -1,4 +1,4 @@
 """
 NetOpsTool package.
-Run via Waitress: `waitress-serve --port=5250 netops.app:app`
+Run via Waitress: `python -m netops.serve` (WEB_WORKERS processes; see README)
 """
@@ -3,8 +3,10 @@ from __future__ import annotations
 from datetime import datetime
 from flask import Flask
 from flask_cors import CORS
+from . import metrics, profiling, shared
 from .config import config
-from .db import init_db
+from .db import init_db, remove_sessions
+from .retention import start_background as start_retention
 from .routes.api import api
 from .routes.pages import pages
 
@@ -13,11 +15,26 @@ app.config.update(SECRET_KEY=config.SECRET_KEY, ENV=config.ENV, DEBUG=config.DEB
 
 # Init DB (bootstrap for first run)
 init_db()
+# Request-scoped sessions: drop each thread's sessions when the request ends
+app.teardown_appcontext(remove_sessions)
+
+# Background retention (RETENTION_INTERVAL_MINUTES=0 disables; see `netops.cli prune`);
+# with several workers only the first one runs it
+if config.WORKER_INDEX == 0:
+    start_retention()
 
 # Rate limiter: use the limiter object defined in the api module and bind it here
 from .routes import api as api_mod  # noqa: E402
+if shared.enabled():
+    # Multi-worker: count against the shared state file (shared.SQLiteLimitStorage)
+    app.config["RATELIMIT_STORAGE_URI"] = "netops+sqlite://"
 api_mod.limiter.init_app(app)
 
+# Prometheus metrics (METRICS_ENABLED=0 disables)
+metrics.init_app(app)
+# Admin-requested / sampled request profiling (see /api/admin/profiles)
+profiling.init_app(app)
+
 # CORS (optional)
 if config.ENABLE_CORS:
     CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -1,12 +1,19 @@
 # netops/auth.py
 from __future__ import annotations
 import jwt
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from flask import request, abort
-from typing import Optional, Tuple
+from sqlalchemy import func, select
+from typing import Dict, Optional, Tuple
+from . import metrics
 from .config import config
+from .db import ReadSession
+from .models import Station, StationRevocation
 
 _ph = PasswordHasher()
 
@@ -35,12 +42,153 @@ def _bearer_token() -> Optional[str]:
         return None
     return auth.split(" ", 1)[1].strip()
 
-def require_bearer() -> Tuple[int, dict]:
+class TokenCache:
+    """Bounded LRU of verified bearer tokens, plus each station's name and salt.
+
+    A token hit skips jwt.decode; a station hit skips the Station load.
+    Station entries are re-read after AUTH_CACHE_TTL seconds. The CLI runs in
+    another process, so it records salt rotations and deletes in
+    station_revocations; poll_revocations() drops those stations' entries, so
+    old tokens stop working within AUTH_REVOKE_POLL seconds.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # token -> (station_id, claims)
+        self._tokens: "OrderedDict[str, Tuple[int, dict]]" = OrderedDict()
+        # station_id -> (name, salt, loaded_at)
+        self._stations: Dict[int, Tuple[str, str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revoked = 0
+        self._revocation_seen: Optional[int] = None  # newest station_revocations id handled
+        self._polled_at = float("-inf")
+
+    def get(self, token: str) -> Optional[Tuple[int, dict]]:
+        with self._lock:
+            e = self._tokens.get(token)
+            if e is not None and e[1].get("exp", 0) <= time.time():
+                del self._tokens[token]
+                e = None
+            if e is None:
+                self.misses += 1
+                return None
+            self._tokens.move_to_end(token)
+            self.hits += 1
+            return e
+
+    def put(self, token: str, station_id: int, claims: dict) -> None:
+        with self._lock:
+            self._tokens[token] = (station_id, claims)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    def revoke(self, token: str) -> None:
+        with self._lock:
+            self._tokens.pop(token, None)
+            self.revoked += 1
+
+    def station(self, station_id: int) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            e = self._stations.get(station_id)
+            if e is None or time.monotonic() - e[2] > self.ttl:
+                return None
+            return e[0], e[1]
+
+    def put_station(self, station_id: int, name: str, salt: str) -> None:
+        with self._lock:
+            self._stations[station_id] = (name, salt, time.monotonic())
+
+    def invalidate_station(self, station_id: int) -> None:
+        with self._lock:
+            self._stations.pop(station_id, None)
+            for token in [t for t, e in self._tokens.items() if e[0] == station_id]:
+                del self._tokens[token]
+
+    def poll_due(self, interval: float) -> bool:
+        # Claims the poll for one thread at a time
+        with self._lock:
+            now = time.monotonic()
+            if now - self._polled_at < interval:
+                return False
+            self._polled_at = now
+            return True
+
+    def poll_revocations(self) -> None:
+        """Drop the stations the CLI re-keyed or deleted since the last poll."""
+        if not self.poll_due(config.AUTH_REVOKE_POLL):
+            return
+        with ReadSession() as s:
+            if self._revocation_seen is None:
+                # First poll: anything cached so far may predate a revocation
+                self._revocation_seen = s.execute(select(func.max(StationRevocation.id))).scalar() or 0
+                with self._lock:
+                    self._stations.clear()
+                return
+            rows = s.execute(
+                select(StationRevocation.id, StationRevocation.station_id)
+                .where(StationRevocation.id > self._revocation_seen)
+                .order_by(StationRevocation.id)
+            ).all()
+        for row in rows:
+            self.invalidate_station(row.station_id)
+        if rows:
+            self._revocation_seen = rows[-1].id
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "revoked": self.revoked,
+                    "tokens": len(self._tokens), "stations": len(self._stations)}
+
+token_cache = TokenCache(config.AUTH_CACHE_MAX, config.AUTH_CACHE_TTL)
+
+metrics.Callback("netops_auth_cache_total", "Bearer token cache lookups by result.", "counter", ("result",),
+                 lambda: {(k,): v for k, v in token_cache.stats().items() if k in ("hits", "misses", "revoked")})
+
+def _station(station_id: int, fresh: bool = False) -> Optional[Tuple[str, str]]:
+    # -> (name, token_salt), or None if the station is gone; fresh skips the cache
+    hit = None if fresh else token_cache.station(station_id)
+    if hit is not None:
+        return hit
+    with ReadSession() as s:
+        row = s.execute(select(Station.name, Station.token_salt).where(Station.id == station_id)).first()
+    if row is None:
+        return None
+    token_cache.put_station(station_id, row.name, row.token_salt or "")
+    return row.name, row.token_salt or ""
+
+def require_station() -> Tuple[int, str, dict]:
+    """Authenticate the bearer token -> (station_id, station name, claims).
+
+    Tokens issued before the station's salt was rotated are rejected.
+    """
     token = _bearer_token()
     if not token:
         abort(401, description="Missing bearer token")
-    try:
-        payload = jwt.decode(token, config.NETOPS_JWT_SECRET, algorithms=["HS256"])
-    except jwt.PyJWTError:
-        abort(401, description="Invalid token")
-    return int(payload["sub"]), payload
+    hit = token_cache.get(token)
+    if hit is None:
+        try:
+            claims = jwt.decode(token, config.NETOPS_JWT_SECRET, algorithms=["HS256"])
+        except jwt.PyJWTError:
+            abort(401, description="Invalid token")
+        hit = (int(claims["sub"]), claims)
+        token_cache.put(token, *hit)
+    station_id, claims = hit
+    token_cache.poll_revocations()
+    salt = claims.get("salt", "")
+    st = _station(station_id)
+    if st is not None and st[1] != salt:
+        # The cached salt may be the stale one (a token from a login after a
+        # reset); only the database can say which side is out of date
+        st = _station(station_id, fresh=True)
+    if st is None or st[1] != salt:
+        token_cache.revoke(token)
+        abort(401, description="Token revoked")
+    return station_id, st[0], claims
+
+def require_bearer() -> Tuple[int, dict]:
+    station_id, _name, claims = require_station()
+    return station_id, claims
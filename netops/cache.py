@@ -0,0 +1,147 @@
+# netops/cache.py
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+from flask import Response, request
+from . import shared
+from .config import config
+from .streaming import wants_ndjson
+
+# Per-table generation counters. Write paths bump them after commit; cached
+# responses stamped with an older generation are treated as misses. With
+# multiple workers (SHARED_STATE_PATH) the counters live in the shared state
+# file, so a write in one worker invalidates every worker's cache.
+_gen_lock = threading.Lock()
+_generations: Dict[str, int] = {}
+
+def generation(*tables: str) -> Tuple[int, ...]:
+    if shared.enabled():
+        return shared.generation(*tables)
+    with _gen_lock:
+        return tuple(_generations.get(t, 0) for t in tables)
+
+def bump(*tables: str) -> None:
+    if shared.enabled():
+        return shared.bump(*tables)
+    with _gen_lock:
+        for t in tables:
+            _generations[t] = _generations.get(t, 0) + 1
+
+class ResponseCache:
+    """Bounded in-process cache of serialized GET responses."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (generation, stored_at, etag, body, mimetype)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key: tuple, gen: Tuple[int, ...]) -> Optional[tuple]:
+        with self._lock:
+            e = self._entries.get(key)
+            if not e:
+                return None
+            if e[0] != gen or (self.ttl and time.monotonic() - e[1] > self.ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return e
+
+    def put(self, key: tuple, gen: Tuple[int, ...], etag: str, body: bytes, mimetype: str) -> None:
+        with self._lock:
+            self._entries[key] = (gen, time.monotonic(), etag, body, mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_MAX, config.RESPONSE_CACHE_TTL)
+
+def _default_key() -> tuple:
+    return tuple(sorted(request.args.items(multi=True)))
+
+def _etag_for(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+def _respond(etag: str, body: bytes, mimetype: str) -> Response:
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Vary"] = "Accept"
+    # Let browsers keep the body but always revalidate (cheap 304 on hit)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+def _tee(resp: Response, ck: tuple, gen: Tuple[int, ...]) -> Response:
+    """Send a streamed body as it is produced, caching it on the way out.
+
+    A miss has no ETag (that needs the whole body); the body is kept only up
+    to RESPONSE_CACHE_MAX_BODY bytes, so a huge list streams with flat memory
+    and simply isn't cached. Requests after a cached one get the ETag/304.
+    """
+    src, limit, mimetype = resp.response, config.RESPONSE_CACHE_MAX_BODY, resp.mimetype
+
+    def body():
+        h, parts, size = hashlib.sha1(), [], 0
+        try:
+            for chunk in src:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                if parts is not None:
+                    size += len(chunk)
+                    if size > limit:
+                        parts = None
+                    else:
+                        h.update(chunk)
+                        parts.append(chunk)
+                yield chunk
+            # Only reached when the whole body went out
+            if parts is not None:
+                response_cache.put(ck, gen, h.hexdigest(), b"".join(parts), mimetype)
+        finally:
+            if hasattr(src, "close"):
+                src.close()
+
+    resp.response = body()
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+def cached_json(*tables: str, key: Optional[Callable[[], tuple]] = None):
+    """Cache a JSON GET view, invalidated when any of `tables` is bumped.
+
+    The generation is read *before* the view runs, so a write that commits
+    mid-query only makes the stored entry look older than it is.
+    """
+    keyfn = key or _default_key
+
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Accept picks JSON vs NDJSON (see streaming.stream_rows)
+            ck = (request.endpoint, tuple(sorted(kwargs.items())), keyfn(), wants_ndjson())
+            gen = generation(*tables)
+            hit = response_cache.get(ck, gen)
+            if hit:
+                return _respond(hit[2], hit[3], hit[4])
+            resp = fn(*args, **kwargs)
+            if not isinstance(resp, Response) or resp.status_code != 200:
+                return resp
+            if resp.is_streamed:
+                return _tee(resp, ck, gen)
+            body = resp.get_data()
+            resp.close()
+            etag = _etag_for(body)
+            response_cache.put(ck, gen, etag, body, resp.mimetype)
+            return _respond(etag, body, resp.mimetype)
+        return wrapper
+    return deco
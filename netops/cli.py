@@ -3,7 +3,7 @@ from __future__ import annotations
 import argparse
 import secrets
 from .db import SessionLocal, init_db
-from .models import Station
+from .models import Station, StationRevocation
 from .auth import hash_password
 
 def add_station(name: str, password: str):
@@ -14,6 +14,7 @@ def add_station(name: str, password: str):
             # UPSERT: update password & rotate token salt (invalidates old JWTs)
             st.password_hash = hash_password(password)
             st.token_salt = secrets.token_hex(8)
+            s.add(StationRevocation(station_id=st.id))  # running servers drop the old salt
             s.commit()
             print(f"Updated station: {name}")
             return
@@ -34,6 +35,7 @@ def reset_station_password(name: str, password: str):
             raise SystemExit(f"Station '{name}' not found.")
         st.password_hash = hash_password(password)
         st.token_salt = secrets.token_hex(8)  # invalidate existing tokens
+        s.add(StationRevocation(station_id=st.id))
         s.commit()
         print(f"Password reset for station: {name}")
 
@@ -45,9 +47,23 @@ def delete_station(name: str):
             raise SystemExit(f"Station '{name}' not found.")
         # Rely on ORM cascade; if not configured, this will raise on commit.
         s.delete(st)
+        s.add(StationRevocation(station_id=st.id))
         s.commit()
         print(f"Deleted station: {name}")
 
+def prune(vacuum: bool):
+    from .retention import prune as run_prune
+    res = run_prune(vacuum=vacuum)
+    print(
+        f"Pruned snapshots: {res['hourly']} hourly, {res['daily']} daily, {res['expired']} expired; "
+        f"ingest_log: {res['ingest_log']}; flow_rollup: {res['rollup']}"
+    )
+    if vacuum:
+        if res["vacuum_pages"] is None:
+            print("Incremental vacuum unavailable (database not created with auto_vacuum=INCREMENTAL).")
+        else:
+            print(f"Incremental vacuum: released {res['vacuum_pages']} pages")
+
 def main():
     parser = argparse.ArgumentParser(prog="netops")
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -61,6 +77,8 @@ def main():
     for verb in ("delete-station", "del-station", "rm-station"):
         d = sub.add_parser(verb, help="Delete a station (and cascade its data)")
         d.add_argument("name")
+    p = sub.add_parser("prune", help="Apply the snapshot/ingest_log retention policy now")
+    p.add_argument("--vacuum", action="store_true", help="Run an incremental vacuum afterwards")
     args = parser.parse_args()
 
     init_db()
@@ -71,6 +89,8 @@ def main():
         reset_station_password(args.name, args.password)
     elif args.cmd in ("delete-station", "del-station", "rm-station"):
         delete_station(args.name)
+    elif args.cmd == "prune":
+        prune(args.vacuum)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,175 @@
+# netops/codec.py
+from __future__ import annotations
+import io
+import json
+import re
+import zlib
+from typing import Any, Iterator, Optional, Tuple
+import msgpack
+from flask import abort, request
+from . import metrics
+from .config import config
+
+try:  # optional: Content-Encoding: zstd
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:  # optional: faster JSON decoding
+    import orjson
+except ImportError:
+    orjson = None
+
+_CODEC_ERRORS = (zlib.error, zstandard.ZstdError) if zstandard else (zlib.error,)
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+_WS = re.compile(r"[ \t\n\r]*")
+
+def json_loads(data):
+    # orjson when installed; anything it rejects (NaN, huge ints, ...) is
+    # retried with the stdlib so accepted input and errors match json.loads
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+def _too_large():
+    abort(413, description=f"Body exceeds {config.INGEST_MAX_BYTES} bytes after decoding")
+
+def _inflate(data: bytes, wbits: int, limit: int) -> bytes:
+    # max_length bounds the output, so a small bomb can't allocate its full size
+    out = []
+    size = 0
+    while data:
+        d = zlib.decompressobj(wbits)
+        chunk = d.decompress(data, limit - size + 1)
+        size += len(chunk)
+        if size > limit:
+            _too_large()
+        if not d.eof:
+            abort(400, description="Truncated compressed body")
+        out.append(chunk)
+        data = d.unused_data  # concatenated gzip members
+    return b"".join(out)
+
+def _unzstd(data: bytes, limit: int) -> bytes:
+    if zstandard is None:
+        abort(415, description="zstd not supported by this server")
+    d = zstandard.ZstdDecompressor().decompressobj()
+    out = []
+    size = 0
+    # Small input steps keep the output of any one step bounded
+    for i in range(0, len(data), 256):
+        chunk = d.decompress(data[i:i + 256])
+        size += len(chunk)
+        if size > limit:
+            _too_large()
+        out.append(chunk)
+    if not d.eof:
+        abort(400, description="Truncated compressed body")
+    return b"".join(out)
+
+def read_body() -> Tuple[bytes, dict]:
+    """Read the request body, undoing Content-Encoding, capped at INGEST_MAX_BYTES.
+
+    -> (decoded bytes, {"encoding", "bytes_wire", "bytes_raw"}) for the ingest log.
+    """
+    limit = config.INGEST_MAX_BYTES
+    if request.content_length is not None and request.content_length > limit:
+        _too_large()
+    wire = request.stream.read(limit + 1)
+    if len(wire) > limit:
+        _too_large()
+    enc = (request.headers.get("Content-Encoding") or "identity").strip().lower()
+    try:
+        if enc in ("identity", ""):
+            raw = wire
+        elif enc in ("gzip", "x-gzip"):
+            raw = _inflate(wire, 16 + zlib.MAX_WBITS, limit)
+        elif enc == "deflate":
+            raw = _inflate(wire, zlib.MAX_WBITS, limit)
+        elif enc == "zstd":
+            raw = _unzstd(wire, limit)
+        else:
+            abort(415, description=f"Unsupported Content-Encoding: {enc}")
+    except _CODEC_ERRORS:
+        abort(400, description="Invalid compressed body")
+    fmt = "msgpack" if request.mimetype in MSGPACK_TYPES else "json"
+    stats = {
+        "encoding": fmt if enc in ("identity", "") else f"{fmt}+{enc}",
+        "bytes_wire": len(wire),
+        "bytes_raw": len(raw),
+    }
+    metrics.ingest_body.observe(len(wire), "wire")
+    metrics.ingest_body.observe(len(raw), "raw")
+    return raw, stats
+
+def load_body() -> Tuple[Any, dict]:
+    """Decode an ingest body (JSON, or MessagePack by Content-Type) -> (obj, stats)."""
+    raw, stats = read_body()
+    try:
+        if stats["encoding"].startswith("msgpack"):
+            # timestamp=3: msgpack Timestamp ext -> aware datetime, as pydantic expects
+            obj = msgpack.unpackb(raw, raw=False, timestamp=3)
+        else:
+            obj = json_loads(raw)
+    except ValueError:  # incl. msgpack's unpack errors
+        abort(400, description="Failed to decode request body")
+    return obj, stats
+
+def _iter_json_array(text: str) -> Iterator[Any]:
+    # Decode one element at a time instead of materializing the whole array
+    dec = json.JSONDecoder()
+    pos = _WS.match(text).end()
+    if text[pos:pos + 1] != "[":
+        abort(400, description="Expected a JSON array or NDJSON body")
+    pos = _WS.match(text, pos + 1).end()
+    if text[pos:pos + 1] == "]":
+        return
+    while True:
+        try:
+            obj, pos = dec.raw_decode(text, pos)
+        except ValueError as e:
+            abort(400, description=f"Malformed JSON array: {e}")
+        yield obj
+        pos = _WS.match(text, pos).end()
+        sep = text[pos:pos + 1]
+        pos = _WS.match(text, pos + 1).end()
+        if sep == "]":
+            return
+        if sep != ",":
+            abort(400, description="Malformed JSON array")
+
+def iter_items(raw: bytes, stats: dict) -> Iterator[Tuple[Any, Optional[str]]]:
+    """Yield (item, error) for each element of a batch body.
+
+    Accepts NDJSON (by Content-Type), a JSON array, or a MessagePack array.
+    A bad NDJSON line is reported as that item's error; a broken array is a 400.
+    """
+    if stats["encoding"].startswith("msgpack"):
+        try:
+            items = msgpack.unpackb(raw, raw=False, timestamp=3)
+        except ValueError:
+            abort(400, description="Failed to decode request body")
+        if not isinstance(items, list):
+            abort(400, description="Expected a MessagePack array")
+        for obj in items:
+            yield obj, None
+        return
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        abort(400, description="Body is not UTF-8")
+    if request.mimetype in NDJSON_TYPES:
+        for line in io.StringIO(text):
+            if not line.strip():
+                continue
+            try:
+                yield json_loads(line), None
+            except ValueError as e:
+                yield None, f"Invalid JSON: {e}"
+        return
+    for obj in _iter_json_array(text):
+        yield obj, None
@@ -27,16 +27,99 @@ class Config:
 
     # DB (persisted via docker-compose bind mount: ./data -> /app/data)
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////app/data/netops.db")
+    # SQLite production profile: WAL + pragmas, read-only reader pool, single writer
+    SQLITE_PRODUCTION = os.getenv("SQLITE_PRODUCTION", "1") == "1"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+    DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+    DB_WRITE_TIMEOUT = float(os.getenv("DB_WRITE_TIMEOUT", "30"))  # seconds waiting for the writer
 
     # Auth
     NETOPS_JWT_SECRET = os.getenv("NETOPS_JWT_SECRET", "dev-jwt-secret-change-me")
     TOKEN_TTL = timedelta(hours=float(os.getenv("TOKEN_TTL_HOURS", "24")))
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "")  # optional UI gate
+    # Verified-token cache; station salts are re-read after AUTH_CACHE_TTL seconds,
+    # or as soon as a poll (every AUTH_REVOKE_POLL seconds) finds a CLI reset
+    AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "1024"))
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+    AUTH_REVOKE_POLL = float(os.getenv("AUTH_REVOKE_POLL", "1"))
 
     # Rate Limits
     LOGIN_RATE = os.getenv("LOGIN_RATE", "20 per hour")
     INGEST_RATE = os.getenv("INGEST_RATE", "600 per hour")
 
+    # Async ingest (opt-in): validate + enqueue + 202; one writer thread
+    # group-commits up to INGEST_BATCH_MAX stations per transaction
+    INGEST_ASYNC = os.getenv("INGEST_ASYNC", "0") == "1"
+    INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "500"))  # payloads queued before 503
+    INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "50"))
+    INGEST_RETRY_AFTER = int(os.getenv("INGEST_RETRY_AFTER", "5"))  # seconds
+    # Ingest body size cap, applied after Content-Encoding (decompression-bomb guard)
+    INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(16 * 1024 * 1024)))
+    INGEST_BATCH_ITEMS_MAX = int(os.getenv("INGEST_BATCH_ITEMS_MAX", "2000"))  # snapshots per /api/ingest/batch
+
+    # Retention / downsampling of snapshots, flows and ingest_log
+    RETENTION_RAW_HOURS = float(os.getenv("RETENTION_RAW_HOURS", "48"))        # keep every snapshot
+    RETENTION_HOURLY_DAYS = float(os.getenv("RETENTION_HOURLY_DAYS", "30"))    # then newest per hour
+    RETENTION_DAILY_DAYS = float(os.getenv("RETENTION_DAILY_DAYS", "0"))       # then per day; 0 = forever
+    RETENTION_INGEST_LOG_DAYS = float(os.getenv("RETENTION_INGEST_LOG_DAYS", "30"))  # 0 = forever
+    RETENTION_ROLLUP_DAYS = float(os.getenv("RETENTION_ROLLUP_DAYS", "90"))    # flow_rollup; 0 = forever
+    RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "500"))                 # rows per delete txn
+    RETENTION_INTERVAL_MINUTES = float(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))  # 0 = no background task
+    RETENTION_VACUUM = os.getenv("RETENTION_VACUUM", "0") == "1"
+    RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))
+
+    # /api/stations/<name>/flights?limit=N is capped at this many rows per page
+    FLIGHTS_PAGE_MAX = int(os.getenv("FLIGHTS_PAGE_MAX", "1000"))
+    # /api/flows?zoom=N: below CLUSTER_MAX_ZOOM airports merge into grid cells
+    # about CLUSTER_CELL_PX wide on screen (the map opens at zoom 7, unclustered)
+    CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", "7"))
+    CLUSTER_CELL_PX = float(os.getenv("CLUSTER_CELL_PX", "64"))
+    # Longest t axis /api/flows/history returns (window / bucket)
+    HISTORY_MAX_BUCKETS = int(os.getenv("HISTORY_MAX_BUCKETS", "5000"))
+
+    # Read-endpoint response cache (invalidated on writes; TTL bounds sliding
+    # time windows and out-of-process writes such as the CLI)
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+    RESPONSE_CACHE_MAX = int(os.getenv("RESPONSE_CACHE_MAX", "256"))
+    # Streamed bodies larger than this are sent without being cached
+    RESPONSE_CACHE_MAX_BODY = int(os.getenv("RESPONSE_CACHE_MAX_BODY", str(1024 * 1024)))
+
+    # Live change stream (/api/stream). Up to STREAM_MAX_HOLDERS streams per
+    # worker (0 = half of WEB_THREADS) stay open STREAM_HOLD_SECONDS pushing
+    # events; the rest replay buffered events and close (client re-polls).
+    STREAM_BUFFER = int(os.getenv("STREAM_BUFFER", "1024"))
+    STREAM_RETRY_MS = int(os.getenv("STREAM_RETRY_MS", "3000"))
+    STREAM_HOLD_SECONDS = float(os.getenv("STREAM_HOLD_SECONDS", "25"))
+    STREAM_MAX_HOLDERS = int(os.getenv("STREAM_MAX_HOLDERS", "0"))
+
+    # Prometheus text metrics at /metrics; with METRICS_TOKEN set, scrapes must
+    # send "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # With several workers, how often each copies its samples to the shared state
+    METRICS_PUBLISH_SECONDS = float(os.getenv("METRICS_PUBLISH_SECONDS", "5"))
+
+    # Opt-in profiling: requests sent with "X-Profile: 1" plus X-Admin-Password
+    # (or a PROFILE_SAMPLE_RATE fraction of all requests) are run under cProfile
+    # with an SQL trace; the last PROFILE_BUFFER are kept for /api/admin/profiles
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_BUFFER = int(os.getenv("PROFILE_BUFFER", "50"))
+    PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))                       # functions kept per profile
+    PROFILE_MAX_STATEMENTS = int(os.getenv("PROFILE_MAX_STATEMENTS", "500"))
+    PROFILE_N_PLUS_ONE = int(os.getenv("PROFILE_N_PLUS_ONE", "5"))          # repeats flagged as N+1
+
+    # Serving (python -m netops.serve): WEB_WORKERS processes share one port.
+    # With more than one, rate limits, cache generations and live events go
+    # through SHARED_STATE_PATH (default: netops_state.db beside the database).
+    WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+    WEB_PORT = int(os.getenv("WEB_PORT", "5250"))
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))  # Waitress threads per worker
+    SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")
+    WORKER_INDEX = int(os.getenv("NETOPS_WORKER", "0"))  # set by netops.serve; 0 runs retention
+
     # CORS (disabled by default)
     ENABLE_CORS = os.getenv("ENABLE_CORS", "0") == "1"
 
@@ -1,13 +1,92 @@
 # netops/db.py
 from __future__ import annotations
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import QueuePool
+from . import metrics
 from .config import config
 
-engine = create_engine(config.DATABASE_URL, future=True, pool_pre_ping=True)
+_url = make_url(config.DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+# Separate reader/writer engines only make sense for a real SQLite file
+_memory = _is_sqlite and _url.database in (None, "", ":memory:")
+_split = _is_sqlite and config.SQLITE_PRODUCTION and not _memory
+
+class _TimedQueuePool(QueuePool):
+    # Records how long checkouts wait; on the writer pool that's the
+    # in-process write queue.
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_wait.observe(time.perf_counter() - t0, self.logging_name or "default")
+
+def _sqlite_pragmas(readonly: bool):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if not readonly:
+            # Transactions are started by _begin_immediate instead of pysqlite
+            dbapi_conn.isolation_level = None
+            # Persistent in the file; readers inherit it. auto_vacuum only takes
+            # effect on a brand-new file (lets retention run incremental_vacuum).
+            cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+        cur.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}")
+        cur.execute(f"PRAGMA cache_size={int(config.SQLITE_CACHE_SIZE)}")
+        if readonly:
+            cur.execute("PRAGMA query_only=1")
+        cur.close()
+    return on_connect
+
+def _begin_immediate(conn):
+    # Take the write lock up front (waiting up to busy_timeout) rather than on
+    # the first write, where an upgrade from a read can fail with SQLITE_BUSY
+    # at once. The time spent here is the lock wait.
+    t0 = time.perf_counter()
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+    metrics.db_lock_wait.observe(time.perf_counter() - t0)
+
+if _split:
+    # One writer connection: ingest/login/airport writes queue on the pool
+    # instead of racing for the SQLite lock ("database is locked").
+    engine = create_engine(
+        config.DATABASE_URL, future=True, pool_pre_ping=True,
+        poolclass=_TimedQueuePool, pool_logging_name="writer",
+        pool_size=1, max_overflow=0, pool_timeout=config.DB_WRITE_TIMEOUT,
+    )
+    # Read-only pool for GET endpoints; under WAL these never wait on the writer
+    read_engine = create_engine(
+        config.DATABASE_URL, future=True, pool_pre_ping=True,
+        poolclass=_TimedQueuePool, pool_logging_name="reader",
+        pool_size=config.DB_READ_POOL_SIZE, max_overflow=0,
+    )
+    event.listen(engine, "connect", _sqlite_pragmas(readonly=False))
+    event.listen(engine, "begin", _begin_immediate)
+    event.listen(read_engine, "connect", _sqlite_pragmas(readonly=True))
+else:
+    engine = create_engine(
+        config.DATABASE_URL, future=True, pool_pre_ping=True, pool_logging_name="default",
+        **({} if _memory else {"poolclass": _TimedQueuePool}),
+    )
+    read_engine = engine
+event.listen(engine, "after_cursor_execute", metrics.after_cursor_execute)
+if read_engine is not engine:
+    event.listen(read_engine, "after_cursor_execute", metrics.after_cursor_execute)
+
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
+ReadSession = scoped_session(sessionmaker(bind=read_engine, autoflush=False, autocommit=False, future=True))
 Base = declarative_base()
 
+def remove_sessions(_exc=None):
+    # Registered as an app teardown so per-thread sessions don't accumulate
+    SessionLocal.remove()
+    ReadSession.remove()
+
 def init_db():
     # Fallback bootstrap so the app is usable even before Alembic runs.
     from . import models  # noqa: F401
@@ -0,0 +1,146 @@
+# netops/events.py
+from __future__ import annotations
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+from . import shared
+from .config import config
+
+class EventHub:
+    """In-process fan-out of post-commit change events for /api/stream.
+
+    Events live in a fixed-size ring buffer. Each stream request replays what
+    the client has not seen (via Last-Event-ID), then stays open for up to
+    STREAM_HOLD_SECONDS pushing new events. Only STREAM_MAX_HOLDERS streams
+    are held at once so dashboards can't take every Waitress thread; the rest
+    replay and close, and EventSource reconnects on its own after `retry` ms.
+    """
+
+    def __init__(self, size: int):
+        # Epoch changes on restart so stale Last-Event-IDs force a resync
+        self.epoch = secrets.token_hex(4)
+        self._cond = threading.Condition()
+        self._buf: deque = deque(maxlen=size)
+        self._seq = 0
+        self._holders = 0
+        self._closed = False
+
+    def publish(self, kind: str, data: dict) -> None:
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._cond:
+            self._seq += 1
+            self._buf.append((self._seq, kind, payload))
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """End held streams now (server shutdown); clients reconnect elsewhere."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _parse_last_id(self, last_id: Optional[str]) -> Optional[int]:
+        # None -> unknown/foreign id (client must resync)
+        if not last_id:
+            return None
+        epoch, _, seq = last_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _since(self, seq: int) -> Tuple[List[tuple], bool]:
+        # -> (events after seq, gap) ; caller holds the condition
+        if self._buf and self._buf[0][0] > seq + 1:
+            return [], True
+        return [e for e in self._buf if e[0] > seq], False
+
+    def _frame(self, seq: int, kind: str, payload: str) -> str:
+        return f"id: {self.epoch}-{seq}\nevent: {kind}\ndata: {payload}\n\n"
+
+    def _head(self) -> int:
+        return self._seq
+
+    def _wait(self, seq: int, timeout: float) -> None:
+        # caller holds the condition
+        if self._seq == seq and not self._closed:
+            self._cond.wait(timeout)
+
+    def _collect(self, seq: Optional[int]) -> Tuple[List[str], int, bool]:
+        # -> (frames, new seq, resynced) ; caller holds the condition
+        head = self._head()
+        if seq is None or seq > head:
+            # First connect, restart, or foreign id: tell the client where
+            # we are and let it do one full fetch.
+            return [self._frame(head, "resync", "{}")], head, True
+        events, gap = self._since(seq)
+        if gap:
+            return [self._frame(head, "resync", "{}")], head, True
+        frames = [self._frame(*e) for e in events]
+        return frames, (events[-1][0] if events else seq), False
+
+    def _max_holders(self) -> int:
+        # 0 = half the Waitress threads, leaving the rest for requests
+        return config.STREAM_MAX_HOLDERS or max(1, config.WEB_THREADS // 2)
+
+    def stream(self, last_id: Optional[str]) -> Iterator[str]:
+        yield f"retry: {config.STREAM_RETRY_MS}\n\n"
+        with self._cond:
+            frames, seq, _resynced = self._collect(self._parse_last_id(last_id))
+            hold = config.STREAM_HOLD_SECONDS > 0 and self._holders < self._max_holders()
+            if hold:
+                self._holders += 1
+        if not hold:
+            yield from frames
+            return
+        try:
+            # Held: push events as they're published until the hold runs out,
+            # then close and let EventSource reconnect with Last-Event-ID
+            yield from frames
+            deadline = time.monotonic() + config.STREAM_HOLD_SECONDS
+            while True:
+                left = deadline - time.monotonic()
+                if left <= 0 or self._closed:
+                    return
+                with self._cond:
+                    self._wait(seq, left)
+                    frames, seq, _resynced = self._collect(seq)
+                yield from frames
+        finally:
+            with self._cond:
+                self._holders -= 1
+
+class SharedEventHub(EventHub):
+    """EventHub over the shared state file (multi-worker serving): every
+    worker appends to and replays from one event log, so a stream sees
+    changes ingested by any worker. Held streams poll for new events."""
+
+    POLL_SECONDS = 0.25
+
+    def __init__(self, size: int):
+        super().__init__(size)
+        self.epoch = shared.epoch()
+        self._size = size
+
+    def publish(self, kind: str, data: dict) -> None:
+        shared.append_event(kind, json.dumps(data, separators=(",", ":")), self._size)
+        with self._cond:
+            self._cond.notify_all()  # wake this worker's held streams early
+
+    def _head(self) -> int:
+        return shared.last_event_seq()
+
+    def _since(self, seq: int) -> Tuple[List[tuple], bool]:
+        return shared.events_since(seq, self._size)
+
+    def _wait(self, seq: int, timeout: float) -> None:
+        # Condition.wait releases the lock between polls
+        deadline = time.monotonic() + timeout
+        while self._head() == seq and not self._closed:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            self._cond.wait(min(self.POLL_SECONDS, left))
+
+hub = SharedEventHub(config.STREAM_BUFFER) if shared.enabled() else EventHub(config.STREAM_BUFFER)
@@ -0,0 +1,257 @@
+# netops/geo.py
+from __future__ import annotations
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+
+from .cache import generation
+from .config import config
+from .db import ReadSession
+from .models import Airport
+
+# Server-side route geometry for the map: the airport join and per-pair
+# aggregation map.js used to redo on every refresh, and viewport (bbox)
+# filtering backed by an in-memory grid over airport coordinates.
+
+GEOJSON = "application/geo+json"
+GRID_DEGREES = 1.0  # grid cell size for the airport index
+
+BBox = Tuple[float, float, float, float]  # minLon, minLat, maxLon, maxLat
+
+def route_id(origin: str, dest: str) -> str:
+    return f"{origin}-{dest}"
+
+def pair_key(origin: str, dest: str) -> str:
+    # Unordered pair, lexicographic (same key map.js builds)
+    return f"{origin}|{dest}" if origin < dest else f"{dest}|{origin}"
+
+def route_features(rows: Iterable[tuple], coords: Dict[str, Tuple[float, float]],
+                   labels: Optional[Dict[str, str]] = None) -> dict:
+    """/api/flows rows (origin, dest, direction, legs, weight) -> GeoJSON.
+
+    One LineString per origin->dest (directions summed, broken down under
+    `directions`), with `forward` (origin sorts first in its pair), `both`
+    (the reverse route is present too) and the pair's combined totals.
+    Routes without coordinates for both ends are listed in `unresolved`.
+    With `labels` (clustered routes) each feature also gets origin_label/dest_label.
+    """
+    routes: Dict[Tuple[str, str], dict] = {}
+    for o, d, dr, legs, w in rows:
+        o, d = (o or "").upper(), (d or "").upper()
+        if not o or not d:
+            continue
+        r = routes.get((o, d))
+        if r is None:
+            r = routes[(o, d)] = {"legs": 0, "weight_lbs": 0.0, "directions": {}}
+        legs, w = int(legs or 0), float(w or 0.0)
+        r["legs"] += legs
+        r["weight_lbs"] += w
+        per = r["directions"].setdefault(dr, {"legs": 0, "weight_lbs": 0.0})
+        per["legs"] += legs
+        per["weight_lbs"] += w
+
+    pairs: Dict[str, list] = {}
+    for (o, d), r in routes.items():
+        p = pairs.setdefault(pair_key(o, d), [0, 0.0])
+        p[0] += r["legs"]
+        p[1] += r["weight_lbs"]
+
+    features, unresolved = [], []
+    for (o, d) in sorted(routes):
+        r, rid = routes[(o, d)], route_id(o, d)
+        a, b = coords.get(o), coords.get(d)
+        if a is None or b is None:
+            unresolved.append(rid)
+            continue
+        key = pair_key(o, d)
+        features.append({
+            "type": "Feature",
+            "id": rid,
+            "geometry": {"type": "LineString", "coordinates": [[a[1], a[0]], [b[1], b[0]]]},
+            "properties": {
+                "id": rid, "origin": o, "dest": d,
+                "legs": r["legs"], "weight_lbs": r["weight_lbs"], "directions": r["directions"],
+                "pair": key, "forward": o < d,
+                "both": o != d and (d, o) in routes,
+                "pair_legs": pairs[key][0], "pair_weight_lbs": pairs[key][1],
+            },
+        })
+        if labels is not None:
+            features[-1]["properties"].update(origin_label=labels.get(o, o), dest_label=labels.get(d, d))
+    return {"type": "FeatureCollection", "features": features, "unresolved": unresolved}
+
+def parse_bbox(spec: Optional[str]) -> Optional[BBox]:
+    """'minLon,minLat,maxLon,maxLat' -> floats (None if absent; ValueError if bad).
+
+    minLon > maxLon means the box crosses the antimeridian.
+    """
+    if not spec:
+        return None
+    parts = [float(x) for x in spec.split(",")]
+    if len(parts) != 4 or not all(map(math.isfinite, parts)):
+        raise ValueError(spec)
+    w, so, e, n = parts
+    if so > n or not (-90 <= so <= 90 and -90 <= n <= 90 and -180 <= w <= 180 and -180 <= e <= 180):
+        raise ValueError(spec)
+    return w, so, e, n
+
+def _lon_ranges(bbox: BBox) -> List[Tuple[float, float]]:
+    w, _s, e, _n = bbox
+    return [(w, e)] if w <= e else [(w, 180.0), (-180.0, e)]
+
+class GridIndex:
+    """Airports bucketed into GRID_DEGREES cells for bbox lookups."""
+
+    def __init__(self, rows: Iterable[tuple], gen: tuple = (), cell: float = GRID_DEGREES):
+        self.gen = gen
+        self.built_at = time.monotonic()
+        self.cell = cell
+        self.coords: Dict[str, Tuple[float, float]] = {}
+        self.cells: Dict[Tuple[int, int], List[tuple]] = {}
+        self._clusters: Dict[int, "Clusters"] = {}
+        for code, lat, lon in rows:
+            self.coords[code] = (lat, lon)
+            self.cells.setdefault(self._key(lat, lon), []).append((code, lat, lon))
+
+    def _key(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def within(self, bbox: BBox) -> List[tuple]:
+        """(code, lat, lon) of airports inside bbox, ordered by code."""
+        _w, so, _e, n = bbox
+        out = []
+        for w, e in _lon_ranges(bbox):
+            (r0, c0), (r1, c1) = self._key(so, w), self._key(n, e)
+            if (r1 - r0 + 1) * (c1 - c0 + 1) <= len(self.cells):
+                keys = ((r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1))
+            else:  # box covers more cells than are occupied
+                keys = (k for k in self.cells if r0 <= k[0] <= r1 and c0 <= k[1] <= c1)
+            for k in keys:
+                out.extend(p for p in self.cells.get(k, ()) if so <= p[1] <= n and w <= p[2] <= e)
+        return sorted(set(out))
+
+    def clusters(self, zoom: int) -> "Clusters":
+        # Memoized per index, so rebuilt with it after an airports write
+        c = self._clusters.get(zoom)
+        if c is None:
+            c = self._clusters[zoom] = Clusters(self.coords, zoom)
+        return c
+
+def cluster_degrees(zoom: int) -> float:
+    # About CLUSTER_CELL_PX on screen at this zoom (256 px tiles). Halving per
+    # zoom level with cells aligned at 0,0 makes the grid hierarchical: each
+    # cell splits into exactly four at the next level.
+    return config.CLUSTER_CELL_PX * 360.0 / (256 * 2 ** zoom)
+
+class Clusters:
+    """Airports grouped into the zoom's grid cells; each cell is one cluster.
+
+    A cluster sits at its members' mean position and is labelled with its
+    first code (plus a count when it has more than one).
+    """
+
+    def __init__(self, coords: Dict[str, Tuple[float, float]], zoom: int):
+        deg = cluster_degrees(zoom)
+        members: Dict[Tuple[int, int], List[str]] = {}
+        for code, (lat, lon) in coords.items():
+            members.setdefault((math.floor(lat / deg), math.floor(lon / deg)), []).append(code)
+        self.of: Dict[str, str] = {}
+        self.coords: Dict[str, Tuple[float, float]] = {}
+        self.labels: Dict[str, str] = {}
+        self.codes: Dict[str, List[str]] = {}
+        for (r, c), codes in members.items():
+            codes.sort()
+            cid = f"@{zoom}/{r}/{c}"
+            self.coords[cid] = (sum(coords[x][0] for x in codes) / len(codes),
+                                sum(coords[x][1] for x in codes) / len(codes))
+            self.labels[cid] = codes[0] if len(codes) == 1 else f"{codes[0]} +{len(codes) - 1}"
+            self.codes[cid] = codes
+            for x in codes:
+                self.of[x] = cid
+
+    def rows(self, rows: Iterable[tuple]) -> List[tuple]:
+        """Flow rows -> cluster-to-cluster rows, same shape, legs/weight summed.
+
+        Routes inside one cluster and routes with an unplaced end are dropped.
+        """
+        agg: Dict[Tuple[str, str, str], list] = {}
+        for o, d, dr, legs, w in rows:
+            co, cd = self.of.get((o or "").upper()), self.of.get((d or "").upper())
+            if co is None or cd is None or co == cd:
+                continue
+            t = agg.setdefault((co, cd, dr), [0, 0.0])
+            t[0] += int(legs or 0)
+            t[1] += float(w or 0.0)
+        return [(co, cd, dr, t[0], t[1]) for (co, cd, dr), t in sorted(agg.items())]
+
+_index: Optional[GridIndex] = None
+_index_lock = threading.Lock()
+
+def airport_index() -> GridIndex:
+    """Current airport grid, rebuilt after an airports write (generation bump)
+    or after RESPONSE_CACHE_TTL, whichever comes first."""
+    global _index
+    gen = generation("airports")
+
+    def fresh(idx: Optional[GridIndex]) -> bool:
+        return idx is not None and idx.gen == gen and \
+            not (config.RESPONSE_CACHE_TTL and time.monotonic() - idx.built_at > config.RESPONSE_CACHE_TTL)
+    idx = _index
+    if fresh(idx):
+        return idx
+    with _index_lock:
+        if not fresh(_index):
+            with ReadSession() as s:
+                rows = s.execute(select(Airport.code, Airport.lat, Airport.lon)).all()
+            _index = GridIndex(rows, gen)
+        return _index
+
+def _merc_y(lat: float) -> float:
+    lat = max(-85.0511, min(85.0511, lat))
+    return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+def segment_hits_bbox(a: Tuple[float, float], b: Tuple[float, float], bbox: BBox) -> bool:
+    """Does the straight map line a->b ((lat, lon) ends) pass through bbox?
+
+    Tested in Web Mercator, where Leaflet draws the line straight
+    (Liang-Barsky clipping).
+    """
+    _w, so, _e, n = bbox
+    x0, y0, x1, y1 = a[1], _merc_y(a[0]), b[1], _merc_y(b[0])
+    ys, yn = _merc_y(so), _merc_y(n)
+    for w, e in _lon_ranges(bbox):
+        t0, t1 = 0.0, 1.0
+        dx, dy = x1 - x0, y1 - y0
+        for p, q in ((-dx, x0 - w), (dx, e - x0), (-dy, y0 - ys), (dy, yn - y0)):
+            if p == 0:
+                if q < 0:
+                    break
+                continue
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                break
+        else:
+            return True
+    return False
+
+def rows_in_bbox(rows: Iterable[tuple], index: GridIndex, bbox: BBox) -> List[tuple]:
+    """Flow rows (origin, dest, ...) with an end inside bbox or a line crossing it.
+
+    Routes with an end that has no coordinates can't be placed and are dropped.
+    """
+    inside = {code for code, _lat, _lon in index.within(bbox)}
+    out = []
+    for r in rows:
+        o, d = (r[0] or "").upper(), (r[1] or "").upper()
+        a, b = index.coords.get(o), index.coords.get(d)
+        if a is None or b is None:
+            continue
+        if o in inside or d in inside or segment_hits_bbox(a, b, bbox):
+            out.append(r)
+    return out
@@ -0,0 +1,609 @@
+# netops/ingest.py
+from __future__ import annotations
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import func, select, insert, update, delete
+
+from . import metrics, rollup
+from .db import SessionLocal
+from .models import Station, Snapshot, Flow, Flight, IngestLog, Airport, InventoryItem
+from .schemas import IngestSnapshot, IngestDelta, FlowDelta
+from .cache import bump
+from .events import hub
+from .config import config
+
+log = logging.getLogger(__name__)
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _naive_utc(dt: datetime) -> datetime:
+    # SQLite hands DateTime back naive; compare everything as naive UTC
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+def station_json(st: Station) -> dict:
+    return {
+        "name": st.name,
+        "last_seen_at": st.last_seen_at.isoformat() if st.last_seen_at else None,
+        "last_default_origin": st.last_default_origin,
+        "last_origin_lat": st.last_origin_lat,
+        "last_origin_lon": st.last_origin_lon,
+    }
+
+def _route_rows(s, snapshot_id: int) -> list:
+    # Compact [origin, dest, direction, legs, weight] totals for one snapshot
+    rows = s.execute(
+        select(Flow.origin, Flow.dest, Flow.direction, func.sum(Flow.legs), func.sum(Flow.weight_lbs))
+        .where(Flow.snapshot_id == snapshot_id)
+        .group_by(Flow.origin, Flow.dest, Flow.direction)
+    ).all()
+    return [[o, d, dr, int(legs or 0), float(w or 0.0)] for (o, d, dr, legs, w) in rows]
+
+class BaseMismatch(Exception):
+    """A delta's base_generated_at isn't the station's latest snapshot."""
+
+    def __init__(self, current: Optional[datetime]):
+        super().__init__("Base snapshot mismatch; send full snapshot")
+        self.current = current
+
+def _flow_key(fr) -> Tuple[str, str, str]:
+    return (fr.origin.strip().upper(), fr.dest.strip().upper(), fr.direction)
+
+def _inventory_key(iv) -> Tuple[Optional[str], str]:
+    return ((iv.category or "")[:128].strip() or None, (iv.item or "").strip())
+
+def _chunks(seq: list, n: int = 500):
+    # Keep IN (...) lists under SQLite's bound-parameter limit
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _upsert_manifests(s, station_id: int, manifests: list) -> None:
+    """Merge manifest rows into flights with one prefetch per lookup key.
+
+    Match precedence per row is unchanged: flight_code (any station), then
+    (station_id, aoct_flight_id), then the newest open flight with the same
+    tail/origin/dest/takeoff. As with the per-row SELECTs this replaces (run
+    with autoflush off), lookups see flights as they were before this
+    payload. Results are written with one bulk INSERT and one bulk UPDATE.
+
+    One change from the per-row loop: when several flights match a key (two
+    rows with the same aoct_flight_id, or two open flights on the same
+    tail/route/takeoff), the old scalar_one_or_none() raised and the whole
+    ingest failed with a 500 -- on every later snapshot too, since the
+    duplicates stay. Now the lowest id wins for aoct_flight_id and the
+    newest last_seen_at (then lowest id) for the route key.
+    """
+    if not manifests:
+        return
+    cols = [c.name for c in Flight.__table__.columns]
+
+    def fetch(*where):
+        q = select(*Flight.__table__.columns).where(*where).order_by(Flight.id)
+        return [dict(r._mapping) for r in s.execute(q)]
+
+    codes = sorted({mf.flight_code for mf in manifests if mf.flight_code})
+    aoct_ids = sorted({int(mf.flight_id) for mf in manifests if mf.flight_id is not None})
+    tails = sorted({mf.tail.strip().upper() for mf in manifests
+                    if mf.tail and mf.origin and mf.dest and mf.takeoff_hhmm})
+
+    found: Dict[int, dict] = {}
+    by_code: Dict[str, dict] = {}
+    by_aoct: Dict[int, dict] = {}
+    by_route: Dict[Tuple, dict] = {}
+    for chunk in _chunks(codes):
+        for r in fetch(Flight.flight_code.in_(chunk)):
+            r = found.setdefault(r["id"], r)
+            by_code[r["flight_code"]] = r
+    for chunk in _chunks(aoct_ids):
+        for r in fetch(Flight.station_id == station_id, Flight.aoct_flight_id.in_(chunk)):
+            r = found.setdefault(r["id"], r)
+            by_aoct.setdefault(r["aoct_flight_id"], r)
+    for chunk in _chunks(tails):
+        for r in fetch(Flight.station_id == station_id, Flight.complete == 0, Flight.tail.in_(chunk)):
+            r = found.setdefault(r["id"], r)
+            key = (r["tail"], r["origin"], r["dest"], r["takeoff_hhmm"])
+            if key not in by_route or r["last_seen_at"] > by_route[key]["last_seen_at"]:
+                by_route[key] = r
+    # Match keys are frozen above; `found` rows are mutated in place below
+    original = {fid: dict(r) for fid, r in found.items()}
+
+    new_rows: list = []
+    for mf in manifests:
+        aoct_id = None
+        if mf.flight_id is not None:
+            aoct_id = int(mf.flight_id)
+        # Preferred key: flight_code
+        rec = None
+        if mf.flight_code:
+            rec = by_code.get(mf.flight_code)
+        if rec is None and aoct_id is not None:
+            rec = by_aoct.get(aoct_id)
+        if rec is None and (mf.tail and mf.origin and mf.dest and mf.takeoff_hhmm):
+            rec = by_route.get((mf.tail.strip().upper(), mf.origin.strip().upper(),
+                                mf.dest.strip().upper(), mf.takeoff_hhmm.zfill(4)))
+
+        if rec is None:
+            rec = dict.fromkeys(cols)
+            rec.update(station_id=station_id, first_seen_at=_now_utc())
+            new_rows.append(rec)
+
+        # Assign/overwrite fields
+        rec["aoct_flight_id"] = aoct_id if aoct_id is not None else rec["aoct_flight_id"]
+        rec["flight_code"] = mf.flight_code or rec["flight_code"]
+        rec["tail"] = (mf.tail or rec["tail"] or "").upper() or None
+        rec["direction"] = mf.direction or rec["direction"]
+        rec["origin"] = (mf.origin or rec["origin"] or "").upper() or None
+        rec["dest"] = (mf.dest or rec["dest"] or "").upper() or None
+        rec["cargo_type"] = mf.cargo_type or rec["cargo_type"]
+        rec["cargo_weight_lbs"] = mf.cargo_weight_lbs if mf.cargo_weight_lbs is not None else rec["cargo_weight_lbs"]
+        rec["takeoff_hhmm"] = mf.takeoff_hhmm or rec["takeoff_hhmm"]
+        rec["eta_hhmm"] = mf.eta_hhmm or rec["eta_hhmm"]
+        rec["is_ramp_entry"] = int(mf.is_ramp_entry or rec["is_ramp_entry"] or 0)
+        rec["complete"] = int(mf.complete or rec["complete"] or 0)
+        rec["remarks"] = mf.remarks or rec["remarks"]
+        rec["last_seen_at"] = mf.updated_at or _now_utc()
+
+    changed = [r for fid, r in found.items() if r != original[fid]]
+    if changed:
+        s.execute(update(Flight), changed)
+    if new_rows:
+        for r in new_rows:
+            del r["id"]
+        s.execute(insert(Flight), new_rows)
+
+def _pair_by_key(current: list, desired: list, key) -> Tuple[list, list]:
+    # Pair desired rows with existing rows of the same key (in id order).
+    # -> ([(existing_or_None, desired), ...], [unmatched existing, ...])
+    pools: Dict[Tuple, list] = {}
+    for r in current:
+        pools.setdefault(key(r), []).append(r)
+    pairs = []
+    for d in desired:
+        pool = pools.get(key(d))
+        pairs.append((pool.pop(0) if pool else None, d))
+    return pairs, [r for pool in pools.values() for r in pool]
+
+def _write_diff(s, model, inserts: list, updates: list, delete_ids: list) -> None:
+    # Deletes first so a re-keyed row can't trip a unique index
+    for chunk in _chunks(delete_ids):
+        s.execute(delete(model).where(model.id.in_(chunk)))
+    if updates:
+        s.execute(update(model), updates)
+    if inserts:
+        s.execute(insert(model), inserts)
+
+def _sync_flows(s, snapshot_id: int, rows: list, fresh: bool) -> None:
+    current = [] if fresh else [dict(r._mapping) for r in s.execute(
+        select(Flow.id, Flow.origin, Flow.dest, Flow.direction, Flow.legs, Flow.weight_lbs)
+        .where(Flow.snapshot_id == snapshot_id).order_by(Flow.id)
+    )]
+    pairs, gone = _pair_by_key(current, rows, lambda r: (r["origin"], r["dest"], r["direction"]))
+    inserts, updates = [], []
+    for cur, d in pairs:
+        if cur is None:
+            inserts.append(d)
+        elif (cur["legs"], cur["weight_lbs"]) != (d["legs"], d["weight_lbs"]):
+            updates.append({"id": cur["id"], "legs": d["legs"], "weight_lbs": d["weight_lbs"]})
+    _write_diff(s, Flow, inserts, updates, [r["id"] for r in gone])
+
+def _flow_row(snapshot_id: int, fr) -> dict:
+    origin, dest, direction = _flow_key(fr)
+    return {
+        "snapshot_id": snapshot_id,
+        "origin": origin,
+        "dest": dest,
+        "direction": direction,
+        "legs": int(fr.legs or 0),
+        "weight_lbs": float(fr.weight_lbs or 0.0),
+    }
+
+def _delta_flow_rows(s, base_id: int, snapshot_id: int, delta: FlowDelta) -> list:
+    # Base snapshot's flows, minus removed/replaced keys, plus the upserts
+    drop = {_flow_key(k) for k in delta.remove} | {_flow_key(fr) for fr in delta.upsert}
+    kept = [
+        {"snapshot_id": snapshot_id, "origin": o, "dest": d, "direction": dr, "legs": legs, "weight_lbs": w}
+        for (o, d, dr, legs, w) in s.execute(
+            select(Flow.origin, Flow.dest, Flow.direction, Flow.legs, Flow.weight_lbs)
+            .where(Flow.snapshot_id == base_id).order_by(Flow.id)
+        )
+        if (o, d, dr) not in drop
+    ]
+    return kept + [_flow_row(snapshot_id, fr) for fr in delta.upsert]
+
+def _sync_inventory(s, station_id: int, items: list, removed: Optional[list] = None) -> None:
+    """Diff the payload against the station's rows keyed on (category, item).
+
+    Rows whose values (and sender updated_at, if given) match are left alone,
+    so their updated_at and index entries are untouched. With `removed` (a
+    delta), rows not mentioned in `items` are kept unless their key is listed.
+    """
+    desired = []
+    for iv in items:
+        category, name = _inventory_key(iv)
+        if not name:
+            continue
+        desired.append({
+            "station_id": station_id,
+            "category": category,
+            "category_id": (iv.category_id if getattr(iv, "category_id", None) is not None else None),
+            "item": name,
+            "qty": (None if iv.qty is None else float(iv.qty)),
+            "weight_lbs": (None if iv.weight_lbs is None else float(iv.weight_lbs)),
+            # compared the way SQLite stores it (tz dropped, not converted)
+            "updated_at": iv.updated_at.replace(tzinfo=None) if iv.updated_at else None,
+        })
+    current = [dict(r._mapping) for r in s.execute(
+        select(InventoryItem.id, InventoryItem.category, InventoryItem.item, InventoryItem.category_id,
+               InventoryItem.qty, InventoryItem.weight_lbs, InventoryItem.updated_at)
+        .where(InventoryItem.station_id == station_id).order_by(InventoryItem.id)
+    )]
+    pairs, gone = _pair_by_key(current, desired, lambda r: (r["category"], r["item"]))
+    if removed is not None:
+        drop = set(removed) | {(d["category"], d["item"]) for d in desired}
+        gone = [r for r in gone if (r["category"], r["item"]) in drop]
+    now = _now_utc()
+    inserts, updates = [], []
+    for cur, d in pairs:
+        if cur is None:
+            inserts.append({**d, "updated_at": d["updated_at"] or now})
+            continue
+        fields = ("category_id", "qty", "weight_lbs")
+        if all(cur[f] == d[f] for f in fields) and d["updated_at"] in (None, cur["updated_at"]):
+            continue
+        upd = {"id": cur["id"], "updated_at": d["updated_at"] or now}
+        upd.update((f, d[f]) for f in fields)
+        updates.append(upd)
+    _write_diff(s, InventoryItem, inserts, updates, [r["id"] for r in gone])
+
+def apply_snapshot(s, st: Station, payload: Union[IngestSnapshot, IngestDelta],
+                   received_at: Optional[datetime] = None, body: Optional[dict] = None) -> dict:
+    """Write one validated snapshot for `st` into session `s` (no commit).
+
+    An IngestDelta is applied on top of the station's latest snapshot and
+    raises BaseMismatch (before writing anything) if that isn't its base.
+    `body` is codec.read_body()'s size stats, recorded on the ingest log row.
+    Returns what publish_applied() needs once the transaction has committed.
+    """
+    station_id = st.id
+    base = None
+    sw = metrics.ingest_phase.stopwatch()
+    if isinstance(payload, IngestDelta):
+        if st.last_snapshot_at is None or \
+                _naive_utc(payload.base_generated_at) != _naive_utc(st.last_snapshot_at):
+            raise BaseMismatch(st.last_snapshot_at)
+        base = s.get(Snapshot, st.last_snapshot_id)
+        if base is None:
+            raise BaseMismatch(None)
+    # Update station last-seen + origin info
+    st.last_seen_at = received_at or _now_utc()
+    if payload.default_origin:
+        st.last_default_origin = payload.default_origin.strip().upper()
+    if payload.origin_coords:
+        st.last_origin_lat = payload.origin_coords.lat
+        st.last_origin_lon = payload.origin_coords.lon
+        if payload.default_origin:
+            # upsert airport for the default origin
+            code = payload.default_origin.strip().upper()
+            a = s.get(Airport, code)
+            if not a:
+                s.add(Airport(code=code, lat=payload.origin_coords.lat, lon=payload.origin_coords.lon))
+            else:
+                a.lat, a.lon = payload.origin_coords.lat, payload.origin_coords.lon
+
+    # Snapshot de-dupe. Stored as naive UTC: SQLite drops the offset, so an
+    # aware "+05:00" value would be kept as local wall time and never match
+    # the delta bases / rollup buckets computed in UTC.
+    gen_at = _naive_utc(payload.generated_at)
+    snap = s.execute(
+        select(Snapshot).where(
+            Snapshot.station_id == station_id,
+            Snapshot.generated_at == gen_at
+        )
+    ).scalar_one_or_none()
+
+    fresh_snap = snap is None
+    if not snap:
+        snap = Snapshot(
+            station_id=station_id,
+            generated_at=gen_at,
+            window_hours=int(payload.window_hours or (base.window_hours if base else 24) or 24),
+            inventory_last_update=payload.inventory_last_update or (base.inventory_last_update if base else None)
+        )
+        s.add(snap)
+        s.flush()  # get id
+
+    # Maintain the station's latest-snapshot pointer (read by /api/flows)
+    prev_snap_id, prev_snap_at = st.last_snapshot_id, st.last_snapshot_at
+    is_latest = prev_snap_at is None or gen_at >= _naive_utc(prev_snap_at)
+    if is_latest:
+        # Previous contribution to the map, for the live stream's route update
+        prev_routes = _route_rows(s, prev_snap_id) if prev_snap_id else []
+        st.last_snapshot_id = snap.id
+        st.last_snapshot_at = gen_at
+    sw.lap("station")
+
+    # Sync flows for this snapshot (idempotent; only changed rows are written)
+    if base is not None:
+        flow_rows = _delta_flow_rows(s, base.id, snap.id, payload.flows)
+    else:
+        flow_rows = [_flow_row(snap.id, fr) for fr in payload.flows]
+    _sync_flows(s, snap.id, flow_rows, fresh=fresh_snap)
+    rollup.refresh(s, station_id, [rollup.bucket_of(gen_at)])
+    route_totals: Dict[Tuple[str, str, str], list] = {}
+    for f in flow_rows:
+        t = route_totals.setdefault((f["origin"], f["dest"], f["direction"]), [0, 0.0])
+        t[0] += f["legs"]
+        t[1] += f["weight_lbs"]
+    sw.lap("flows")
+
+    # Upsert manifests into flights (last state wins)
+    _upsert_manifests(s, station_id, payload.manifests)
+    sw.lap("manifests")
+
+    # Sync inventory for this station (treat payload.inventory as full snapshot)
+    if base is not None:
+        if payload.inventory.upsert or payload.inventory.remove:
+            _sync_inventory(s, station_id, payload.inventory.upsert,
+                            removed=[_inventory_key(k) for k in payload.inventory.remove])
+    elif payload.inventory is not None:
+        _sync_inventory(s, station_id, payload.inventory)
+    sw.lap("inventory")
+
+    # Log ingest
+    s.add(IngestLog(station_id=station_id, status="accepted", raw=None, **(body or {})))
+    return {
+        "station": station_json(st),
+        "airports": bool(payload.origin_coords and payload.default_origin),
+        "flows": {
+            "station": st.name,
+            "generated_at": gen_at.replace(tzinfo=timezone.utc).isoformat(),
+            "prev_generated_at": prev_snap_at.isoformat() if prev_snap_at else None,
+            "prev": prev_routes,
+            "flows": [[o, d, dr, t[0], t[1]] for (o, d, dr), t in route_totals.items()],
+        } if is_latest else None,
+    }
+
+def publish_applied(applied: dict) -> None:
+    # Post-commit: invalidate read caches and notify live streams
+    bump("flows", "stations")
+    if applied["airports"]:
+        bump("airports")
+    hub.publish("station", applied["station"])
+    if applied["flows"]:
+        hub.publish("flows", applied["flows"])
+
+def _manifest_key(mf) -> tuple:
+    # Same identity _upsert_manifests matches on, in the same precedence
+    if mf.flight_code:
+        return ("code", mf.flight_code)
+    if mf.flight_id is not None:
+        return ("aoct", int(mf.flight_id))
+    if mf.tail and mf.origin and mf.dest and mf.takeoff_hhmm:
+        return ("route", mf.tail.strip().upper(), mf.origin.strip().upper(),
+                mf.dest.strip().upper(), mf.takeoff_hhmm.zfill(4))
+    return ("row", id(mf))
+
+def _merged_manifests(payloads: list) -> list:
+    """One manifest row per flight across `payloads` (oldest first).
+
+    Fields fold the way successive upserts would: a later non-empty value
+    wins, an empty one keeps the earlier value.
+    """
+    merged: Dict[tuple, object] = {}
+    for p in payloads:
+        for mf in p.manifests:
+            key = _manifest_key(mf)
+            old = merged.pop(key, None)
+            if old is not None:
+                upd = {f: v for f, v in mf.dict().items()
+                       if v or (f == "cargo_weight_lbs" and v is not None)}
+                upd["updated_at"] = mf.updated_at
+                mf = old.copy(update=upd)
+            merged[key] = mf
+    return list(merged.values())
+
+def _store_history(s, station_id: int, payloads: list) -> None:
+    # Snapshot + flows only; station/flight/inventory state is left to the newest
+    by_gen: Dict[datetime, tuple] = {}
+    for p in payloads:
+        # Naive UTC, as apply_snapshot stores it; a replayed duplicate: last one wins
+        gen_at = _naive_utc(p.generated_at)
+        by_gen[gen_at] = (gen_at, p)
+    existing = dict(s.execute(
+        select(Snapshot.generated_at, Snapshot.id)
+        .where(Snapshot.station_id == station_id, Snapshot.generated_at.in_([g for g, _p in by_gen.values()]))
+    ).all())
+    new = [(g, p) for key, (g, p) in by_gen.items() if key not in existing]
+    if new:
+        ids = s.execute(
+            insert(Snapshot).returning(Snapshot.id, sort_by_parameter_order=True),
+            [{
+                "station_id": station_id,
+                "generated_at": g,
+                "window_hours": int(p.window_hours or 24),
+                "inventory_last_update": p.inventory_last_update or None,
+            } for g, p in new],
+        ).scalars().all()
+        flow_rows = [_flow_row(snap_id, fr) for snap_id, (_g, p) in zip(ids, new) for fr in p.flows]
+        if flow_rows:
+            s.execute(insert(Flow), flow_rows)
+    for key, snap_id in existing.items():
+        p = by_gen[key][1]
+        _sync_flows(s, snap_id, [_flow_row(snap_id, fr) for fr in p.flows], fresh=False)
+    rollup.refresh(s, station_id, [rollup.bucket_of(g) for g, _p in by_gen.values()])
+    s.execute(insert(IngestLog), [{"station_id": station_id, "status": "accepted"} for _p in payloads])
+
+def apply_backfill(station_id: int, payloads: list, body: Optional[dict] = None) -> dict:
+    """Write a station's backlog of full snapshots in a few short transactions.
+
+    All but the newest are stored as history only (snapshot and flows, in
+    INGEST_BATCH_MAX-sized transactions). The newest then goes through
+    apply_snapshot with every manifest in the batch folded into it, so
+    station, airport, flight and inventory state is written once.
+    """
+    ordered = sorted(payloads, key=lambda p: _naive_utc(p.generated_at))
+    newest = ordered[-1]
+    history = [p for p in ordered[:-1] if _naive_utc(p.generated_at) != _naive_utc(newest.generated_at)]
+    for chunk in _chunks(history, max(1, config.INGEST_BATCH_MAX)):
+        with SessionLocal() as s, metrics.ingest_phase.time("history"):
+            _store_history(s, station_id, chunk)
+            s.commit()
+    with SessionLocal() as s:
+        st = s.get(Station, station_id)
+        final = newest.copy(update={"manifests": _merged_manifests(ordered)})
+        applied = apply_snapshot(s, st, final, body=body)
+        with metrics.ingest_phase.time("commit"):
+            s.commit()
+    return applied
+
+class IngestQueue:
+    """Opt-in async ingest (INGEST_ASYNC=1): one writer thread, group commit.
+
+    Pending work is keyed by station, so a newer full snapshot from a station
+    that is still queued replaces what was queued; deltas queue up behind the
+    snapshot they are based on. The writer applies up to INGEST_BATCH_MAX
+    stations per transaction; if that transaction fails it retries each
+    station on its own so one bad payload can't sink the rest.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # station_id -> [(payload, received_at, body stats), ...]; dict order = arrival order
+        self._pending: Dict[int, List[Tuple[Union[IngestSnapshot, IngestDelta], datetime, Optional[dict]]]] = {}
+        self._queued = 0  # payloads across all stations (bounded by INGEST_QUEUE_MAX)
+        # station_id -> newest generated_at handed to the writer (may not be committed yet)
+        self._taken: Dict[int, datetime] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.coalesced = 0
+
+    def depth(self) -> int:
+        with self._cond:
+            return self._queued
+
+    def head(self, station_id: int, stored: Optional[datetime]) -> Optional[datetime]:
+        """The snapshot a delta must be based on: newest of queued, in-flight and `stored`."""
+        with self._cond:
+            return self._head(station_id, stored)
+
+    def _head(self, station_id: int, stored: Optional[datetime]) -> Optional[datetime]:
+        # caller holds the condition
+        queued = self._pending.get(station_id)
+        seen = [stored, self._taken.get(station_id), queued[-1][0].generated_at if queued else None]
+        return max((_naive_utc(t) for t in seen if t is not None), default=None)
+
+    def submit(self, station_id: int, payload: Union[IngestSnapshot, IngestDelta], received_at: datetime,
+               body: Optional[dict] = None, stored: Optional[datetime] = None) -> str:
+        """-> "queued", "superseded" (a newer one is already queued), "full", or
+        "base_mismatch" (a delta whose base isn't the station's newest snapshot;
+        `stored` is the station's last_snapshot_at)."""
+        with self._cond:
+            queued = self._pending.get(station_id)
+            item = (payload, received_at, body)
+            if isinstance(payload, IngestDelta):
+                # Deltas pile up behind their snapshot, so each one counts
+                if self._queued >= config.INGEST_QUEUE_MAX:
+                    return "full"
+                head = self._head(station_id, stored)
+                if head is None or head != _naive_utc(payload.base_generated_at):
+                    return "base_mismatch"
+                self._pending.setdefault(station_id, []).append(item)
+                self._queued += 1
+            else:
+                # A snapshot replaces whatever its station had queued
+                if queued is None and self._queued >= config.INGEST_QUEUE_MAX:
+                    return "full"
+                if queued is not None:
+                    self.coalesced += 1
+                    if _naive_utc(queued[-1][0].generated_at) > _naive_utc(payload.generated_at):
+                        return "superseded"
+                self._pending[station_id] = [item]
+                self._queued += 1 - len(queued or ())
+            self._ensure_writer()
+            self._cond.notify()
+            return "queued"
+
+    def _ensure_writer(self) -> None:
+        # caller holds the condition
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="netops-ingest-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        # Drain what is queued (everything here was already answered 202),
+        # then let the writer exit
+        with self._cond:
+            if self._pending:
+                self._ensure_writer()
+            self._stopping = True
+            self._cond.notify_all()
+            t = self._thread
+        if t is not None:
+            t.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch = list(self._pending.items())[:config.INGEST_BATCH_MAX]
+                for station_id, items in batch:
+                    del self._pending[station_id]
+                    self._queued -= len(items)
+                    self._taken[station_id] = _naive_utc(items[-1][0].generated_at)
+            try:
+                self._write(batch)
+            except Exception:
+                log.exception("ingest writer: batch of %d failed", len(batch))
+
+    def _write(self, batch: list) -> None:
+        try:
+            with SessionLocal() as s:
+                applied = [apply_snapshot(s, *args) for args in self._load(s, batch)]
+                with metrics.ingest_phase.time("commit"):
+                    s.commit()
+        except Exception:
+            log.exception("ingest writer: group commit failed; retrying one by one")
+            applied = []
+            for item in batch:
+                applied.extend(self._write_one(item))
+        for a in applied:
+            publish_applied(a)
+
+    def _write_one(self, item) -> list:
+        try:
+            with SessionLocal() as s:
+                applied = [apply_snapshot(s, *args) for args in self._load(s, [item])]
+                s.commit()
+                return applied
+        except Exception as e:
+            with self._cond:
+                # Never committed, so later deltas must not build on it
+                self._taken.pop(item[0], None)
+            with SessionLocal() as s:
+                s.add(IngestLog(station_id=item[0], status="rejected", error=str(e)[:2000]))
+                s.commit()
+            return []
+
+    @staticmethod
+    def _load(s, batch: list):
+        for station_id, items in batch:
+            st = s.get(Station, station_id)
+            if st is None:  # deleted while queued
+                continue
+            for payload, received_at, body in items:
+                yield st, payload, received_at, body
+
+ingest_queue = IngestQueue()
+atexit.register(ingest_queue.stop)
+
+metrics.Callback("netops_ingest_queue_depth", "Payloads (snapshots and deltas) waiting for the async writer.",
+                 "gauge", (), lambda: {(): ingest_queue.depth()})
+metrics.Callback("netops_ingest_coalesced_total", "Queued snapshots replaced by a newer one.",
+                 "counter", (), lambda: {(): ingest_queue.coalesced})
@@ -0,0 +1,225 @@
+# netops/metrics.py
+from __future__ import annotations
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+from flask import Response, abort, g, request
+from . import shared
+from .config import config
+
+# Prometheus text exposition without the client library: a handful of
+# lock-protected dicts, cheap enough to leave on in production.
+#
+# With several workers (netops.serve) each process keeps its own values, so
+# every sample gets a worker="N" label and each worker copies its samples to
+# the shared state file every METRICS_PUBLISH_SECONDS; a scrape answered by
+# any worker returns all of them. Sum over the label for totals.
+
+log = logging.getLogger("netops.metrics")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_registry: List["_Metric"] = []
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+Const = Tuple[Tuple[str, object], ...]  # labels put on every sample (worker)
+
+def _labels(names: Sequence[str], values: Sequence, le=None, const: Const = ()) -> str:
+    pairs = list(const) + list(zip(names, values))
+    if le is not None:
+        pairs.append(("le", le))
+    return "{" + ",".join(f'{n}="{_esc(v)}"' for n, v in pairs) + "}" if pairs else ""
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self, const: Const = ()) -> List[str]:
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        return self._header() + self.samples()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self, const: Const = ()) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k, const=const)} {_num(v)}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            e = self._values.get(labels)
+            if e is None:
+                e = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            e[0][i] += 1
+            e[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labels)
+
+    def stopwatch(self) -> "Stopwatch":
+        return Stopwatch(self)
+
+    def samples(self, const: Const = ()) -> List[str]:
+        with self._lock:
+            items = [(k, list(e[0]), e[1]) for k, e in self._values.items()]
+        out = []
+        for k, counts, total in items:
+            acc = 0
+            for le, n in zip(self.buckets + ("+Inf",), counts):
+                acc += n
+                out.append(f"{self.name}_bucket{_labels(self.labels, k, le, const)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labels, k, const=const)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labels, k, const=const)} {acc}")
+        return out
+
+class Stopwatch:
+    """Times consecutive phases: each lap() observes the time since the last."""
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+        self.t = time.perf_counter()
+
+    def lap(self, *labels) -> None:
+        now = time.perf_counter()
+        self.hist.observe(now - self.t, *labels)
+        self.t = now
+
+class Callback(_Metric):
+    """Values read at scrape time from fn() -> {label values tuple: number}."""
+
+    def __init__(self, name: str, doc: str, kind: str, labels: Sequence[str], fn: Callable[[], Dict[tuple, float]]):
+        super().__init__(name, doc, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self, const: Const = ()) -> List[str]:
+        return [f"{self.name}{_labels(self.labels, k, const=const)} {_num(v)}" for k, v in self.fn().items()]
+
+def _publish() -> Dict[str, List[str]]:
+    # This worker's samples, labelled and copied to the shared state file
+    const = (("worker", config.WORKER_INDEX),)
+    mine = {m.name: m.samples(const) for m in _registry}
+    shared.put_metrics(config.WORKER_INDEX, json.dumps(mine, separators=(",", ":")))
+    return mine
+
+def _publish_loop() -> None:
+    while True:
+        time.sleep(config.METRICS_PUBLISH_SECONDS)
+        try:
+            _publish()
+        except Exception:
+            log.exception("metrics: publish failed")
+
+def render() -> str:
+    lines: List[str] = []
+    if not shared.enabled():
+        for m in _registry:
+            lines.extend(m.collect())
+        return "\n".join(lines) + "\n"
+    # Fresh samples for this worker, the last published ones for the others
+    workers = {config.WORKER_INDEX: _publish()}
+    for worker, body in shared.worker_metrics():
+        workers.setdefault(worker, json.loads(body))
+    for m in _registry:
+        lines.extend(m._header())
+        for worker in sorted(workers):
+            lines.extend(workers[worker].get(m.name, ()))
+    return "\n".join(lines) + "\n"
+
+# --- series ----------------------------------------------------------------
+
+http_requests = Counter("netops_http_requests_total", "HTTP requests.", ("endpoint", "method", "status"))
+http_latency = Histogram("netops_http_request_duration_seconds", "Time to produce the response.", ("endpoint", "method"))
+request_sql = Histogram("netops_request_sql_statements", "SQL statements executed per request.",
+                        ("endpoint",), COUNT_BUCKETS)
+request_rows = Histogram("netops_request_sql_rows", "Rows written (DML rowcount) per request.",
+                         ("endpoint",), COUNT_BUCKETS)
+sql_statements = Counter("netops_sql_statements_total", "SQL statements executed, by engine.", ("engine",))
+ingest_phase = Histogram("netops_ingest_phase_seconds", "Ingest time by phase.", ("phase",))
+ingest_body = Histogram("netops_ingest_body_bytes", "Ingest body size as sent (wire) and decoded (raw).",
+                        ("kind",), BYTES_BUCKETS)
+db_pool_wait = Histogram("netops_db_pool_wait_seconds", "Time waiting to check out a pooled connection.", ("pool",))
+db_lock_wait = Histogram("netops_db_lock_wait_seconds", "Time to take the SQLite write lock (BEGIN IMMEDIATE).")
+
+# --- hooks -----------------------------------------------------------------
+
+# Per-request SQL tallies; only counted on threads currently serving a request
+_req = threading.local()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_statements.inc(conn.engine.pool.logging_name or "default")
+    if getattr(_req, "active", False):
+        _req.statements += 1
+        if cursor.rowcount and cursor.rowcount > 0:
+            _req.rows += cursor.rowcount
+
+def _start():
+    g._metrics_t0 = time.perf_counter()
+    _req.active, _req.statements, _req.rows = True, 0, 0
+
+def _finish(resp):
+    t0 = g.pop("_metrics_t0", None)
+    if t0 is not None:
+        endpoint = request.endpoint or "unmatched"
+        http_latency.observe(time.perf_counter() - t0, endpoint, request.method)
+        http_requests.inc(endpoint, request.method, resp.status_code)
+        request_sql.observe(_req.statements, endpoint)
+        request_rows.observe(_req.rows, endpoint)
+    _req.active = False
+    return resp
+
+def metrics_view():
+    # Optional scrape token (Prometheus `authorization: credentials: ...`)
+    if config.METRICS_TOKEN and request.headers.get("Authorization", "") != f"Bearer {config.METRICS_TOKEN}":
+        abort(403, description="Forbidden")
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+def init_app(app) -> None:
+    if not config.METRICS_ENABLED:
+        return
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    if shared.enabled():
+        threading.Thread(target=_publish_loop, name="netops-metrics", daemon=True).start()
@@ -18,10 +18,26 @@ class Station(Base):
     last_default_origin = Column(String(8), nullable=True)
     last_origin_lat = Column(Float, nullable=True)
     last_origin_lon = Column(Float, nullable=True)
+    # Pointer to the newest snapshot (by generated_at), maintained by ingest
+    last_snapshot_id = Column(Integer, nullable=True)
+    last_snapshot_at = Column(DateTime, nullable=True)
 
     snapshots = relationship("Snapshot", back_populates="station", cascade="all,delete-orphan")
     flights = relationship("Flight", back_populates="station", cascade="all,delete-orphan")
     inventory_items = relationship("InventoryItem", back_populates="station", cascade="all,delete-orphan")
+    flow_rollup = relationship("FlowRollup", cascade="all,delete-orphan")
+
+    __table_args__ = (
+        Index("ix_stations_last_snapshot_at", "last_snapshot_at"),
+    )
+
+class StationRevocation(Base):
+    # One row per token salt rotation / station delete done by the CLI; each
+    # server process polls for new rows and drops those stations' cached salts
+    __tablename__ = "station_revocations"
+    id = Column(Integer, primary_key=True)
+    station_id = Column(Integer, nullable=False)  # no FK: the station may be deleted
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 class Snapshot(Base):
     __tablename__ = "snapshots"
@@ -55,6 +71,24 @@ class Flow(Base):
         Index("ix_flows_snapshot", "snapshot_id"),
     )
 
+class FlowRollup(Base):
+    # Per station and 5-minute bucket: route totals of the station's newest
+    # snapshot in that bucket (maintained by netops.rollup on ingest)
+    __tablename__ = "flow_rollup"
+    id = Column(Integer, primary_key=True)
+    bucket = Column(Integer, nullable=False)  # bucket start, epoch seconds (UTC)
+    station_id = Column(Integer, ForeignKey("stations.id"), nullable=False)
+    origin = Column(String(8), nullable=False)
+    dest = Column(String(8), nullable=False)
+    direction = Column(String(10), nullable=False)
+    legs = Column(Integer, nullable=False, default=0)
+    weight_lbs = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint("station_id", "bucket", "origin", "dest", "direction", name="uq_rollup_station_bucket_route"),
+        Index("ix_flow_rollup_bucket", "bucket"),
+    )
+
 class Flight(Base):
     __tablename__ = "flights"
     id = Column(Integer, primary_key=True)
@@ -80,6 +114,7 @@ class Flight(Base):
         Index("ix_flights_origin_dest_dir", "origin", "dest", "direction"),
         Index("ix_flights_complete_seen", "complete", "last_seen_at"),
         Index("ix_flights_station_aoct", "station_id", "aoct_flight_id"),
+        Index("ix_flights_station_complete_seen", "station_id", "complete", "last_seen_at"),
     )
 
 class IngestLog(Base):
@@ -90,6 +125,10 @@ class IngestLog(Base):
     status = Column(String(16), nullable=False)  # accepted|rejected
     error = Column(Text, nullable=True)
     raw = Column(Text, nullable=True)
+    # Body as sent vs. decoded (bytes saved = bytes_raw - bytes_wire)
+    encoding = Column(String(32), nullable=True)  # e.g. json, json+gzip, msgpack+zstd
+    bytes_wire = Column(Integer, nullable=True)
+    bytes_raw = Column(Integer, nullable=True)
 
 class Airport(Base):
     __tablename__ = "airports"
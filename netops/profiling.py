@@ -0,0 +1,195 @@
+# netops/profiling.py
+from __future__ import annotations
+import cProfile
+import hmac
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from flask import abort, g, jsonify, request
+from sqlalchemy import event
+from .config import config
+from .db import engine, read_engine
+
+# Opt-in request profiling: a request is traced when an admin sends
+# "X-Profile: 1" (with X-Admin-Password) or when it falls in the
+# PROFILE_SAMPLE_RATE sample. Traces go to an in-memory ring buffer served at
+# /api/admin/profiles.
+
+_buffer: deque = deque(maxlen=max(1, config.PROFILE_BUFFER))
+_buffer_lock = threading.Lock()
+_ids = itertools.count(1)
+# cProfile can only run one profiler at a time on 3.12+; other traced
+# requests still get their SQL trace
+_profiler_lock = threading.Lock()
+_active = threading.local()
+
+def _is_admin() -> bool:
+    pw = request.headers.get("X-Admin-Password", "")
+    return bool(config.ADMIN_PASSWORD) and hmac.compare_digest(pw, config.ADMIN_PASSWORD)
+
+class Trace:
+    """SQL statements (with timing and query plan) and profile of one request."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.statements: List[dict] = []
+        self._plans: Dict[str, Optional[list]] = {}
+        self._t0: Optional[float] = None
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def start_profiler(self) -> None:
+        if not _profiler_lock.acquire(blocking=False):
+            return
+        self.profiler = cProfile.Profile()
+        try:
+            self.profiler.enable()
+        except ValueError:  # some other profiler (e.g. a debugger) is active
+            self.profiler = None
+            _profiler_lock.release()
+
+    def stop_profiler(self) -> Optional[list]:
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        _profiler_lock.release()
+        st = pstats.Stats(self.profiler)
+        rows = sorted(st.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:config.PROFILE_TOP]
+        return [
+            {"function": f"{fn}:{line}({name})", "calls": nc, "primitive_calls": cc,
+             "tottime_ms": round(tt * 1000, 3), "cumtime_ms": round(ct * 1000, 3)}
+            for (fn, line, name), (cc, nc, tt, ct, _callers) in rows
+        ]
+
+    def plan(self, cursor, statement: str, parameters) -> Optional[list]:
+        # EXPLAIN QUERY PLAN once per distinct statement, on the same DB-API
+        # connection (bypasses SQLAlchemy, so it isn't traced itself)
+        if statement in self._plans:
+            return self._plans[statement]
+        plan = None
+        head = statement.lstrip()[:6].upper()
+        if head in ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH") and hasattr(cursor, "connection"):
+            try:
+                params = parameters[0] if isinstance(parameters, list) else parameters
+                rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", params or ()).fetchall()
+                plan = [r[-1] for r in rows]
+            except Exception:
+                plan = None
+        self._plans[statement] = plan
+        return plan
+
+    def n_plus_one(self) -> list:
+        # The same statement run over and over in one request (one query per row)
+        seen: Dict[str, list] = {}
+        for st in self.statements:
+            if not st["executemany"]:
+                e = seen.setdefault(st["statement"], [0, 0.0])
+                e[0] += 1
+                e[1] += st["ms"]
+        return [
+            {"statement": sql, "count": n, "total_ms": round(ms, 3)}
+            for sql, (n, ms) in sorted(seen.items(), key=lambda kv: kv[1][0], reverse=True)
+            if n >= config.PROFILE_N_PLUS_ONE
+        ]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tr = getattr(_active, "trace", None)
+    if tr is not None:
+        tr._t0 = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tr = getattr(_active, "trace", None)
+    if tr is None or tr._t0 is None:
+        return
+    ms = (time.perf_counter() - tr._t0) * 1000
+    tr._t0 = None
+    if len(tr.statements) >= config.PROFILE_MAX_STATEMENTS:
+        return
+    tr.statements.append({
+        "statement": statement,
+        "parameters": repr(parameters[:3] if executemany else parameters)[:500],
+        "executemany": executemany,
+        "rows": cursor.rowcount,
+        "ms": round(ms, 3),
+        "plan": tr.plan(cursor, statement, parameters) if conn.dialect.name == "sqlite" else None,
+    })
+
+def _start():
+    if request.headers.get("X-Profile") == "1" and _is_admin():
+        reason = "requested"
+    elif config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE:
+        reason = "sampled"
+    else:
+        return
+    tr = Trace(reason)
+    g._profile_trace = tr
+    _active.trace = tr
+    tr.start_profiler()
+
+def _finish(resp):
+    tr = g.pop("_profile_trace", None)
+    if tr is None:
+        return resp
+    _active.trace = None
+    profile = tr.stop_profiler()
+    entry = {
+        "id": next(_ids),
+        "at": datetime.now(timezone.utc).isoformat(),
+        "reason": tr.reason,
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": resp.status_code,
+        "ms": round((time.perf_counter() - tr.started) * 1000, 3),
+        "sql_count": len(tr.statements),
+        "sql_ms": round(sum(st["ms"] for st in tr.statements), 3),
+        "n_plus_one": tr.n_plus_one(),
+        "sql": tr.statements,
+        "profile": profile,
+    }
+    with _buffer_lock:
+        _buffer.append(entry)
+    resp.headers["X-Profile-Id"] = str(entry["id"])
+    return resp
+
+def _cleanup(_exc=None):
+    # after_request is skipped on unhandled errors; never leave a profiler running
+    tr = g.pop("_profile_trace", None)
+    if tr is not None:
+        _active.trace = None
+        tr.stop_profiler()
+
+def _summary(e: dict) -> dict:
+    return {k: v for k, v in e.items() if k not in ("sql", "profile")} | \
+        {"n_plus_one": len(e["n_plus_one"])}
+
+def list_profiles():
+    if not _is_admin():
+        abort(403, description="Forbidden")
+    with _buffer_lock:
+        entries = list(_buffer)
+    return jsonify([_summary(e) for e in reversed(entries)])
+
+def get_profile(pid: int):
+    if not _is_admin():
+        abort(403, description="Forbidden")
+    with _buffer_lock:
+        hit = next((e for e in _buffer if e["id"] == pid), None)
+    if hit is None:
+        abort(404, description="Profile not found (ring buffer rolled over?)")
+    return jsonify(hit)
+
+def init_app(app) -> None:
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_cleanup)
+    for eng in {engine, read_engine}:
+        event.listen(eng, "before_cursor_execute", _before_cursor_execute)
+        event.listen(eng, "after_cursor_execute", _after_cursor_execute)
+    app.add_url_rule("/api/admin/profiles", "profiles", list_profiles)
+    app.add_url_rule("/api/admin/profiles/<int:pid>", "profile", get_profile)
@@ -0,0 +1,159 @@
+# netops/retention.py
+from __future__ import annotations
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, func, select
+
+from .db import ReadSession, SessionLocal, engine
+from .models import Station, Snapshot, Flow, FlowRollup, IngestLog
+from .cache import bump
+from .config import config
+
+log = logging.getLogger(__name__)
+
+# SQLite stores DateTime as "YYYY-MM-DD HH:MM:SS.ffffff"; bucket on the prefix
+_HOURLY = "%Y-%m-%d %H"
+_DAILY = "%Y-%m-%d"
+
+def _superseded_ids(s, bucket_fmt: str, start: Optional[datetime], end: datetime) -> list:
+    """Snapshot ids in [start, end) that aren't the newest of their station/bucket.
+
+    Each station's current snapshot (stations.last_snapshot_id) is never returned.
+    """
+    where = [Snapshot.generated_at < end]
+    if start is not None:
+        where.append(Snapshot.generated_at >= start)
+    ranked = (
+        select(
+            Snapshot.id,
+            func.row_number().over(
+                partition_by=(Snapshot.station_id, func.strftime(bucket_fmt, Snapshot.generated_at)),
+                order_by=Snapshot.generated_at.desc(),
+            ).label("rn"),
+        )
+        .where(*where)
+        .subquery()
+    )
+    pinned = select(Station.last_snapshot_id).where(Station.last_snapshot_id.is_not(None))
+    q = select(ranked.c.id).where(ranked.c.rn > 1, ranked.c.id.not_in(pinned))
+    return list(s.execute(q).scalars())
+
+def _expired_ids(s, end: datetime) -> list:
+    pinned = select(Station.last_snapshot_id).where(Station.last_snapshot_id.is_not(None))
+    q = select(Snapshot.id).where(Snapshot.generated_at < end, Snapshot.id.not_in(pinned))
+    return list(s.execute(q).scalars())
+
+# Ids are picked on the reader (under WAL it never takes the write lock);
+# the writer only runs short DELETE ... WHERE id IN (...) transactions, so
+# ingest waits at most one batch.
+
+def _delete_snapshots(pick, limit: int) -> int:
+    # One ranking pass for the whole run, then deletes in batches
+    with ReadSession() as s:
+        ids = pick(s)
+    pinned = select(Station.last_snapshot_id).where(Station.last_snapshot_id.is_not(None))
+    total = 0
+    for i in range(0, len(ids), limit):
+        chunk = ids[i:i + limit]
+        with SessionLocal() as s:
+            # Re-check the pin: a station's pointer may have moved since the pick
+            s.execute(delete(Flow).where(Flow.snapshot_id.in_(chunk), Flow.snapshot_id.not_in(pinned)))
+            res = s.execute(delete(Snapshot).where(Snapshot.id.in_(chunk), Snapshot.id.not_in(pinned)))
+            s.commit()
+        total += res.rowcount
+    return total
+
+def _delete_by_id(model, where, limit: int) -> int:
+    total = 0
+    while True:
+        with ReadSession() as s:
+            ids = list(s.execute(select(model.id).where(where).order_by(model.id).limit(limit)).scalars())
+        if not ids:
+            return total
+        with SessionLocal() as s:
+            s.execute(delete(model).where(model.id.in_(ids)))
+            s.commit()
+        total += len(ids)
+
+def _delete_ingest_log(before: datetime, limit: int) -> int:
+    return _delete_by_id(IngestLog, IngestLog.received_at < before, limit)
+
+def _delete_rollup(before: datetime, limit: int) -> int:
+    cut = int(before.replace(tzinfo=timezone.utc).timestamp())
+    return _delete_by_id(FlowRollup, FlowRollup.bucket < cut, limit)
+
+def _incremental_vacuum() -> Optional[int]:
+    # Only effective on databases created with auto_vacuum=INCREMENTAL
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as c:
+        if c.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            return None
+        before = c.exec_driver_sql("PRAGMA freelist_count").scalar() or 0
+        # pysqlite's execute() steps a pragma only once (one page); a script
+        # runs it to completion.
+        c.connection.dbapi_connection.executescript(
+            f"PRAGMA incremental_vacuum({int(config.RETENTION_VACUUM_PAGES)})"
+        )
+        after = c.exec_driver_sql("PRAGMA freelist_count").scalar() or 0
+        return before - after
+
+def prune(now: Optional[datetime] = None, vacuum: Optional[bool] = None) -> dict:
+    """Apply the retention policy once and return what was removed.
+
+    Snapshots (and their flows) are kept in full for RETENTION_RAW_HOURS,
+    then thinned to the newest per station per hour until
+    RETENTION_HOURLY_DAYS, then to one per day; with RETENTION_DAILY_DAYS > 0
+    anything older than that is dropped. ingest_log rows older than
+    RETENTION_INGEST_LOG_DAYS are dropped.
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None)
+    batch = max(1, int(config.RETENTION_BATCH))
+    raw_cut = now - timedelta(hours=config.RETENTION_RAW_HOURS)
+    hourly_cut = now - timedelta(days=config.RETENTION_HOURLY_DAYS)
+    out = {"hourly": 0, "daily": 0, "expired": 0, "ingest_log": 0, "rollup": 0, "vacuum_pages": None}
+
+    if hourly_cut < raw_cut:
+        out["hourly"] = _delete_snapshots(lambda s: _superseded_ids(s, _HOURLY, hourly_cut, raw_cut), batch)
+    out["daily"] = _delete_snapshots(lambda s: _superseded_ids(s, _DAILY, None, min(hourly_cut, raw_cut)), batch)
+    if config.RETENTION_DAILY_DAYS > 0:
+        expire_cut = now - timedelta(days=config.RETENTION_DAILY_DAYS)
+        out["expired"] = _delete_snapshots(lambda s: _expired_ids(s, expire_cut), batch)
+    if config.RETENTION_INGEST_LOG_DAYS > 0:
+        out["ingest_log"] = _delete_ingest_log(now - timedelta(days=config.RETENTION_INGEST_LOG_DAYS), batch)
+    if config.RETENTION_ROLLUP_DAYS > 0:
+        out["rollup"] = _delete_rollup(now - timedelta(days=config.RETENTION_ROLLUP_DAYS), batch)
+
+    if out["hourly"] or out["daily"] or out["expired"] or out["rollup"]:
+        bump("flows")
+    if config.RETENTION_VACUUM if vacuum is None else vacuum:
+        out["vacuum_pages"] = _incremental_vacuum()
+    return out
+
+def _loop(stop: threading.Event) -> None:
+    interval = config.RETENTION_INTERVAL_MINUTES * 60
+    while not stop.wait(interval):
+        try:
+            res = prune()
+            log.info("retention: %s", res)
+        except Exception:
+            log.exception("retention: prune failed")
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+def start_background() -> None:
+    """Run prune() every RETENTION_INTERVAL_MINUTES in a daemon thread (0 = off)."""
+    global _thread
+    if config.RETENTION_INTERVAL_MINUTES <= 0 or (_thread and _thread.is_alive()):
+        return
+    _thread = threading.Thread(target=_loop, args=(_stop,), name="netops-retention", daemon=True)
+    _thread.start()
+
+def stop_background(timeout: float = 10.0) -> None:
+    """Stop the prune thread, letting a prune that is running finish."""
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
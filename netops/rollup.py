@@ -0,0 +1,105 @@
+# netops/rollup.py
+from __future__ import annotations
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete, func, insert, literal, select
+
+from .models import Flow, FlowRollup, Snapshot
+
+# Route totals per station per BUCKET_SECONDS, taken from the station's newest
+# snapshot in each bucket -- the same "latest snapshot per station" rule as
+# /api/flows, precomputed so history queries never touch raw flows.
+# 000007's backfill uses the same bucket size. A snapshot with no flows is
+# recorded as one empty route ("", "", "") so it still counts as the newest.
+BUCKET_SECONDS = 300
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_SPEC = re.compile(r"^(\d+)([smhd]?)$")
+
+def bucket_of(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    ts = int(dt.timestamp())
+    return ts - ts % BUCKET_SECONDS
+
+def parse_bucket(spec: str) -> Optional[int]:
+    """'5m', '1h', '1d', '900' -> seconds; None unless a multiple of BUCKET_SECONDS."""
+    m = _SPEC.match(spec.strip().lower())
+    if not m:
+        return None
+    size = int(m.group(1)) * _UNITS[m.group(2) or "s"]
+    return size if size > 0 and size % BUCKET_SECONDS == 0 else None
+
+def refresh(s, station_id: int, buckets: Iterable[int]) -> None:
+    """Recompute a station's rollup rows for the given buckets (no commit)."""
+    for b in set(buckets):
+        lo = datetime.fromtimestamp(b, timezone.utc).replace(tzinfo=None)
+        hi = lo + timedelta(seconds=BUCKET_SECONDS)
+        snap_id = s.execute(
+            select(Snapshot.id)
+            .where(Snapshot.station_id == station_id, Snapshot.generated_at >= lo, Snapshot.generated_at < hi)
+            .order_by(Snapshot.generated_at.desc())
+            .limit(1)
+        ).scalar()
+        s.execute(delete(FlowRollup).where(FlowRollup.station_id == station_id, FlowRollup.bucket == b))
+        if snap_id is None:
+            continue
+        res = s.execute(insert(FlowRollup).from_select(
+            ["bucket", "station_id", "origin", "dest", "direction", "legs", "weight_lbs"],
+            select(literal(b), literal(station_id), Flow.origin, Flow.dest, Flow.direction,
+                   func.coalesce(func.sum(Flow.legs), 0), func.coalesce(func.sum(Flow.weight_lbs), 0.0))
+            .where(Flow.snapshot_id == snap_id)
+            .group_by(Flow.origin, Flow.dest, Flow.direction),
+        ))
+        if not res.rowcount:
+            s.execute(insert(FlowRollup).values(bucket=b, station_id=station_id, origin="", dest="",
+                                                direction="", legs=0, weight_lbs=0.0))
+
+def history(s, start: datetime, end: datetime, size: int, origin: str = "", dest: str = "",
+            direction: str = "all") -> dict:
+    """Columnar route history for [start, end] in `size`-second buckets.
+
+    -> {"bucket": size, "t": [bucket starts, epoch s], "series": [{origin, dest,
+    direction, legs: [...], weight_lbs: [...]}]}; null where a route has no data.
+    A coarse bucket uses each station's newest 5-minute bucket inside it.
+    """
+    lo, hi = bucket_of(start), bucket_of(end) + BUCKET_SECONDS
+    R = FlowRollup
+    if size == BUCKET_SECONDS:
+        src = select(R.bucket.label("b"), R.origin, R.dest, R.direction, R.legs, R.weight_lbs) \
+            .where(R.bucket >= lo, R.bucket < hi).subquery()
+        where = []
+    else:
+        coarse = (R.bucket // size) * size
+        src = select(
+            coarse.label("b"), R.bucket, R.origin, R.dest, R.direction, R.legs, R.weight_lbs,
+            func.max(R.bucket).over(partition_by=(coarse, R.station_id)).label("newest"),
+        ).where(R.bucket >= lo, R.bucket < hi).subquery()
+        where = [src.c.bucket == src.c.newest]
+    # Route filters apply after picking each station's newest bucket
+    where.append(src.c.direction != "")
+    if origin:
+        where.append(src.c.origin == origin)
+    if dest:
+        where.append(src.c.dest == dest)
+    if direction in ("inbound", "outbound"):
+        where.append(src.c.direction == direction)
+    rows = s.execute(
+        select(src.c.b, src.c.origin, src.c.dest, src.c.direction, func.sum(src.c.legs), func.sum(src.c.weight_lbs))
+        .where(*where)
+        .group_by(src.c.b, src.c.origin, src.c.dest, src.c.direction)
+    ).all()
+
+    first = lo - lo % size
+    t = list(range(first, hi, size))
+    series: Dict[Tuple[str, str, str], dict] = {}
+    for b, o, d, dr, legs, w in rows:
+        e = series.get((o, d, dr))
+        if e is None:
+            e = series[(o, d, dr)] = {"origin": o, "dest": d, "direction": dr,
+                                      "legs": [None] * len(t), "weight_lbs": [None] * len(t)}
+        i = (b - first) // size
+        e["legs"][i] = int(legs or 0)
+        e["weight_lbs"][i] = float(w or 0.0)
+    return {"bucket": size, "t": t, "series": [series[k] for k in sorted(series)]}
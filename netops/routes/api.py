@@ -1,17 +1,27 @@
 # netops/routes/api.py
 from __future__ import annotations
+import base64
+import heapq
 from datetime import datetime, timedelta, timezone
+from itertools import islice
+from urllib.parse import urlencode
 from typing import Dict, Tuple
-from flask import Blueprint, jsonify, request, abort, current_app
-from sqlalchemy import func, select, and_, or_, text
+from flask import Blueprint, Response, jsonify, request, abort, current_app
+from sqlalchemy import func, select, update, and_, or_, text
 from sqlalchemy.exc import IntegrityError
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-from ..db import SessionLocal
-from ..models import Station, Snapshot, Flow, Flight, IngestLog, Airport, InventoryItem
-from ..schemas import LoginRequest, TokenResponse, IngestSnapshot
-from ..auth import verify_password, issue_token, require_bearer
+from .. import geo, metrics, rollup
+from ..db import SessionLocal, ReadSession
+from ..models import Station, Snapshot, Flow, Flight, Airport, InventoryItem
+from ..schemas import LoginRequest, TokenResponse, IngestSnapshot, IngestDelta, parse_fast
+from ..auth import verify_password, issue_token, require_station
+from ..cache import cached_json, bump
+from ..codec import load_body, read_body, iter_items
+from ..events import hub
+from ..streaming import stream_rows
+from ..ingest import apply_snapshot, apply_backfill, publish_applied, ingest_queue, station_json, BaseMismatch
 from ..config import config
 
 api = Blueprint("api", __name__, url_prefix="/api")
@@ -21,25 +31,45 @@ limiter: Limiter = Limiter(key_func=get_remote_address)
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
+def _as_utc(dt: datetime) -> datetime:
+    # Naive timestamps from feeders are UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
 @api.post("/login")
 @limiter.limit(lambda: config.LOGIN_RATE)
 def login():
     data = LoginRequest.parse_obj(request.get_json(force=True, silent=False))
+    stname = (data.station or "").strip().upper()
+    # Look up and hash-check on the reader: the argon2 verify must not hold
+    # the writer's BEGIN IMMEDIATE lock (ingest would queue behind every login)
+    with ReadSession() as s:
+        st = s.execute(
+            select(Station.id, Station.password_hash, Station.token_salt).where(Station.name == stname)
+        ).first()
+    if not st or not verify_password(st.password_hash, data.password):
+        abort(401, description="Invalid station or password")
+    token = issue_token(st.id, st.token_salt or "")
     with SessionLocal() as s:
-        stname = (data.station or "").strip().upper()
-        st = s.execute(select(Station).where(Station.name == stname)).scalar_one_or_none()
-        if not st or not verify_password(st.password_hash, data.password):
-            abort(401, description="Invalid station or password")
-        token = issue_token(st.id, st.token_salt or "")
-        st.last_seen_at = _now_utc()
+        s.execute(update(Station).where(Station.id == st.id).values(last_seen_at=_now_utc()))
         s.commit()
-        return jsonify(TokenResponse(token=token).dict())
+    bump("stations")
+    return jsonify(TokenResponse(token=token).dict())
 
 @api.get("/airports")
+@cached_json("airports")
 def list_airports():
-    with SessionLocal() as s:
-        rows = s.execute(select(Airport)).scalars().all()
-        return jsonify([{"code": a.code, "lat": a.lat, "lon": a.lon} for a in rows])
+    bbox = _bbox_arg()
+    return stream_rows(
+        # ?bbox= is answered from the in-memory grid, without touching the DB
+        geo.airport_index().within(bbox) if bbox else select(Airport.code, Airport.lat, Airport.lon),
+        lambda r: {"code": r[0], "lat": r[1], "lon": r[2]},
+    )
+
+def _bbox_arg():
+    try:
+        return geo.parse_bbox(request.args.get("bbox"))
+    except ValueError:
+        abort(400, description="bbox must be minLon,minLat,maxLon,maxLat")
 
 @api.post("/airports")
 def upsert_airport():
@@ -61,139 +91,106 @@ def upsert_airport():
         else:
             a.lat, a.lon = lat, lon
         s.commit()
+        bump("airports")
         return jsonify({"ok": True})
 
+def _full_snapshot_required(current) -> Response:
+    # Delta base isn't what we hold: the feeder must resend everything
+    resp = jsonify({
+        "ok": False,
+        "error": "Base snapshot mismatch; send full snapshot",
+        "full_snapshot_required": True,
+        "last_generated_at": current.isoformat() if current else None,
+    })
+    resp.status_code = 409
+    return resp
+
 @api.post("/ingest")
 @limiter.limit(lambda: config.INGEST_RATE)
 def ingest():
-    station_id, _claims = require_bearer()
-    payload = IngestSnapshot.parse_obj(request.get_json(force=True, silent=False))
+    station_id, name, _claims = require_station()
+    sw = metrics.ingest_phase.stopwatch()
+    # JSON or MessagePack, optionally gzip/deflate/zstd Content-Encoding
+    obj, body = load_body()
+    if isinstance(obj, dict) and "base_generated_at" in obj:
+        payload = parse_fast(IngestDelta, obj)
+        if _as_utc(payload.generated_at) < _as_utc(payload.base_generated_at):
+            abort(400, description="generated_at is older than base_generated_at")
+    else:
+        payload = parse_fast(IngestSnapshot, obj)
+    sw.lap("parse")
+    if payload.station != name:
+        abort(401, description="Token/station mismatch")
+
+    if config.INGEST_ASYNC:
+        stored = None
+        if isinstance(payload, IngestDelta):
+            with ReadSession() as s:
+                stored = s.execute(
+                    select(Station.last_snapshot_at).where(Station.id == station_id)
+                ).scalar_one_or_none()
+        status = ingest_queue.submit(station_id, payload, _now_utc(), body, stored=stored)
+        if status == "base_mismatch":
+            return _full_snapshot_required(ingest_queue.head(station_id, stored))
+        if status == "full":
+            resp = jsonify({"ok": False, "error": "Ingest queue full"})
+            resp.status_code = 503
+            resp.headers["Retry-After"] = str(config.INGEST_RETRY_AFTER)
+            return resp
+        return jsonify({"ok": True, "queued": True, "superseded": status == "superseded"}), 202
 
     with SessionLocal() as s:
         st = s.get(Station, station_id)
-        if not st or st.name != payload.station:
+        if not st:
             abort(401, description="Token/station mismatch")
+        try:
+            applied = apply_snapshot(s, st, payload, body=body)
+        except BaseMismatch as e:
+            return _full_snapshot_required(e.current)
+        with metrics.ingest_phase.time("commit"):
+            s.commit()
+    publish_applied(applied)
+    return jsonify({"ok": True})
 
-        # Update station last-seen + origin info
-        st.last_seen_at = _now_utc()
-        if payload.default_origin:
-            st.last_default_origin = payload.default_origin.strip().upper()
-        if payload.origin_coords:
-            st.last_origin_lat = payload.origin_coords.lat
-            st.last_origin_lon = payload.origin_coords.lon
-            if payload.default_origin:
-                # upsert airport for the default origin
-                code = payload.default_origin.strip().upper()
-                a = s.get(Airport, code)
-                if not a:
-                    s.add(Airport(code=code, lat=payload.origin_coords.lat, lon=payload.origin_coords.lon))
-                else:
-                    a.lat, a.lon = payload.origin_coords.lat, payload.origin_coords.lon
-
-        # Snapshot de-dupe
-        gen_at = payload.generated_at if payload.generated_at.tzinfo else payload.generated_at.replace(tzinfo=timezone.utc)
-        snap = s.execute(
-            select(Snapshot).where(
-                Snapshot.station_id == station_id,
-                Snapshot.generated_at == gen_at
-            )
-        ).scalar_one_or_none()
+@api.post("/ingest/batch")
+@limiter.limit(lambda: config.INGEST_RATE)
+def ingest_batch():
+    # Backfill: an ordered array (or NDJSON) of full snapshots for one station
+    station_id, name, _claims = require_station()
+    raw, body = read_body()
 
-        if not snap:
-            snap = Snapshot(
-                station_id=station_id,
-                generated_at=gen_at,
-                window_hours=int(payload.window_hours or 24),
-                inventory_last_update=payload.inventory_last_update or None
-            )
-            s.add(snap)
-            s.flush()  # get id
-
-        # Replace flows for this snapshot (idempotent)
-        s.query(Flow).filter(Flow.snapshot_id == snap.id).delete(synchronize_session=False)
-        for fr in payload.flows:
-            s.add(Flow(
-                snapshot_id=snap.id,
-                origin=fr.origin.strip().upper(),
-                dest=fr.dest.strip().upper(),
-                direction=fr.direction,
-                legs=int(fr.legs or 0),
-                weight_lbs=float(fr.weight_lbs or 0.0),
-            ))
-
-        # Upsert manifests into flights (last state wins)
-        for mf in payload.manifests:
-            aoct_id = None
-            if mf.flight_id is not None:
-                aoct_id = int(mf.flight_id)
-            # Preferred key: flight_code
-            rec = None
-            if mf.flight_code:
-                rec = s.execute(select(Flight).where(Flight.flight_code == mf.flight_code)).scalar_one_or_none()
-            if not rec and aoct_id is not None:
-                rec = s.execute(select(Flight).where(Flight.station_id == station_id, Flight.aoct_flight_id == aoct_id)).scalar_one_or_none()
-            if not rec and (mf.tail and mf.origin and mf.dest and mf.takeoff_hhmm):
-                rec = s.execute(select(Flight).where(
-                    Flight.station_id == station_id,
-                    Flight.tail == mf.tail.strip().upper(),
-                    Flight.origin == mf.origin.strip().upper(),
-                    Flight.dest == mf.dest.strip().upper(),
-                    Flight.takeoff_hhmm == mf.takeoff_hhmm.zfill(4),
-                    Flight.complete == 0
-                ).order_by(Flight.last_seen_at.desc())).scalar_one_or_none()
-
-            if not rec:
-                rec = Flight(station_id=station_id, first_seen_at=_now_utc())
-                s.add(rec)
-
-            # Assign/overwrite fields
-            rec.aoct_flight_id = aoct_id if aoct_id is not None else rec.aoct_flight_id
-            rec.flight_code = mf.flight_code or rec.flight_code
-            rec.tail = (mf.tail or rec.tail or "").upper() or None
-            rec.direction = mf.direction or rec.direction
-            rec.origin = (mf.origin or rec.origin or "").upper() or None
-            rec.dest = (mf.dest or rec.dest or "").upper() or None
-            rec.cargo_type = mf.cargo_type or rec.cargo_type
-            rec.cargo_weight_lbs = mf.cargo_weight_lbs if mf.cargo_weight_lbs is not None else rec.cargo_weight_lbs
-            rec.takeoff_hhmm = mf.takeoff_hhmm or rec.takeoff_hhmm
-            rec.eta_hhmm = mf.eta_hhmm or rec.eta_hhmm
-            rec.is_ramp_entry = int(mf.is_ramp_entry or rec.is_ramp_entry or 0)
-            rec.complete = int(mf.complete or rec.complete or 0)
-            rec.remarks = mf.remarks or rec.remarks
-            rec.last_seen_at = mf.updated_at or _now_utc()
-
-        # Replace inventory for this station (treat payload.inventory as full snapshot)
-        if payload.inventory is not None:
-            s.query(InventoryItem).filter(InventoryItem.station_id == station_id).delete(synchronize_session=False)
-            for iv in payload.inventory:
-                name = (iv.item or "").strip()
-                if not name:
-                    continue
-                s.add(InventoryItem(
-                    station_id=station_id,
-                    category=((iv.category or "")[:128].strip() or None),
-                    category_id=(iv.category_id if getattr(iv, "category_id", None) is not None else None),
-                    item=name,
-                    qty=(None if iv.qty is None else float(iv.qty)),
-                    weight_lbs=(None if iv.weight_lbs is None else float(iv.weight_lbs)),
-                    updated_at=(iv.updated_at or _now_utc())
-                ))
-
-        # Log ingest
-        s.add(IngestLog(station_id=station_id, status="accepted", raw=None))
-        s.commit()
-        return jsonify({"ok": True})
+    results, good = [], []
+    for i, (obj, error) in enumerate(iter_items(raw, body)):
+        if i >= config.INGEST_BATCH_ITEMS_MAX:
+            abort(413, description=f"Batch exceeds {config.INGEST_BATCH_ITEMS_MAX} snapshots")
+        if error is None and isinstance(obj, dict) and "base_generated_at" in obj:
+            error = "Delta snapshots are not accepted in a batch"
+        if error is None:
+            try:
+                payload = parse_fast(IngestSnapshot, obj)
+            except ValueError as e:  # pydantic ValidationError
+                error = str(e)
+            else:
+                if payload.station != name:
+                    error = "Token/station mismatch"
+        if error is not None:
+            results.append({"index": i, "ok": False, "error": error[:1000]})
+            continue
+        good.append(payload)
+        results.append({"index": i, "ok": True, "generated_at": payload.generated_at.isoformat()})
 
-@api.get("/flows")
-def get_flows():
-    q = request.args
-    direction = q.get("direction", "all").lower()
-    origin = (q.get("origin") or "").strip().upper()
-    dest = (q.get("dest") or "").strip().upper()
-    hours = q.get("hours")
-    since = q.get("since")
-    until = q.get("until")
+    if good:
+        publish_applied(apply_backfill(station_id, good, body))
+    return jsonify({
+        "ok": len(good) == len(results),
+        "accepted": len(good),
+        "rejected": len(results) - len(good),
+        "results": results,
+    })
 
+def _window(q) -> Tuple[datetime, datetime]:
+    """Query window from hours=N or since/until (ISO 8601); default last 24h."""
+    hours, since, until = q.get("hours"), q.get("since"), q.get("until")
     now = _now_utc()
     if hours and (since or until):
         abort(400, description="Use either hours or since/until")
@@ -203,21 +200,73 @@ def get_flows():
             span = float(hours)
         except ValueError:
             abort(400, description="Invalid hours")
-        start = now - timedelta(hours=span)
-        end = now
-    else:
-        # parse since/until or default 24h
-        def parse_iso(s: str) -> datetime:
-            dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt
-        start = parse_iso(since) if since else now - timedelta(hours=24)
-        end = parse_iso(until) if until else now
+        return now - timedelta(hours=span), now
 
-    with SessionLocal() as s:
-        Snap, Fl = Snapshot, Flow
-        # Use only the *latest* snapshot per station inside the window
+    def parse_iso(s: str) -> datetime:
+        try:
+            return _as_utc(datetime.fromisoformat(s.replace("Z", "+00:00")))
+        except ValueError:
+            abort(400, description="Invalid since/until")
+    start = parse_iso(since) if since else now - timedelta(hours=24)
+    end = parse_iso(until) if until else now
+    return start, end
+
+def _flows_cache_key() -> tuple:
+    q = request.args
+    return (
+        q.get("direction", "all").lower(),
+        (q.get("origin") or "").strip().upper(),
+        (q.get("dest") or "").strip().upper(),
+        q.get("hours"), q.get("since"), q.get("until"),
+        q.get("format", "json").lower(), q.get("bbox"), _cluster_zoom(),
+    )
+
+def _cluster_zoom():
+    # zoom=N -> cluster level, or None when N shows full detail
+    z = request.args.get("zoom")
+    if z is None:
+        return None
+    try:
+        z = int(z)
+    except ValueError:
+        abort(400, description="Invalid zoom")
+    if not 0 <= z <= 30:
+        abort(400, description="Invalid zoom")
+    return z if z < config.CLUSTER_MAX_ZOOM else None
+
+@api.get("/flows")
+@cached_json("flows", "airports", key=_flows_cache_key)
+def get_flows():
+    """Route totals; ?format=geojson returns map-ready LineStrings (see geo.route_features).
+
+    ?bbox= keeps routes with an end inside the box or a line crossing it;
+    ?zoom=N (below CLUSTER_MAX_ZOOM) merges airports into zoom-sized grid
+    clusters and returns cluster-to-cluster totals instead.
+    """
+    q = request.args
+    fmt = q.get("format", "json").lower()
+    if fmt not in ("json", "geojson"):
+        abort(400, description="format must be json or geojson")
+    bbox = _bbox_arg()
+    zoom = _cluster_zoom()
+    direction = q.get("direction", "all").lower()
+    origin = (q.get("origin") or "").strip().upper()
+    dest = (q.get("dest") or "").strip().upper()
+    until = q.get("until")
+    start, end = _window(q)
+
+    Snap, Fl = Snapshot, Flow
+    sums = (Fl.origin, Fl.dest, Fl.direction, func.sum(Fl.legs), func.sum(Fl.weight_lbs))
+    if not until:
+        # Window ends now: each station's newest snapshot is its latest-snapshot
+        # pointer, so this is an indexed lookup instead of a GROUP BY max().
+        q = (
+            select(*sums)
+            .join(Station, Fl.snapshot_id == Station.last_snapshot_id)
+            .where(and_(Station.last_snapshot_at >= start, Station.last_snapshot_at <= end))
+        )
+    else:
+        # Arbitrary window: use only the *latest* snapshot per station inside it
         latest_sub = (
             select(
                 Snap.station_id,
@@ -228,10 +277,7 @@ def get_flows():
             .subquery()
         )
         q = (
-            select(
-                Fl.origin, Fl.dest, Fl.direction,
-                func.sum(Fl.legs), func.sum(Fl.weight_lbs)
-            )
+            select(*sums)
             .join(Snap, Fl.snapshot_id == Snap.id)
             .join(
                 latest_sub,
@@ -241,90 +287,213 @@ def get_flows():
                 )
             )
         )
-        where = []
-        if direction in ("inbound", "outbound"):
-            where.append(Fl.direction == direction)
-        if origin:
-            where.append(Fl.origin == origin)
-        if dest:
-            where.append(Fl.dest == dest)
-        if where:
-            q = q.where(and_(*where))
-        rows = s.execute(q.group_by(Fl.origin, Fl.dest, Fl.direction)).all()
-
-        data = [
-            {"origin": o, "dest": d, "direction": dr, "legs": int(legs or 0), "weight_lbs": float(w or 0.0)}
-            for (o, d, dr, legs, w) in rows
-        ]
-        return jsonify(data)
+    where = []
+    if direction in ("inbound", "outbound"):
+        where.append(Fl.direction == direction)
+    if origin:
+        where.append(Fl.origin == origin)
+    if dest:
+        where.append(Fl.dest == dest)
+    if where:
+        q = q.where(and_(*where))
+    q = q.group_by(Fl.origin, Fl.dest, Fl.direction)
+    if fmt == "geojson" or bbox or zoom is not None:
+        with ReadSession() as s:
+            rows = s.execute(q).all()
+        index = geo.airport_index()
+        if bbox:
+            rows = geo.rows_in_bbox(rows, index, bbox)
+        coords, labels = index.coords, None
+        if zoom is not None:
+            cl = index.clusters(zoom)
+            rows, coords, labels = cl.rows(rows), cl.coords, cl.labels
+        if fmt == "geojson":
+            fc = geo.route_features(rows, coords, labels)
+            if zoom is not None:
+                used = {c for r in rows for c in r[:2]}
+                fc["clusters"] = {c: _cluster_json(cl, c) for c in sorted(used)}
+            resp = jsonify(fc)
+            resp.mimetype = geo.GEOJSON
+            return resp
+        q = rows
+    if zoom is not None:
+        # Cluster ids alone can't be drawn: carry each end's position and members
+        return stream_rows(
+            q,
+            lambda r: {"origin": r[0], "dest": r[1], "direction": r[2],
+                       "legs": int(r[3] or 0), "weight_lbs": float(r[4] or 0.0),
+                       "origin_cluster": _cluster_json(cl, r[0]), "dest_cluster": _cluster_json(cl, r[1])},
+        )
+    return stream_rows(
+        q,
+        lambda r: {"origin": r[0], "dest": r[1], "direction": r[2],
+                   "legs": int(r[3] or 0), "weight_lbs": float(r[4] or 0.0)},
+    )
+
+def _cluster_json(cl: geo.Clusters, cid: str) -> dict:
+    return {"label": cl.labels[cid], "lat": cl.coords[cid][0], "lon": cl.coords[cid][1],
+            "size": len(cl.codes[cid]), "airports": cl.codes[cid][:8]}
+
+@api.get("/flows/history")
+@cached_json("flows")
+def get_flows_history():
+    """Legs and weight per route per time bucket, from the flow_rollup table.
+
+    Columnar: one shared `t` axis (bucket starts, epoch seconds) and per route
+    `legs`/`weight_lbs` arrays aligned with it; null = no data in that bucket.
+    """
+    q = request.args
+    size = rollup.parse_bucket(q.get("bucket", "5m"))
+    if size is None:
+        abort(400, description=f"bucket must be a multiple of {rollup.BUCKET_SECONDS}s (e.g. 5m, 1h, 1d)")
+    start, end = _window(q)
+    if end < start:
+        abort(400, description="until is before since")
+    if (end - start).total_seconds() / size > config.HISTORY_MAX_BUCKETS:
+        abort(400, description=f"Too many buckets (max {config.HISTORY_MAX_BUCKETS}); use a larger bucket")
+    with ReadSession() as s:
+        out = rollup.history(
+            s, start, end, size,
+            origin=(q.get("origin") or "").strip().upper(),
+            dest=(q.get("dest") or "").strip().upper(),
+            direction=q.get("direction", "all").lower(),
+        )
+    out["since"], out["until"] = start.isoformat(), end.isoformat()
+    return jsonify(out)
 
 @api.get("/stations")
+@cached_json("stations")
 def get_stations():
-    with SessionLocal() as s:
+    with ReadSession() as s:
         sts = s.execute(select(Station)).scalars().all()
-        return jsonify([
-            {
-                "name": st.name,
-                "last_seen_at": st.last_seen_at.isoformat() if st.last_seen_at else None,
-                "last_default_origin": st.last_default_origin,
-                "last_origin_lat": st.last_origin_lat,
-                "last_origin_lon": st.last_origin_lon,
-            } for st in sts
-        ])
+        return jsonify([station_json(st) for st in sts])
+
+@api.get("/stream")
+def stream():
+    # Server-Sent Events: replay changes since Last-Event-ID, then close
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    resp = Response(hub.stream(last_id), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+def _station_id(name: str) -> int:
+    with ReadSession() as s:
+        station_id = s.execute(
+            select(Station.id).where(Station.name == name.strip().upper())
+        ).scalar_one_or_none()
+    if station_id is None:
+        abort(404, description="Station not found")
+    return station_id
+
+# Returned by default, in this order; `id` only when asked for via fields=
+_FLIGHT_FIELDS = (
+    "flight_code", "tail", "direction", "origin", "dest", "cargo_type", "cargo_weight_lbs",
+    "takeoff_hhmm", "eta_hhmm", "is_ramp_entry", "complete", "remarks", "last_seen_at",
+)
+
+def _encode_cursor(last_seen_at: datetime, flight_id: int) -> str:
+    raw = f"{last_seen_at.isoformat()}|{flight_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, flight_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(flight_id)
+    except (ValueError, UnicodeDecodeError):
+        abort(400, description="Invalid cursor")
 
 @api.get("/stations/<name>/flights")
 def get_station_flights(name: str):
-    complete = request.args.get("complete", "open").lower()
-    since = request.args.get("since")
-    with SessionLocal() as s:
-        st = s.execute(select(Station).where(Station.name == name.strip().upper())).scalar_one_or_none()
-        if not st:
-            abort(404, description="Station not found")
-        q = select(Flight).where(Flight.station_id == st.id)
-        if complete == "open" or complete == "0":
-            q = q.where(Flight.complete == 0)
-        elif complete == "1" or complete == "true":
-            q = q.where(Flight.complete == 1)
-        if since:
-            try:
-                dt = datetime.fromisoformat(since.replace("Z","+00:00"))
-            except Exception:
-                abort(400, description="Invalid since")
-            q = q.where(Flight.last_seen_at >= dt)
-        q = q.order_by(Flight.last_seen_at.desc())
-        rows = s.execute(q).scalars().all()
-        return jsonify([{
-            "flight_code": r.flight_code,
-            "tail": r.tail,
-            "direction": r.direction,
-            "origin": r.origin,
-            "dest": r.dest,
-            "cargo_type": r.cargo_type,
-            "cargo_weight_lbs": r.cargo_weight_lbs,
-            "takeoff_hhmm": r.takeoff_hhmm,
-            "eta_hhmm": r.eta_hhmm,
-            "is_ramp_entry": r.is_ramp_entry,
-            "complete": r.complete,
-            "remarks": r.remarks,
-            "last_seen_at": r.last_seen_at.isoformat(),
-        } for r in rows])
+    """Flights newest first; ?limit=N pages by keyset on (last_seen_at, id).
+
+    The next page's cursor comes back in X-Next-Cursor (and a Link header);
+    pass it as ?cursor=. ?fields=a,b,... picks the columns returned.
+    """
+    args = request.args
+    complete = args.get("complete", "open").lower()
+    since = args.get("since")
+    fields = _FLIGHT_FIELDS
+    if args.get("fields"):
+        fields = tuple(f.strip() for f in args["fields"].split(",") if f.strip())
+        unknown = [f for f in fields if f not in _FLIGHT_FIELDS and f != "id"]
+        if unknown or not fields:
+            abort(400, description=f"Unknown fields: {', '.join(unknown)}" if unknown else "fields is empty")
+    limit = args.get("limit")
+    if limit is not None:
+        try:
+            limit = min(int(limit), config.FLIGHTS_PAGE_MAX)
+        except ValueError:
+            abort(400, description="Invalid limit")
+        if limit < 1:
+            abort(400, description="Invalid limit")
+    elif args.get("cursor"):
+        abort(400, description="cursor requires limit")
+
+    station_id = _station_id(name)
+    # Keys for the cursor are always selected; only `fields` are returned
+    cols = {f: getattr(Flight, f) for f in fields + ("last_seen_at", "id")}
+    q = select(*cols.values()).where(Flight.station_id == station_id)
+    if complete == "open" or complete == "0":
+        states = [Flight.complete == 0]
+    elif complete == "1" or complete == "true":
+        states = [Flight.complete == 1]
+    else:
+        # Anything other than 0/1 is unusual; its ranges are normally empty
+        states = [Flight.complete == 0, Flight.complete == 1, or_(Flight.complete < 0, Flight.complete > 1)]
+    if since:
+        try:
+            dt = datetime.fromisoformat(since.replace("Z","+00:00"))
+        except Exception:
+            abort(400, description="Invalid since")
+        q = q.where(Flight.last_seen_at >= dt)
+    if args.get("cursor"):
+        ts, last_id = _decode_cursor(args["cursor"])
+        # (last_seen_at, id) < cursor, written so the <= bound is an index range
+        q = q.where(Flight.last_seen_at <= ts, or_(Flight.last_seen_at < ts, Flight.id < last_id))
+    q = q.order_by(Flight.last_seen_at.desc(), Flight.id.desc())
+
+    def row(r):
+        d = {f: getattr(r, f) for f in fields}
+        if "last_seen_at" in d:
+            d["last_seen_at"] = r.last_seen_at.isoformat()
+        return d
+
+    if limit is None:
+        if len(states) == 1:
+            q = q.where(states[0])
+        return stream_rows(q, row)
+
+    # One index range scan per complete state (station_id, complete,
+    # last_seen_at), merged here, rather than sorting the station's history
+    with ReadSession() as s:
+        runs = [s.execute(q.where(state).limit(limit + 1)).all() for state in states]
+    key = lambda r: (r.last_seen_at, r.id)  # noqa: E731
+    page = list(islice(heapq.merge(*runs, key=key, reverse=True), limit + 1))
+    more = len(page) > limit
+    page = page[:limit]
+    resp = stream_rows(page, row)
+    if more:
+        cursor = _encode_cursor(page[-1].last_seen_at, page[-1].id)
+        resp.headers["X-Next-Cursor"] = cursor
+        nxt = request.args.copy()
+        nxt["cursor"] = cursor
+        resp.headers["Link"] = f'<{request.path}?{urlencode(list(nxt.items(multi=True)))}>; rel="next"'
+    return resp
 
 @api.get("/stations/<name>/inventory")
 def get_station_inventory(name: str):
-    with SessionLocal() as s:
-        st = s.execute(select(Station).where(Station.name == name.strip().upper())).scalar_one_or_none()
-        if not st:
-            abort(404, description="Station not found")
-        rows = s.execute(
-            select(InventoryItem)
-            .where(InventoryItem.station_id == st.id)
-            .order_by(InventoryItem.category.asc().nullsfirst(), InventoryItem.item.asc())
-        ).scalars().all()
-        return jsonify([{
-            "category": r.category,
-            "category_id": r.category_id,
-            "item": r.item,
-            "qty": r.qty,
-            "weight_lbs": r.weight_lbs,
-            "updated_at": r.updated_at.isoformat(),
-        } for r in rows])
+    station_id = _station_id(name)
+    q = (
+        select(InventoryItem.category, InventoryItem.category_id, InventoryItem.item,
+               InventoryItem.qty, InventoryItem.weight_lbs, InventoryItem.updated_at)
+        .where(InventoryItem.station_id == station_id)
+        .order_by(InventoryItem.category.asc().nullsfirst(), InventoryItem.item.asc())
+    )
+
+    def row(r):
+        d = r._asdict()
+        d["updated_at"] = r.updated_at.isoformat()
+        return d
+    return stream_rows(q, row)
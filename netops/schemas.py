@@ -1,8 +1,12 @@
 # netops/schemas.py
 from __future__ import annotations
-from typing import List, Optional, Literal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Literal
 from datetime import datetime
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Extra, Field, validator
+from pydantic.datetime_parse import parse_datetime
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+from pydantic.typing import all_literal_values, is_literal_type
 
 Direction = Literal["inbound", "outbound"]
 
@@ -68,3 +72,163 @@ class IngestSnapshot(BaseModel):
     flows: List[FlowRow] = Field(default_factory=list)
     manifests: List[ManifestRow] = Field(default_factory=list)
     inventory: List[InventoryItem] = Field(default_factory=list)
+
+# Delta protocol: changes relative to the station's last accepted snapshot
+class FlowKey(BaseModel):
+    origin: str
+    dest: str
+    direction: Direction
+
+class FlowDelta(BaseModel):
+    upsert: List[FlowRow] = Field(default_factory=list)   # replaces every row with the same key
+    remove: List[FlowKey] = Field(default_factory=list)
+
+class InventoryKey(BaseModel):
+    category: Optional[str] = None
+    item: str
+
+class InventoryDelta(BaseModel):
+    upsert: List[InventoryItem] = Field(default_factory=list)
+    remove: List[InventoryKey] = Field(default_factory=list)
+
+class IngestDelta(BaseModel):
+    station: str
+    generated_at: datetime
+    base_generated_at: datetime  # generated_at of the last snapshot the server accepted
+    default_origin: Optional[str] = None
+    origin_coords: Optional[OriginCoords] = None
+    inventory_last_update: Optional[str] = None
+    window_hours: Optional[int] = None  # None = same as base
+    flows: FlowDelta = Field(default_factory=FlowDelta)
+    manifests: List[ManifestRow] = Field(default_factory=list)  # new/changed only; same upsert rules
+    inventory: InventoryDelta = Field(default_factory=InventoryDelta)
+
+# --- ingest fast path --------------------------------------------------------
+# parse_obj() runs pydantic's full validator chain on every manifest and
+# inventory row. parse_fast() first checks whether each value is already
+# what that chain would return (exact str/int/float types, a valid Literal,
+# a datetime string, HHMM that the field validator accepts) and if so builds
+# the models with construct(). Anything else -- including every invalid
+# payload -- goes through parse_obj(), so results and errors are unchanged.
+
+class _Slow(Exception):
+    """Value isn't in canonical form; use the regular pydantic path."""
+
+_parse_dt = lru_cache(maxsize=1024)(parse_datetime)
+_IMMUTABLE = (type(None), bool, int, float, str)
+
+def _scalar_check(tp, field) -> Callable[[Any], Any]:
+    if tp is str or tp is int:
+        def check(v):
+            if type(v) is not tp:
+                raise _Slow
+            return v
+    elif tp is float:
+        def check(v):
+            t = type(v)
+            if t is float:
+                return v
+            if t is int:
+                return float(v)
+            raise _Slow
+    elif tp is datetime:
+        def check(v):
+            try:
+                # Rows usually repeat a few timestamps; datetimes are immutable
+                return _parse_dt(v) if type(v) is str else parse_datetime(v)
+            except (TypeError, ValueError):
+                raise _Slow
+    elif is_literal_type(tp):
+        choices = frozenset(all_literal_values(tp))
+
+        def check(v):
+            if type(v) is not str or v not in choices:
+                raise _Slow
+            return v
+    elif isinstance(tp, type) and issubclass(tp, BaseModel):
+        return _model_check(tp)
+    else:
+        raise TypeError(f"no fast path for {field.name}: {tp!r}")
+    return check
+
+def _field_check(model, field) -> Callable[[Any], Any]:
+    if field.pre_validators or (field.sub_fields and field.shape != SHAPE_LIST):
+        raise TypeError(f"no fast path for {field.name}")
+    check = _scalar_check(field.type_, field)
+    if field.shape == SHAPE_LIST:
+        item = check
+
+        def check(v):
+            if type(v) is not list:
+                raise _Slow
+            return [item(x) for x in v]
+    elif field.shape != SHAPE_SINGLETON:
+        raise TypeError(f"no fast path for {field.name}")
+    validators = list(field.class_validators.values())
+    if any(val.pre or val.each_item for val in validators):
+        raise TypeError(f"no fast path for {field.name}")
+    funcs = [val.func for val in validators]
+    allow_none, inner = field.allow_none, check
+
+    def check(v):
+        if v is None:
+            if not allow_none:
+                raise _Slow
+        else:
+            v = inner(v)
+        for fn in funcs:
+            try:
+                v = fn(model, v)
+            except (TypeError, ValueError, AssertionError):
+                raise _Slow
+        return v
+    return check
+
+_checks: Dict[type, Callable[[Any], BaseModel]] = {}
+
+def _model_check(model) -> Callable[[Any], BaseModel]:
+    if model in _checks:
+        return _checks[model]
+    if model.__pre_root_validators__ or model.__post_root_validators__ or model.__config__.extra != Extra.ignore:
+        raise TypeError(f"no fast path for {model.__name__}")
+    fields = []
+    for name, f in model.__fields__.items():
+        # Defaults as construct()/parse_obj produce them: constants shared,
+        # anything mutable made fresh per instance
+        if f.default_factory is None and isinstance(f.default, _IMMUTABLE):
+            default = (lambda d: lambda: d)(f.default)
+        else:
+            default = f.get_default
+        fields.append((name, f.alias, f.required, _field_check(model, f), default))
+
+    def check(obj):
+        if type(obj) is not dict:
+            raise _Slow
+        values, given = {}, set()
+        for name, alias, required, fn, default in fields:
+            if alias in obj:
+                values[name] = fn(obj[alias])
+                given.add(name)
+            elif required:
+                raise _Slow
+            else:
+                values[name] = default()
+        # What construct() does, minus its per-field default lookups
+        m = model.__new__(model)
+        object.__setattr__(m, "__dict__", values)
+        object.__setattr__(m, "__fields_set__", given)
+        m._init_private_attributes()
+        return m
+    _checks[model] = check
+    return check
+
+def parse_fast(model, obj):
+    """Same result as model.parse_obj(obj), faster when obj is already clean."""
+    try:
+        check = _model_check(model)
+    except TypeError:  # a field type the fast path doesn't handle
+        return model.parse_obj(obj)
+    try:
+        return check(obj)
+    except _Slow:
+        return model.parse_obj(obj)
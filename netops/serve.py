@@ -0,0 +1,155 @@
+# netops/serve.py
+from __future__ import annotations
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict
+from sqlalchemy.engine import make_url
+
+from . import shared
+from .config import config
+
+# `python -m netops.serve`: WEB_WORKERS Waitress processes on one listening
+# socket (pre-fork), so request handling isn't bound to one core by the GIL.
+# The kernel spreads accepted connections across the workers. Database writes
+# stay correct with several processes: each worker has its own single writer
+# connection, and BEGIN IMMEDIATE + busy_timeout serialize them on the file.
+# POSIX only (fork).
+
+log = logging.getLogger("netops.serve")
+
+def default_state_path() -> str:
+    url = make_url(config.DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return os.path.join(os.path.dirname(os.path.abspath(url.database)), "netops_state.db")
+    return os.path.join(tempfile.gettempdir(), "netops_state.db")
+
+def _listen() -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in config.WEB_HOST else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((config.WEB_HOST, config.WEB_PORT))
+    sock.listen(1024)
+    return sock
+
+def _shutdown() -> None:
+    # Flush payloads the async ingest queue already acknowledged with 202,
+    # and let a running retention pass finish, before the process exits
+    from .ingest import ingest_queue
+    from .retention import stop_background
+    ingest_queue.stop()
+    stop_background()
+
+def _serve(**kw) -> None:
+    """Run Waitress until SIGTERM / SIGINT, then shut down cleanly.
+
+    Waitress turns the SystemExit / KeyboardInterrupt into a return from
+    run() after letting its threads finish the requests they are on; the
+    listening socket is closed before the ingest queue is drained.
+    """
+    from waitress import create_server
+    from .app import app
+    server = create_server(app, threads=config.WEB_THREADS, ident="netops", **kw)
+
+    def stop(_signum, _frame) -> None:
+        from .events import hub
+        hub.close()  # held streams would otherwise keep their threads busy
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.run()
+    finally:
+        server.close()
+        _shutdown()
+
+def _worker(index: int, sock: socket.socket) -> None:
+    # Runs in the forked child; never returns. os._exit skips atexit, so
+    # _serve's own shutdown is what flushes the ingest queue here.
+    code = 0
+    try:
+        os.environ["NETOPS_WORKER"] = str(index)
+        config.WORKER_INDEX = index
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles ^C
+        _serve(sockets=[sock])
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0
+    except BaseException:
+        log.exception("worker %d crashed", index)
+        code = 1
+    finally:
+        os._exit(code)
+
+def _bootstrap_db() -> None:
+    # Create tables once here rather than racing create_all in every worker,
+    # then drop the connection so no worker inherits it across fork
+    from .db import engine, init_db
+    init_db()
+    engine.dispose()
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    workers = max(1, config.WEB_WORKERS)
+    if workers > 1 and config.INGEST_ASYNC:
+        # The queue (and what it has handed to the writer) is per process: a
+        # delta could be checked against a worker that never saw its base
+        raise SystemExit("INGEST_ASYNC=1 needs WEB_WORKERS=1")
+    if workers > 1 and not config.SHARED_STATE_PATH:
+        config.SHARED_STATE_PATH = os.environ["SHARED_STATE_PATH"] = default_state_path()
+    if shared.enabled():
+        shared.init_store(config.SHARED_STATE_PATH)
+
+    if workers == 1:
+        _serve(host=config.WEB_HOST, port=config.WEB_PORT)
+        return
+
+    _bootstrap_db()
+    sock = _listen()
+    children: Dict[int, tuple] = {}  # pid -> (index, started_at)
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _worker(index, sock)
+        children[pid] = (index, time.monotonic())
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    log.info("serving on %s:%d with %d workers (state: %s)",
+             config.WEB_HOST, config.WEB_PORT, workers, config.SHARED_STATE_PATH)
+    for i in range(workers):
+        spawn(i)
+
+    failures = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index, started = children.pop(pid, (None, 0.0))
+        if index is None or stopping:
+            continue
+        # Respawn; back off if workers die right after starting
+        failures = failures + 1 if time.monotonic() - started < 5 else 0
+        log.warning("worker %d exited (status %d); restarting", index, status)
+        if failures:
+            time.sleep(min(30, 2 ** failures))
+        if not stopping:
+            spawn(index)
+    sock.close()
+
+if __name__ == "__main__":
+    main()
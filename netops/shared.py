@@ -0,0 +1,166 @@
+# netops/shared.py
+from __future__ import annotations
+import secrets
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+from limits.storage import Storage
+
+from .config import config
+
+# Cross-process state for multi-worker serving (netops.serve, WEB_WORKERS > 1):
+# cache generations, rate-limit counters, the live-event log and each worker's
+# metrics, kept in a small SQLite file of their own (SHARED_STATE_PATH) so they
+# never queue behind ingest on the main database's write lock. Unused with one
+# worker.
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, gen INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS limits (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS metrics (worker INTEGER PRIMARY KEY, samples TEXT NOT NULL);
+"""
+
+def enabled() -> bool:
+    return bool(config.SHARED_STATE_PATH)
+
+def _connect(path: str) -> sqlite3.Connection:
+    # Autocommit; every operation below is a single statement
+    c = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    c.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=OFF")  # nothing here needs to survive a crash
+    return c
+
+def _conn() -> sqlite3.Connection:
+    # One connection per thread (and per process: never carried across fork)
+    c = getattr(_local, "conn", None)
+    if c is None:
+        c = _local.conn = _connect(config.SHARED_STATE_PATH)
+    return c
+
+def init_store(path: str) -> None:
+    """Create the state file for a new serving run (called once, before workers start).
+
+    Generations and limits carry over; the event log restarts under a new
+    epoch so browsers resync, and metrics start over with the new workers.
+    """
+    c = _connect(path)
+    try:
+        c.executescript(_SCHEMA)
+        c.execute("DELETE FROM events")
+        c.execute("DELETE FROM metrics")
+        c.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('epoch', ?)", (secrets.token_hex(4),))
+    finally:
+        c.close()
+
+# --- cache generations (see cache.generation / cache.bump) ---
+
+def generation(*tables: str) -> Tuple[int, ...]:
+    rows = dict(_conn().execute(
+        f"SELECT name, gen FROM generations WHERE name IN ({','.join('?' * len(tables))})", tables
+    ).fetchall())
+    return tuple(rows.get(t, 0) for t in tables)
+
+def bump(*tables: str) -> None:
+    _conn().executemany(
+        "INSERT INTO generations (name, gen) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET gen = gen + 1",
+        [(t,) for t in tables],
+    )
+
+# --- live events (see events.SharedEventHub) ---
+
+def epoch() -> str:
+    row = _conn().execute("SELECT v FROM meta WHERE k = 'epoch'").fetchone()
+    return row[0] if row else "0"
+
+def append_event(kind: str, payload: str, keep: int) -> int:
+    c = _conn()
+    seq = c.execute("INSERT INTO events (kind, payload) VALUES (?, ?)", (kind, payload)).lastrowid
+    if seq % 64 == 0:  # trim now and then, not on every publish
+        c.execute("DELETE FROM events WHERE seq <= ?", (seq - keep,))
+    return seq
+
+def last_event_seq() -> int:
+    row = _conn().execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+    return row[0] if row else 0
+
+def events_since(seq: int, keep: int) -> Tuple[List[tuple], bool]:
+    """-> (events after seq, gap); gap = some were already trimmed (or fell out of `keep`)."""
+    head = last_event_seq()
+    if head - seq > keep:
+        return [], True
+    rows = _conn().execute("SELECT seq, kind, payload FROM events WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+    if head > seq and (not rows or rows[0][0] != seq + 1):
+        return [], True
+    return rows, False
+
+# --- metrics (see metrics.render) ---
+
+def put_metrics(worker: int, samples: str) -> None:
+    _conn().execute("INSERT OR REPLACE INTO metrics (worker, samples) VALUES (?, ?)", (worker, samples))
+
+def worker_metrics() -> List[Tuple[int, str]]:
+    return _conn().execute("SELECT worker, samples FROM metrics ORDER BY worker").fetchall()
+
+# --- rate limits ---
+
+class SQLiteLimitStorage(Storage):
+    """flask-limiter / limits storage on the shared state file (fixed window).
+
+    Selected with RATELIMIT_STORAGE_URI = "netops+sqlite://", which app.py
+    sets when SHARED_STATE_PATH is configured, so every worker counts against
+    the same LOGIN_RATE / INGEST_RATE.
+    """
+
+    STORAGE_SCHEME = ["netops+sqlite"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._purged = 0.0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        if now - self._purged > 60:
+            self._purged = now
+            _conn().execute("DELETE FROM limits WHERE expires <= ?", (now,))
+        # One statement, so concurrent workers can't lose an increment
+        return _conn().execute(
+            """
+            INSERT INTO limits (key, count, expires) VALUES (?1, ?2, ?3 + ?4)
+            ON CONFLICT(key) DO UPDATE SET
+              count = CASE WHEN expires <= ?3 THEN ?2 ELSE count + ?2 END,
+              expires = CASE WHEN expires <= ?3 THEN ?3 + ?4 ELSE expires END
+            RETURNING count
+            """,
+            (key, amount, now, expiry),
+        ).fetchone()[0]
+
+    def get(self, key: str) -> int:
+        row = _conn().execute("SELECT count FROM limits WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = _conn().execute("SELECT expires FROM limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            _conn().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        return _conn().execute("DELETE FROM limits").rowcount
+
+    def clear(self, key: str) -> None:
+        _conn().execute("DELETE FROM limits WHERE key = ?", (key,))
@@ -0,0 +1,72 @@
+# netops/streaming.py
+from __future__ import annotations
+import json
+from functools import partial
+from typing import Any, Callable, Iterator, Optional
+from flask import Response, request
+from sqlalchemy.sql import Executable
+from .codec import NDJSON_TYPES
+from .db import read_engine
+
+# Large list endpoints: run a Core select on the read pool and write rows out
+# as they are fetched, so memory stays flat however many rows match.
+
+NDJSON = "application/x-ndjson"
+# Same bytes jsonify() produces (sorted keys, compact, ASCII)
+_dumps = partial(json.dumps, sort_keys=True, separators=(",", ":"))
+
+def wants_ndjson() -> bool:
+    best = request.accept_mimetypes.best_match(("application/json",) + NDJSON_TYPES)
+    return best in NDJSON_TYPES
+
+class _RowStream:
+    """Iterable response body that owns its connection; close() returns it."""
+
+    def __init__(self, source, to_json: Callable[[Any], dict], ndjson: bool, chunk: int):
+        self.to_json = to_json
+        self.ndjson = ndjson
+        self.conn = None
+        if not isinstance(source, Executable):  # rows already fetched (e.g. one page)
+            self.parts = [source] if source else []
+            return
+        # Execute now so query errors surface as a normal 500, not a cut-off body
+        self.conn = read_engine.connect()
+        try:
+            self.parts = self.conn.execute(source).partitions(chunk)
+        except Exception:
+            self.conn.close()
+            raise
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            to_json, first = self.to_json, True
+            if not self.ndjson:
+                yield "["
+            for part in self.parts:
+                if self.ndjson:
+                    yield "".join(_dumps(to_json(r)) + "\n" for r in part)
+                else:
+                    body = ",".join(_dumps(to_json(r)) for r in part)
+                    yield body if first else "," + body
+                    first = False
+            if not self.ndjson:
+                yield "]\n"
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+def stream_rows(source, to_json: Callable[[Any], dict], ndjson: Optional[bool] = None,
+                chunk: int = 500) -> Response:
+    """Stream rows as a JSON array, or NDJSON if the client Accepts it.
+
+    `source` is a select (run on the read pool while streaming) or a list of
+    rows already fetched.
+    """
+    ndjson = wants_ndjson() if ndjson is None else ndjson
+    resp = Response(_RowStream(source, to_json, ndjson, chunk), mimetype=NDJSON if ndjson else "application/json")
+    resp.headers["Vary"] = "Accept"
+    return resp
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# scripts/bench.py
+"""Synthetic feeder load + latency benchmark.
+
+Builds a throwaway SQLite DB with N stations, then drives /api/login,
+/api/ingest, /api/flows and /api/stations from concurrent writer and reader
+threads, either in-process (Flask test client) or over HTTP against a local
+Waitress server. Reports throughput and p50/p95/p99 latency per operation.
+
+  python scripts/bench.py --stations 50 --duration 30 --out bench.json
+  python scripts/bench.py --baseline bench.json --tolerance 0.2   # exit 1 on regression
+
+The workload settings are stored with the results; comparing against a
+baseline taken with different settings only prints a warning.
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import json
+import os
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN = "bench-admin"
+PASSWORD = "bench-pw"
+AIRPORTS = [("KSEA", 47.4502, -122.3088), ("KBFI", 47.5350, -122.3120), ("KPAE", 47.9063, -122.2820),
+            ("KGEG", 47.6199, -117.5339), ("KPSC", 46.2647, -119.1190), ("KYKM", 46.5682, -120.5440),
+            ("KALW", 46.0949, -118.2880), ("KELN", 47.0330, -120.5300)]
+WORKLOAD_KEYS = ("stations", "manifests", "inventory", "flows", "writers", "readers",
+                 "login_every", "server", "sqlite_production", "ingest_async")
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--stations", type=int, default=20)
+    p.add_argument("--manifests", type=int, default=20, help="manifests per snapshot")
+    p.add_argument("--inventory", type=int, default=30, help="inventory items per snapshot")
+    p.add_argument("--flows", type=int, default=6, help="flow rows per snapshot")
+    p.add_argument("--writers", type=int, default=4, help="threads posting /api/ingest")
+    p.add_argument("--readers", type=int, default=8, help="threads reading /api/flows and /api/stations")
+    p.add_argument("--login-every", type=int, default=50, help="writers re-login every N ingests (0 = never)")
+    p.add_argument("--duration", type=float, default=15.0, help="seconds of load after warm-up")
+    p.add_argument("--warmup", type=float, default=2.0)
+    p.add_argument("--server", choices=("test", "waitress"), default="test")
+    p.add_argument("--waitress-threads", type=int, default=16)
+    p.add_argument("--ingest-async", action="store_true", help="run with INGEST_ASYNC=1")
+    p.add_argument("--no-sqlite-production", action="store_true", help="run with SQLITE_PRODUCTION=0")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--db", help="SQLite file to use (default: a temp file)")
+    p.add_argument("--out", help="write results JSON here")
+    p.add_argument("--baseline", help="compare against this results JSON; exit 1 on regression")
+    p.add_argument("--tolerance", type=float, default=0.15,
+                   help="allowed fractional slowdown of p95/p99 and drop in throughput")
+    args = p.parse_args()
+    args.sqlite_production = not args.no_sqlite_production
+    return args
+
+def configure_env(args) -> str:
+    # Must happen before netops is imported: config is read at import time
+    db = args.db or os.path.join(tempfile.mkdtemp(prefix="netops-bench-"), "netops.db")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db}",
+        "ADMIN_PASSWORD": ADMIN,
+        "LOGIN_RATE": "1000000 per second",
+        "INGEST_RATE": "1000000 per second",
+        "RETENTION_INTERVAL_MINUTES": "0",
+        "INGEST_ASYNC": "1" if args.ingest_async else "0",
+        "SQLITE_PRODUCTION": "1" if args.sqlite_production else "0",
+    })
+    sys.path.insert(0, ROOT)
+    return db
+
+# --- transports -------------------------------------------------------------
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        r = self.client.open(path, method=method, data=body, headers=headers or {})
+        return r.status_code, r.get_data()
+
+class HttpTransport:
+    # One keep-alive connection per thread, like a feeder or a browser tab
+    def __init__(self, port: int):
+        self.port = port
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            r = self.conn.getresponse()
+            return r.status, r.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            raise
+
+def start_waitress(app, threads: int) -> int:
+    from waitress.server import create_server
+    srv = create_server(app, host="127.0.0.1", port=0, threads=threads)
+    threading.Thread(target=srv.run, name="bench-waitress", daemon=True).start()
+    return srv.effective_port
+
+# --- workload ---------------------------------------------------------------
+
+def seed(stations: list) -> None:
+    from netops.auth import hash_password
+    from netops.db import SessionLocal
+    from netops.models import Airport, Station
+    pw_hash = hash_password(PASSWORD)  # one argon2 hash shared by every station
+    with SessionLocal() as s:
+        for name in stations:
+            s.add(Station(name=name, password_hash=pw_hash, token_salt=secrets.token_hex(8)))
+        for code, lat, lon in AIRPORTS:
+            s.merge(Airport(code=code, lat=lat, lon=lon))
+        s.commit()
+
+def snapshot(args, rng: random.Random, name: str, home: tuple) -> dict:
+    code, lat, lon = home
+    others = [a[0] for a in AIRPORTS if a[0] != code]
+    flows = []
+    for i in range(args.flows):
+        dest = others[i % len(others)]
+        outbound = i % 2 == 0
+        flows.append({"origin": code if outbound else dest, "dest": dest if outbound else code,
+                      "direction": "outbound" if outbound else "inbound",
+                      "legs": rng.randint(0, 5), "weight_lbs": round(rng.uniform(0, 2000), 1)})
+    manifests = [{
+        "flight_code": f"{name}{i:04d}", "tail": f"N{name}{i}", "origin": code,
+        "dest": others[i % len(others)], "direction": "outbound",
+        "cargo_type": rng.choice(("Mixed", "Food", "Medical")),
+        "cargo_weight_lbs": round(rng.uniform(0, 500), 1),
+        "takeoff_hhmm": f"{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}",
+        "complete": int(rng.random() < 0.3),
+    } for i in range(args.manifests)]
+    inventory = [{"category": f"Cat{i % 5}", "item": f"item{i}", "qty": rng.randint(0, 100),
+                  "weight_lbs": round(rng.uniform(0, 50), 1)} for i in range(args.inventory)]
+    return {
+        "station": name, "generated_at": datetime.now(timezone.utc).isoformat(),
+        "default_origin": code, "origin_coords": {"lat": lat, "lon": lon},
+        "window_hours": 24, "flows": flows, "manifests": manifests, "inventory": inventory,
+    }
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lat = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    def call(self, op: str, transport, method: str, path: str, body=None, headers=None, ok=(200,)):
+        t0 = time.perf_counter()
+        try:
+            status, data = transport.request(method, path, body, headers)
+        except Exception:
+            status, data = None, b""
+        ms = (time.perf_counter() - t0) * 1000
+        if self.recording:
+            with self.lock:
+                if status in ok:
+                    self.lat[op].append(ms)
+                else:
+                    self.errors[op] += 1
+        return status, data
+
+def login(rec: Recorder, tr, name: str):
+    status, data = rec.call("login", tr, "POST", "/api/login",
+                            json.dumps({"station": name, "password": PASSWORD}),
+                            {"Content-Type": "application/json"})
+    return json.loads(data)["token"] if status == 200 else None
+
+def writer(args, rec, make_transport, stations, stop, wid):
+    rng = random.Random(args.seed * 1000 + wid)
+    tr = make_transport()
+    mine = stations[wid::args.writers] or stations
+    tokens = {}
+    n = 0
+    while not stop.is_set():
+        name = rng.choice(mine)
+        if name not in tokens or (args.login_every and n % args.login_every == 0):
+            tokens[name] = login(rec, tr, name)
+        body = json.dumps(snapshot(args, rng, name, AIRPORTS[stations.index(name) % len(AIRPORTS)]))
+        rec.call("ingest", tr, "POST", "/api/ingest", body,
+                 {"Content-Type": "application/json", "Authorization": f"Bearer {tokens[name]}"},
+                 ok=(200, 202))
+        n += 1
+
+def reader(args, rec, make_transport, stop, rid):
+    rng = random.Random(args.seed * 2000 + rid)
+    tr = make_transport()
+    paths = [("flows", "/api/flows?hours=24"), ("flows", "/api/flows?hours=24&direction=outbound"),
+             ("stations", "/api/stations")]
+    while not stop.is_set():
+        op, path = rng.choice(paths)
+        rec.call(op, tr, "GET", path)
+
+# --- reporting --------------------------------------------------------------
+
+def percentile(sorted_ms: list, q: float) -> float:
+    # Nearest-rank
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, int(round(q * len(sorted_ms) + 0.5)) - 1))
+    return sorted_ms[k]
+
+def summarize(rec: Recorder, elapsed: float) -> dict:
+    ops = {}
+    for op in sorted(set(rec.lat) | set(rec.errors)):
+        ms = sorted(rec.lat[op])
+        ops[op] = {
+            "count": len(ms), "errors": rec.errors[op],
+            "throughput": round(len(ms) / elapsed, 2),
+            "p50_ms": round(percentile(ms, 0.50), 3),
+            "p95_ms": round(percentile(ms, 0.95), 3),
+            "p99_ms": round(percentile(ms, 0.99), 3),
+            "max_ms": round(ms[-1], 3) if ms else 0.0,
+        }
+    total = sum(o["count"] for o in ops.values())
+    return {"elapsed_s": round(elapsed, 3), "throughput": round(total / elapsed, 2), "ops": ops}
+
+def print_table(res: dict) -> None:
+    print(f"{'op':<10}{'count':>8}{'err':>6}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for op, o in res["ops"].items():
+        print(f"{op:<10}{o['count']:>8}{o['errors']:>6}{o['throughput']:>10.1f}"
+              f"{o['p50_ms']:>10.2f}{o['p95_ms']:>10.2f}{o['p99_ms']:>10.2f}{o['max_ms']:>10.2f}")
+    print(f"total {res['throughput']:.1f} req/s over {res['elapsed_s']:.1f}s")
+
+def compare(res: dict, base: dict, tol: float) -> list:
+    """-> regressions (empty if within tolerance)."""
+    if base.get("workload") != res["workload"]:
+        print("warning: baseline was recorded with a different workload:", base.get("workload"))
+    out = []
+    for op, b in base.get("ops", {}).items():
+        o = res["ops"].get(op)
+        if o is None:
+            out.append(f"{op}: missing from this run")
+            continue
+        for k in ("p95_ms", "p99_ms"):
+            if b[k] > 0 and o[k] > b[k] * (1 + tol):
+                out.append(f"{op} {k}: {o[k]:.2f} vs baseline {b[k]:.2f} (+{(o[k] / b[k] - 1) * 100:.0f}%)")
+        if b["throughput"] > 0 and o["throughput"] < b["throughput"] * (1 - tol):
+            out.append(f"{op} throughput: {o['throughput']:.1f} vs baseline {b['throughput']:.1f} "
+                       f"(-{(1 - o['throughput'] / b['throughput']) * 100:.0f}%)")
+        if o["errors"] > b.get("errors", 0):
+            out.append(f"{op} errors: {o['errors']} vs baseline {b.get('errors', 0)}")
+    return out
+
+def main() -> int:
+    args = parse_args()
+    db = configure_env(args)
+    from netops.app import app
+    from netops.ingest import ingest_queue
+
+    stations = [f"B{i:03d}" for i in range(args.stations)]
+    seed(stations)
+    if args.server == "waitress":
+        port = start_waitress(app, args.waitress_threads)
+        make_transport = lambda: HttpTransport(port)  # noqa: E731
+    else:
+        make_transport = lambda: TestClientTransport(app)  # noqa: E731
+
+    rec = Recorder()
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer, args=(args, rec, make_transport, stations, stop, i), daemon=True)
+               for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(args, rec, make_transport, stop, i), daemon=True)
+                for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.warmup)
+    rec.recording = True
+    t0 = time.perf_counter()
+    time.sleep(args.duration)
+    rec.recording = False
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for t in threads:
+        t.join(30)
+    ingest_queue.stop()
+
+    res = summarize(rec, elapsed)
+    res["workload"] = {k: getattr(args, k) for k in WORKLOAD_KEYS}
+    res["recorded_at"] = datetime.now(timezone.utc).isoformat()
+    res["db"] = db
+    print_table(res)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2, sort_keys=True)
+        print(f"wrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        bad = compare(res, base, args.tolerance)
+        if bad:
+            print(f"REGRESSION (tolerance {args.tolerance:.0%}):")
+            for line in bad:
+                print("  " + line)
+            return 1
+        print(f"within {args.tolerance:.0%} of baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# scripts/bench_schemas.py
+"""Microbenchmark: ingest decode + validation, regular vs fast path.
+
+  python scripts/bench_schemas.py --manifests 2000 --inventory 2000
+
+Times json.loads vs codec.json_loads (orjson when installed) and
+IngestSnapshot.parse_obj vs schemas.parse_fast on one synthetic payload, and
+checks both paths produce the same snapshot.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from netops.codec import json_loads, orjson  # noqa: E402
+from netops.schemas import IngestSnapshot, parse_fast  # noqa: E402
+
+def payload(n_manifests: int, n_inventory: int, n_flows: int) -> bytes:
+    return json.dumps({
+        "station": "SEA", "generated_at": "2026-10-16T01:00:00Z", "default_origin": "KSEA",
+        "origin_coords": {"lat": 47.45, "lon": -122.3}, "window_hours": 24,
+        "flows": [{"origin": "KSEA", "dest": f"K{i:03d}", "direction": "outbound", "legs": i % 7,
+                   "weight_lbs": i * 1.5} for i in range(n_flows)],
+        "manifests": [{"flight_code": f"SEA{i:05d}", "tail": f"N{i}", "direction": "outbound",
+                       "origin": "KSEA", "dest": "KBFI", "cargo_type": "Mixed", "cargo_weight_lbs": i % 500,
+                       "remarks": "", "takeoff_hhmm": f"{i % 24:02d}{i % 60:02d}", "eta_hhmm": "930",
+                       "complete": i % 2, "updated_at": "2026-10-16T00:59:00Z"} for i in range(n_manifests)],
+        "inventory": [{"category": f"Cat{i % 9}", "item": f"item{i}", "qty": i % 40, "weight_lbs": 1.25,
+                       "updated_at": "2026-10-16T00:00:00Z"} for i in range(n_inventory)],
+    }).encode()
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--manifests", type=int, default=2000)
+    p.add_argument("--inventory", type=int, default=2000)
+    p.add_argument("--flows", type=int, default=200)
+    p.add_argument("--repeat", type=int, default=10)
+    args = p.parse_args()
+
+    raw = payload(args.manifests, args.inventory, args.flows)
+    obj = json.loads(raw)
+    if parse_fast(IngestSnapshot, obj) != IngestSnapshot.parse_obj(obj):
+        print("fast path result differs from parse_obj", file=sys.stderr)
+        return 1
+
+    rows = [
+        ("json.loads", best_of(lambda: json.loads(raw), args.repeat)),
+        (f"json_loads ({'orjson' if orjson else 'stdlib'})", best_of(lambda: json_loads(raw), args.repeat)),
+        ("parse_obj", best_of(lambda: IngestSnapshot.parse_obj(obj), args.repeat)),
+        ("parse_fast", best_of(lambda: parse_fast(IngestSnapshot, obj), args.repeat)),
+        ("json.loads + parse_obj", best_of(lambda: IngestSnapshot.parse_obj(json.loads(raw)), args.repeat)),
+        ("json_loads + parse_fast", best_of(lambda: parse_fast(IngestSnapshot, json_loads(raw)), args.repeat)),
+    ]
+    print(f"payload: {len(raw)} bytes, {args.manifests} manifests, {args.inventory} inventory, "
+          f"{args.flows} flows (best of {args.repeat})")
+    for name, ms in rows:
+        print(f"  {name:<28}{ms:>10.2f} ms")
+    print(f"validation speedup {rows[2][1] / rows[3][1]:.1f}x, end to end {rows[4][1] / rows[5][1]:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,29 @@
 // static/js/map.js
 let map;
-let airports = new Map();
+let airports = new Map();     // code -> [lat, lon]; filled from flow features, visible airports on demand
+let airportsBbox = null;      // bbox the last /api/airports fetch covered
+let flowsBbox = null;         // bbox of the flows on screen
+let flowsZoom = null;         // zoom they were requested for
+let flowsClustered = false;   // drawn lines join airport clusters (low zoom), not airports
+let moveTimer = 0;
 let polylines = [];
-let lastFlowRows = [];
-let stationMarkers = [];
+let lastFlowRows = [];        // pair rows drawn last (see pairsFromFeatures / pairsFromRows)
+let flowRowsByKey = new Map(); // "O|D|DIR" -> raw /api/flows row (patched by the live stream)
+let stationEntries = new Map(); // name -> { marker, st, pos, color, html }
+let flowTableRows = new Map();  // "O|D" -> { tr, cells } (patched in place)
+let lastStationRows = null;     // last /api/stations body (a 304 returns the same object)
+let lastFlowsBody = null;       // likewise for /api/flows
+let autoTimer = 0;
+let liveStream = null;
 let stationsLayer = null;
 let flowsPane = 'flows';
 let stationsPane = 'stations';
 let flowBeads = [];           // { marker, a:LatLng, b:LatLng, t:number }
 let animRAF = 0;
 let lastAnimTs = 0;
+let flowCanvas = null;        // FlowCanvas layer when the canvas renderer is selected
+const etagCache = new Map();  // url -> { etag, data } for conditional GETs (LRU)
+const ETAG_CACHE_MAX = 32;    // one entry per bbox/window seen; keep the recent ones
 
 // UI helpers
 const $ = (id) => document.getElementById(id);
@@ -18,6 +32,10 @@ const axisFilter = () => ($('axisFilter')?.value || 'all');
 const animateDots = () => !!$('animateDots')?.checked;
 const ballsMax = () => Math.max(1, Math.min(12, parseInt($('ballsMax')?.value || '6')));
 const weightAtMax = () => Math.max(1, parseFloat($('weightAtMax')?.value || '10000'));
+const autoRefresh = () => !!$('autoRefresh')?.checked;
+const AUTO_REFRESH_MS = 30000;  // conditional GETs; unchanged data costs a 304
+const STATUS_AGE_MS = 10000;    // re-age station colors between fetches
+const useCanvas = () => ($('renderer')?.value || 'canvas') === 'canvas';
 
 function clearLines(){
   for(const pl of polylines){ pl.remove(); }
@@ -27,6 +45,7 @@ function clearLines(){
 // Cardinal palette (avoid green/yellow/red reserved for station status)
 const CARDINAL_COLORS = { E:'#f97316', W:'#6366f1', N:'#14b8a6', S:'#ec4899' };
 const MONO_COLOR = '#cbd5e1';
+const BEAD_SPEED_PX_PER_SEC = 90; // fixed; number-of-beads represents volume
 
 function widthFor(weight){
   if (!weight || weight <= 0) return 1;
@@ -72,18 +91,88 @@ function buildOppositeDirMap(rows){
   return m;
 }
 
+// GET JSON with If-None-Match; on 304 reuse the body we already parsed.
+async function fetchJson(url){
+  const prev = etagCache.get(url);
+  const headers = prev ? { 'If-None-Match': prev.etag } : {};
+  const r = await fetch(url, { headers, cache: 'no-store' });
+  if (r.status === 304 && prev) return prev.data;
+  if (!r.ok) throw new Error(`${url}: HTTP ${r.status}`);
+  const data = await r.json();
+  const etag = r.headers.get('ETag');
+  if (etag){
+    etagCache.delete(url);
+    etagCache.set(url, { etag, data });
+    if (etagCache.size > ETAG_CACHE_MAX) etagCache.delete(etagCache.keys().next().value);
+  }
+  return data;
+}
+
+// Visible area (plus a margin) as "minLon,minLat,maxLon,maxLat", snapped
+// outward to a zoom-dependent step so small pans reuse the same request.
+function viewBbox(){
+  const b = map.getBounds().pad(0.25);
+  const step = Math.max(0.25, 90 / Math.pow(2, map.getZoom()));
+  const snap = (v, f, lo, hi) => Math.max(lo, Math.min(hi, f(v / step) * step));
+  return [
+    snap(b.getWest(), Math.floor, -180, 180), snap(b.getSouth(), Math.floor, -90, 90),
+    snap(b.getEast(), Math.ceil, -180, 180), snap(b.getNorth(), Math.ceil, -90, 90),
+  ].map(v => +v.toFixed(4)).join(',');
+}
+
+// Airports in view: only needed for codes the flow features didn't carry
+// (a live-stream route or a station without coordinates).
 async function ensureAirports(){
-  if (airports.size) return;
-  const r = await fetch('/api/airports');
-  const rows = await r.json();
+  const bbox = viewBbox();
+  if (airportsBbox === bbox) return;
+  const rows = await fetchJson(`/api/airports?bbox=${bbox}`);
   for (const a of rows){ airports.set(a.code.toUpperCase(), [a.lat, a.lon]); }
+  airportsBbox = bbox;
+}
+
+// /api/flows?format=geojson features -> pair rows ready to draw: endpoints
+// and forward/reverse presence are resolved by the server.
+// Clustered features (?zoom= below the server's CLUSTER_MAX_ZOOM) are shown
+// by their labels, e.g. "KSEA +4".
+function pairsFromFeatures(fc){
+  const pairs = [];
+  for (const f of fc.features || []){
+    const p = f.properties;
+    const [[alon, alat], [blon, blat]] = f.geometry.coordinates;
+    if (!fc.clusters){
+      airports.set(p.origin, [alat, alon]);
+      airports.set(p.dest, [blat, blon]);
+    }
+    pairs.push({ origin:p.origin_label || p.origin, dest:p.dest_label || p.dest, legs:p.legs, weight_lbs:p.weight_lbs,
+                 a:[alat, alon], b:[blat, blon], both:p.both });
+  }
+  return pairs;
+}
+
+// Same shape from raw rows (after live-stream patches), joined client-side
+function pairsFromRows(rows){
+  const agg = aggregateByPair(rows);
+  const opp = buildOppositeDirMap(agg);
+  const pairs = [];
+  for (const r of agg){
+    const a = airports.get(r.origin), b = airports.get(r.dest);
+    if (!a || !b) continue;
+    const key = (r.origin < r.dest) ? `${r.origin}|${r.dest}` : `${r.dest}|${r.origin}`;
+    const f = opp.get(key) || {forward:false, reverse:false};
+    pairs.push({ ...r, a, b, both: f.forward && f.reverse });
+  }
+  // Same order as the server's features (by route id), so table rows stay put
+  pairs.sort((x, y) => (x.origin + '-' + x.dest).localeCompare(y.origin + '-' + y.dest));
+  return pairs;
 }
 
 // Compute primary cardinal direction from A -> B in SCREEN space
 // (guarantees what you see matches the color)
 function primaryCardinal(A, B){
-  const p1 = map.latLngToLayerPoint(A);
-  const p2 = map.latLngToLayerPoint(B);
+  return cardinalOf(map.latLngToLayerPoint(A), map.latLngToLayerPoint(B));
+}
+
+function cardinalOf(p1, p2){
   const dx = p2.x - p1.x;   // right is positive
   const dy = p2.y - p1.y;   // down is positive
   if (Math.abs(dx) >= Math.abs(dy)) return dx >= 0 ? 'E' : 'W';
@@ -92,16 +181,60 @@ function primaryCardinal(A, B){
 
 function segmentWithOffset(A, B, offsetPx){
   if (!offsetPx) return [A, B];
-  const p1 = map.latLngToLayerPoint(A);
-  const p2 = map.latLngToLayerPoint(B);
+  const [q1, q2] = offsetPoints(map.latLngToLayerPoint(A), map.latLngToLayerPoint(B), offsetPx);
+  return [map.layerPointToLatLng(q1), map.layerPointToLatLng(q2)];
+}
+
+// Shift a layer-point segment sideways by offsetPx
+function offsetPoints(p1, p2, offsetPx){
   const dx = p2.x - p1.x, dy = p2.y - p1.y;
   const len = Math.hypot(dx, dy) || 1;
   // Perpendicular unit normal
   const nx = -dy / len, ny = dx / len;
   const offx = nx * offsetPx, offy = ny * offsetPx;
-  const A2 = map.layerPointToLatLng(L.point(p1.x + offx, p1.y + offy));
-  const B2 = map.layerPointToLatLng(L.point(p2.x + offx, p2.y + offy));
-  return [A2, B2];
+  return [L.point(p1.x + offx, p1.y + offy), L.point(p2.x + offx, p2.y + offy)];
+}
+
+// How one pair is drawn at the current zoom, shared by both renderers:
+// color, width, side offset and bead count (null = hidden by the axis filter).
+function routeStyle(r, p1, p2){
+  const weightPx = widthFor(r.weight_lbs);
+  // Cardinal (based on true endpoints, not offset)
+  const card = cardinalOf(p1, p2); // 'E','W','N','S'
+  // Axis filter
+  const ax = axisFilter();
+  if (ax !== 'all'){
+    if (ax === 'east'  && card !== 'E') return null;
+    if (ax === 'west'  && card !== 'W') return null;
+    if (ax === 'north' && card !== 'N') return null;
+    if (ax === 'south' && card !== 'S') return null;
+  }
+  const color = (colorMode() === 'mono') ? MONO_COLOR : (CARDINAL_COLORS[card] || MONO_COLOR);
+  // If both directions exist for this unordered pair, split them (axis-agnostic).
+  let offset = 0;
+  if (r.both){
+    const z = map.getZoom?.() ?? 8;
+    // Scaled separation that tightens at high zoom and never exceeds ~2× line width.
+    let zoomFactor = 1 - (z - 7) * 0.07;           // z=7 →1.0, z=10 →~0.79
+    zoomFactor = Math.max(0.65, Math.min(1.2, zoomFactor));
+    const minSep = Math.max(3, weightPx * 0.75);
+    const maxSep = Math.max(minSep, weightPx * 2);
+    const sep    = Math.min(maxSep, Math.max(minSep, weightPx * 1.2 * zoomFactor));
+    // Deterministic side by current cardinal: E/N = +, W/S = −
+    offset = ((card === 'E' || card === 'N') ? 1 : -1) * sep;
+  }
+  // Animated beads (directional)
+  let beads = 0;
+  if (animateDots() && r.weight_lbs > 0){
+    const mx = ballsMax();
+    beads = Math.max(1, Math.min(mx, Math.ceil((r.weight_lbs / weightAtMax()) * mx)));
+  }
+  return {
+    card, color, weightPx, offset, beads,
+    // bead diameter = 2× line width  → radius = line width (with a small floor)
+    beadRadius: Math.max(2, weightPx),
+    tip: `${r.origin} → ${r.dest} (${card})\nlegs: ${r.legs}, weight: ${r.weight_lbs.toFixed(1)} lbs`,
+  };
 }
 
 // Build a map of unordered pairs -> which *cardinal directions* are present in view.
@@ -159,7 +292,6 @@ function createBeads(A, B, color, count, radius, tip){
 function startBeadAnimation(){
   if (!animateDots() || flowBeads.length === 0) return;
   lastAnimTs = 0;
-  const SPEED_PX_PER_SEC = 90; // fixed; number-of-beads represents volume
   function step(ts){
     if (!lastAnimTs) lastAnimTs = ts;
     const dt = Math.min(0.05, (ts - lastAnimTs) / 1000); // cap for stability
@@ -169,7 +301,7 @@ function startBeadAnimation(){
       const p2 = map.latLngToLayerPoint(b.b);
       const dx = p2.x - p1.x, dy = p2.y - p1.y;
       const len = Math.hypot(dx, dy) || 1;
-      const advance = (SPEED_PX_PER_SEC * dt) / len; // fraction of segment per tick
+      const advance = (BEAD_SPEED_PX_PER_SEC * dt) / len; // fraction of segment per tick
       b.t += advance;
       if (b.t > 1) b.t -= 1;
       const nx = p1.x + dx * b.t;
@@ -181,99 +313,292 @@ function startBeadAnimation(){
   animRAF = requestAnimationFrame(step);
 }
 
-function drawFlows(rows){
+// One segment per origin→dest pair (pairsFromFeatures / pairsFromRows)
+function drawFlows(pairs){
+  lastFlowRows = pairs;
+  if (useCanvas()){
+    clearLines();
+    clearBeads();
+    if (!flowCanvas) flowCanvas = new FlowCanvas();
+    if (!map.hasLayer(flowCanvas)) flowCanvas.addTo(map);
+    flowCanvas.setPairs(pairs);
+    return;
+  }
+  if (flowCanvas && map.hasLayer(flowCanvas)) flowCanvas.remove();
   clearLines();
   clearBeads(); // avoid bead accumulation across refreshes/control changes
-  // Aggregate by origin→dest so we render a single segment per city-pair
-  const agg = aggregateByPair(rows);
-  lastFlowRows = agg;
-  // For separation: split whenever both directions exist for an unordered pair
-  const opp = buildOppositeDirMap(agg);
 
-  for (const r of agg){
-    const A = airports.get(r.origin?.toUpperCase());
-    const B = airports.get(r.dest?.toUpperCase());
-    if (!A || !B) continue; // need both endpoints
-    const weightPx = widthFor(r.weight_lbs);
-    // Cardinal (based on true endpoints, not offset)
-    const A0 = L.latLng(A[0], A[1]);
-    const B0 = L.latLng(B[0], B[1]);
-    const card = primaryCardinal(A0, B0); // 'E','W','N','S'
-    // Axis filter
-    const ax = axisFilter();
-    if (ax !== 'all'){
-      if (ax === 'east'  && card !== 'E') continue;
-      if (ax === 'west'  && card !== 'W') continue;
-      if (ax === 'north' && card !== 'N') continue;
-      if (ax === 'south' && card !== 'S') continue;
-    }
-    const lineColor = (colorMode() === 'mono') ? MONO_COLOR : (CARDINAL_COLORS[card] || MONO_COLOR);
-    // If both directions exist for this unordered pair, split them (axis-agnostic).
-    const o = (r.origin || '').toUpperCase();
-    const d = (r.dest   || '').toUpperCase();
-    const key = (o < d) ? `${o}|${d}` : `${d}|${o}`;
-    const dirFlags = opp.get(key) || {forward:false, reverse:false};
-    const bothPresent = dirFlags.forward && dirFlags.reverse;
-    let A2 = A0, B2 = B0;
-    if (bothPresent){
-      const z = map.getZoom?.() ?? 8;
-      // Scaled separation that tightens at high zoom and never exceeds ~2× line width.
-      let zoomFactor = 1 - (z - 7) * 0.07;           // z=7 →1.0, z=10 →~0.79
-      zoomFactor = Math.max(0.65, Math.min(1.2, zoomFactor));
-      const minSep = Math.max(3, weightPx * 0.75);
-      const maxSep = Math.max(minSep, weightPx * 2);
-      const sep    = Math.min(maxSep, Math.max(minSep, weightPx * 1.2 * zoomFactor));
-      // Deterministic side by current cardinal: E/N = +, W/S = −
-      const sgn = (card === 'E' || card === 'N') ? 1 : -1;
-      [A2, B2] = segmentWithOffset(A0, B0, sgn * sep);
-    }
+  for (const r of pairs){
+    const A0 = L.latLng(r.a[0], r.a[1]);
+    const B0 = L.latLng(r.b[0], r.b[1]);
+    const st = routeStyle(r, map.latLngToLayerPoint(A0), map.latLngToLayerPoint(B0));
+    if (!st) continue;
+    const [A2, B2] = segmentWithOffset(A0, B0, st.offset);
     const pl = L.polyline([A2, B2], {
-      weight: weightPx,
-      color: lineColor,
+      weight: st.weightPx,
+      color: st.color,
       opacity: 0.9,
       pane: flowsPane
     });
-    const tip = `${r.origin} → ${r.dest} (${card})\nlegs: ${r.legs}, weight: ${r.weight_lbs.toFixed(1)} lbs`;
-    pl.bindTooltip(tip, { sticky:true, opacity:0.95, direction:'auto', offset:[12,0], className:'flow-tip' });
+    pl.bindTooltip(st.tip, { sticky:true, opacity:0.95, direction:'auto', offset:[12,0], className:'flow-tip' });
     pl.addTo(map);
     polylines.push(pl);
-
-    // Animated beads (directional)
-    if (animateDots() && r.weight_lbs > 0){
-      const mx = ballsMax();
-      const wMax = weightAtMax();
-      const count = Math.max(1, Math.min(mx, Math.ceil((r.weight_lbs / wMax) * mx)));
-      // bead diameter = 2× line width  → radius = line width (with a small floor)
-      const beadRadius = Math.max(2, weightPx);
-      createBeads(A2, B2, lineColor, count, beadRadius, tip);
-    }
+    if (st.beads) createBeads(A2, B2, st.color, st.beads, st.beadRadius, st.tip);
   }
   // keep markers on top (pane ordering also enforces this)
   startBeadAnimation();
 }
 
-async function refresh(){
-  await ensureAirports();
+// Canvas renderer: every flow line and bead on one <canvas> in the flows
+// pane, animated by a single requestAnimationFrame loop. Screen geometry
+// (cardinal, offset, length) is cached per route in layer points and is
+// recomputed only for routes whose data changed, or for all on zoom.
+const CANVAS_PAD = 0.1;  // draw this much beyond the view (as Leaflet's renderers do)
+
+const FlowCanvas = L.Layer.extend({
+  initialize(){
+    this._routes = new Map();  // "O|D" -> { sig, r, st, p1, p2, len, beads:[t] }
+    this._settings = '';
+    this._raf = 0;
+    this._lastTs = 0;
+  },
+
+  onAdd(map){
+    this._canvas = L.DomUtil.create('canvas', 'flow-canvas leaflet-zoom-hide');
+    this._ctx = this._canvas.getContext('2d');
+    map.getPane(flowsPane).appendChild(this._canvas);
+    this._tip = L.tooltip({ opacity:0.95, direction:'auto', offset:[12,0], className:'flow-tip' });
+    this._hovered = null;
+    this._resize();
+    this._reproject();
+  },
+
+  onRemove(map){
+    this._stop();
+    map.closeTooltip(this._tip);
+    L.DomUtil.remove(this._canvas);
+    this._routes = new Map();
+    this._settings = '';
+  },
+
+  getEvents(){
+    return {
+      zoomend: this._reproject,
+      viewreset: this._reproject,
+      moveend: this._resize,
+      resize: this._resize,
+      mousemove: this._hover,
+      mouseout: this._unhover,
+    };
+  },
+
+  // Diff against the routes already drawn; unchanged ones keep their
+  // geometry and bead phases.
+  setPairs(pairs){
+    const settings = [colorMode(), axisFilter(), animateDots(), ballsMax(), weightAtMax()].join('|');
+    const all = settings !== this._settings;
+    this._settings = settings;
+    const seen = new Set();
+    for (const r of pairs){
+      const key = `${r.origin}|${r.dest}`;
+      const sig = `${r.legs}|${r.weight_lbs}|${r.both}|${r.a}|${r.b}`;
+      seen.add(key);
+      const e = this._routes.get(key);
+      if (e && e.sig === sig && !all) continue;
+      this._routes.set(key, this._layout(r, sig, e));
+    }
+    for (const key of this._routes.keys()){
+      if (!seen.has(key)) this._routes.delete(key);
+    }
+    this._kick();
+  },
+
+  _layout(r, sig, prev){
+    const p1 = this._map.latLngToLayerPoint(r.a);
+    const p2 = this._map.latLngToLayerPoint(r.b);
+    const st = routeStyle(r, p1, p2);
+    const e = { sig, r, st, p1, p2, len: 1, beads: prev?.beads || [] };
+    if (!st) return e;
+    [e.p1, e.p2] = offsetPoints(p1, p2, st.offset);
+    e.len = e.p1.distanceTo(e.p2) || 1;
+    if (e.beads.length !== st.beads){
+      e.beads = Array.from({ length: st.beads }, (_, i) => i / st.beads);
+    }
+    return e;
+  },
+
+  _reproject(){
+    for (const [key, e] of this._routes) this._routes.set(key, this._layout(e.r, e.sig, e));
+    this._resize();
+  },
+
+  // Canvas covers the view plus padding; its top-left sits at _origin (layer point)
+  _resize(){
+    const size = this._map.getSize();
+    const pad = size.multiplyBy(CANVAS_PAD).round();
+    const full = size.add(pad.multiplyBy(2));
+    const dpr = window.devicePixelRatio || 1;
+    this._origin = this._map.containerPointToLayerPoint(pad.multiplyBy(-1)).round();
+    L.DomUtil.setPosition(this._canvas, this._origin);
+    if (this._canvas.width !== full.x * dpr || this._canvas.height !== full.y * dpr){
+      this._canvas.width = full.x * dpr;
+      this._canvas.height = full.y * dpr;
+      this._canvas.style.width = `${full.x}px`;
+      this._canvas.style.height = `${full.y}px`;
+    }
+    this._dpr = dpr;
+    this._kick();
+  },
+
+  // Draw now; keep the loop running only while there are beads to move
+  _kick(){
+    this._stop();
+    this._draw();
+    if (animateDots() && Array.from(this._routes.values()).some(e => e.st && e.beads.length)){
+      this._raf = requestAnimationFrame((ts) => this._step(ts));
+    }
+  },
+
+  _stop(){
+    if (this._raf){ cancelAnimationFrame(this._raf); this._raf = 0; }
+    this._lastTs = 0;
+  },
+
+  _step(ts){
+    if (!this._lastTs) this._lastTs = ts;
+    const dt = Math.min(0.05, (ts - this._lastTs) / 1000); // cap for stability
+    this._lastTs = ts;
+    for (const e of this._routes.values()){
+      const advance = (BEAD_SPEED_PX_PER_SEC * dt) / e.len; // fraction of segment per tick
+      for (let i = 0; i < e.beads.length; i++){
+        e.beads[i] += advance;
+        if (e.beads[i] > 1) e.beads[i] -= 1;
+      }
+    }
+    this._draw();
+    this._raf = requestAnimationFrame((t) => this._step(t));
+  },
+
+  _draw(){
+    const ctx = this._ctx, o = this._origin;
+    ctx.setTransform(this._dpr, 0, 0, this._dpr, -o.x * this._dpr, -o.y * this._dpr);
+    ctx.clearRect(o.x, o.y, this._canvas.width / this._dpr, this._canvas.height / this._dpr);
+    ctx.globalAlpha = 0.9;
+    ctx.lineCap = 'round';
+    for (const e of this._routes.values()){
+      if (!e.st) continue;
+      ctx.strokeStyle = e.st.color;
+      ctx.lineWidth = e.st.weightPx;
+      ctx.beginPath();
+      ctx.moveTo(e.p1.x, e.p1.y);
+      ctx.lineTo(e.p2.x, e.p2.y);
+      ctx.stroke();
+    }
+    ctx.globalAlpha = 0.95;
+    for (const e of this._routes.values()){
+      if (!e.st || !e.beads.length) continue;
+      const dx = e.p2.x - e.p1.x, dy = e.p2.y - e.p1.y;
+      ctx.fillStyle = e.st.color;
+      ctx.beginPath();
+      for (const t of e.beads){
+        const x = e.p1.x + dx * t, y = e.p1.y + dy * t;
+        ctx.moveTo(x + e.st.beadRadius, y);
+        ctx.arc(x, y, e.st.beadRadius, 0, 2 * Math.PI);
+      }
+      ctx.fill();
+    }
+  },
+
+  // Tooltips: hit-test the cached segments instead of per-layer listeners
+  _hover(ev){
+    const p = ev.layerPoint;
+    let best = null, bestD = Infinity;
+    for (const e of this._routes.values()){
+      if (!e.st) continue;
+      const d = L.LineUtil.pointToSegmentDistance(p, e.p1, e.p2);
+      if (d <= Math.max(4, e.st.beadRadius + 2) && d < bestD){ best = e; bestD = d; }
+    }
+    if (!best){ this._unhover(); return; }
+    if (this._hovered !== best){
+      this._hovered = best;
+      this._tip.setContent(best.st.tip);
+    }
+    this._map.openTooltip(this._tip, ev.latlng);
+  },
+
+  _unhover(){
+    if (!this._hovered) return;
+    this._hovered = null;
+    this._map.closeTooltip(this._tip);
+  },
+});
+
+// force: redraw even if the server says nothing changed (control changes)
+async function refresh(force = false){
   const hours = document.getElementById('hours').value;
   const url = new URL('/api/flows', window.location.origin);
   url.searchParams.set('hours', hours);
   // Ignore inbound/outbound entirely; always request all rows
   url.searchParams.set('direction', 'all');
-  const r = await fetch(url.toString());
-  const rows = await r.json();
-  drawFlows(rows);
+  url.searchParams.set('format', 'geojson');
+  // Only routes touching or crossing the visible area
+  flowsBbox = viewBbox();
+  url.searchParams.set('bbox', flowsBbox);
+  // Zoomed out, the server merges airports into clusters (O(clusters²) lines)
+  flowsZoom = map.getZoom();
+  url.searchParams.set('zoom', flowsZoom);
+  const fc = await fetchJson(url.toString());
+  if (fc === lastFlowsBody && !force) return;  // 304: keep what's drawn (and live patches)
+  lastFlowsBody = fc;
+  flowsClustered = !!fc.clusters;
+  // Per-direction rows stay keyed for live-stream patches
+  flowRowsByKey = new Map();
+  for (const f of fc.features || []){
+    const p = f.properties;
+    for (const [dir, t] of Object.entries(p.directions)){
+      flowRowsByKey.set(`${p.origin}|${p.dest}|${dir}`, { origin:p.origin, dest:p.dest, direction:dir, ...t });
+    }
+  }
+  renderFlows(pairsFromFeatures(fc));
+}
 
-  // simple table
+function renderFlows(pairs){
+  drawFlows(pairs);
+  updateFlowTable(pairs);
+}
+
+// Simple table, keyed by route: rows are created once, cells rewritten only
+// when their text changes, and rows for routes that went away are removed.
+function updateFlowTable(pairs){
   const div = document.getElementById('flows-table');
-  div.innerHTML = '<table class="tbl"><thead><tr><th>Origin</th><th>Dest</th><th>Card</th><th>Legs</th><th>Weight (lbs)</th></tr></thead><tbody></tbody></table>';
-  const tb = div.querySelector('tbody');
-  for (const x of aggregateByPair(rows)){
-    const A = airports.get(x.origin?.toUpperCase());
-    const B = airports.get(x.dest?.toUpperCase());
-    const card = (A && B) ? primaryCardinal(L.latLng(A[0],A[1]), L.latLng(B[0],B[1])) : '—';
-    const tr = document.createElement('tr');
-    tr.innerHTML = `<td>${x.origin}</td><td>${x.dest}</td><td>${card}</td><td>${x.legs}</td><td>${x.weight_lbs.toFixed(1)}</td>`;
-    tb.appendChild(tr);
+  let tb = div.querySelector('tbody');
+  if (!tb){
+    div.innerHTML = '<table class="tbl"><thead><tr><th>Origin</th><th>Dest</th><th>Card</th><th>Legs</th><th>Weight (lbs)</th></tr></thead><tbody></tbody></table>';
+    tb = div.querySelector('tbody');
+    flowTableRows = new Map();
+  }
+  const seen = new Set();
+  let prev = null;
+  for (const x of pairs){
+    const key = `${x.origin}|${x.dest}`;
+    const card = primaryCardinal(L.latLng(x.a[0],x.a[1]), L.latLng(x.b[0],x.b[1]));
+    const cells = [x.origin, x.dest, card, String(x.legs), x.weight_lbs.toFixed(1)];
+    let e = flowTableRows.get(key);
+    if (!e){
+      const tr = document.createElement('tr');
+      for (let i = 0; i < cells.length; i++) tr.appendChild(document.createElement('td'));
+      e = { tr, cells: [] };
+      flowTableRows.set(key, e);
+    }
+    cells.forEach((c, i) => { if (e.cells[i] !== c) e.tr.children[i].textContent = c; });
+    e.cells = cells;
+    const at = prev ? prev.nextSibling : tb.firstChild;
+    if (at !== e.tr) tb.insertBefore(e.tr, at);
+    prev = e.tr;
+    seen.add(key);
+  }
+  for (const [key, e] of flowTableRows){
+    if (!seen.has(key)){ e.tr.remove(); flowTableRows.delete(key); }
   }
 }
 
@@ -302,61 +627,194 @@ function markerRadiusForZoom(z){
   return Math.max(12, Math.min(30, px));     // clamp for sanity
 }
 
-async function drawStations(){
-  const r = await fetch('/api/stations');
-  const rows = await r.json();
-  await ensureAirports();
+// Markers are keyed by station name: created once, then patched in place
+async function drawStations(force = false){
+  const rows = await fetchJson('/api/stations');
+  if (rows === lastStationRows && !force) return;  // 304
+  lastStationRows = rows;
+  if (rows.some(st => !stationLatLon(st))) await ensureAirports();
+  if (!stationsLayer){
+    stationsLayer = L.layerGroup(undefined, {pane: stationsPane});
+    stationsLayer.addTo(map);
+  }
+  const seen = new Set();
+  for (const st of rows){
+    upsertStationMarker(st);
+    seen.add(st.name);
+  }
+  for (const [name, e] of stationEntries){
+    if (!seen.has(name)){ e.marker.remove(); stationEntries.delete(name); }
+  }
+}
 
-  if (stationsLayer){
-    stationsLayer.remove();
-    stationMarkers = [];
+function stationLatLon(st){
+  let lat = st.last_origin_lat, lon = st.last_origin_lon;
+  if ((lat==null || lon==null) && st.last_default_origin){
+    const a = airports.get(st.last_default_origin.toUpperCase());
+    if (a){ lat = a[0]; lon = a[1]; }
   }
-  stationsLayer = L.layerGroup(undefined, {pane: stationsPane});
+  return (lat==null || lon==null) ? null : [lat, lon];
+}
 
-  const z = map.getZoom();
-  const rad = markerRadiusForZoom(z);
-  for (const st of rows){
-    let lat = st.last_origin_lat, lon = st.last_origin_lon;
-    if ((lat==null || lon==null) && st.last_default_origin){
-      const a = airports.get(st.last_default_origin.toUpperCase());
-      if (a){ lat = a[0]; lon = a[1]; }
+function stationPopupHtml(st, lat, lon){
+  const age = ageSeconds(st.last_seen_at);
+  const color = statusColorByAge(age);
+  const coords = `${lat.toFixed(5)}, ${lon.toFixed(5)}`;
+  const status = (age<=90) ? 'online' : (age<=300 ? 'idle' : 'offline');
+  return (
+    `<strong>${st.name}</strong><br>` +
+    `status: <span style="color:${color}">${status}</span><br>` +
+    `last seen: ${st.last_seen_at || '—'}<br>` +
+    `default origin: ${st.last_default_origin || '—'}<br>` +
+    `coords: ${coords}<br>` +
+    `<a href="/stations/${encodeURIComponent(st.name)}">view details</a>`
+  );
+}
+
+// Create or patch one station dot in place (used by full draws and live
+// events); Leaflet is only touched for what actually changed.
+function upsertStationMarker(st){
+  const pos = stationLatLon(st);
+  if (!pos || !stationsLayer) return;
+  const [lat, lon] = pos;
+  const color = statusColorByAge(ageSeconds(st.last_seen_at));
+  const html = stationPopupHtml(st, lat, lon);
+  let e = stationEntries.get(st.name);
+  if (e){
+    if (e.pos[0] !== lat || e.pos[1] !== lon) e.marker.setLatLng(pos);
+    if (e.color !== color) e.marker.setStyle({ fillColor: color });
+    if (e.html !== html) e.marker.setPopupContent(html);
+    Object.assign(e, { st, pos, color, html });
+    return;
+  }
+  const m = L.circleMarker(pos, {
+    radius: markerRadiusForZoom(map.getZoom()),
+    color: '#0b0d10',
+    weight: 1.5,
+    fillColor: color,
+    fillOpacity: 0.95,
+    pane: stationsPane
+  });
+  m.bindPopup(html);
+  m.on('click', () => m.openPopup());
+  m.addTo(stationsLayer);
+  stationEntries.set(st.name, { marker: m, st, pos, color, html });
+}
+
+// Status is a function of age: recolor dots as they go idle/offline
+// between fetches, without asking the server.
+function ageStations(){
+  for (const e of stationEntries.values()){
+    const color = statusColorByAge(ageSeconds(e.st.last_seen_at));
+    if (color === e.color) continue;
+    e.color = color;
+    e.html = stationPopupHtml(e.st, e.pos[0], e.pos[1]);
+    e.marker.setStyle({ fillColor: color });
+    e.marker.setPopupContent(e.html);
+  }
+}
+
+// Debounced refresh (map moves, clustered live updates)
+function refreshSoon(){
+  clearTimeout(moveTimer);
+  moveTimer = setTimeout(() => refresh().catch(err => console.warn('refresh failed', err)), 250);
+}
+
+// Polls while "Auto-refresh" is on; skipped while the tab is hidden
+function scheduleAutoRefresh(){
+  clearTimeout(autoTimer);
+  if (!autoRefresh()) return;
+  autoTimer = setTimeout(async () => {
+    if (!document.hidden){
+      try {
+        await drawStations();
+        await refresh();
+      } catch (err){
+        console.warn('auto-refresh failed', err);
+      }
     }
-    if (lat==null || lon==null) continue;
-    const age = ageSeconds(st.last_seen_at);
-    const color = statusColorByAge(age);
-    const m = L.circleMarker([lat, lon], {
-      radius: rad,
-      color: '#0b0d10',
-      weight: 1.5,
-      fillColor: color,
-      fillOpacity: 0.95,
-      pane: stationsPane
-    });
-    const coords = `${lat.toFixed(5)}, ${lon.toFixed(5)}`;
-    const status = (age<=90) ? 'online' : (age<=300 ? 'idle' : 'offline');
-    m.bindPopup(
-      `<strong>${st.name}</strong><br>` +
-      `status: <span style="color:${color}">${status}</span><br>` +
-      `last seen: ${st.last_seen_at || '—'}<br>` +
-      `default origin: ${st.last_default_origin || '—'}<br>` +
-      `coords: ${coords}<br>` +
-      `<a href="/stations/${encodeURIComponent(st.name)}">view details</a>`
-    );
-    m.on('click', () => m.openPopup());
-    m.addTo(stationsLayer);
-    stationMarkers.push(m);
+    scheduleAutoRefresh();
+  }, AUTO_REFRESH_MS);
+}
+
+// Same test the server applies to ?bbox= (geo.rows_in_bbox): does the
+// straight Mercator line a->b ([lat, lon] ends) touch "w,s,e,n"?
+// Liang-Barsky clipping, as in geo.segment_hits_bbox.
+function routeInBbox(a, b, bbox){
+  const [w, s, e, n] = bbox.split(',').map(Number);
+  const my = (lat) => Math.log(Math.tan(Math.PI / 4 + Math.max(-85.0511, Math.min(85.0511, lat)) * Math.PI / 360));
+  const x0 = a[1], y0 = my(a[0]), dx = b[1] - x0, dy = my(b[0]) - y0;
+  let t0 = 0, t1 = 1;
+  for (const [p, q] of [[-dx, x0 - w], [dx, e - x0], [-dy, y0 - my(s)], [dy, my(n) - y0]]){
+    if (p === 0){
+      if (q < 0) return false;
+      continue;
+    }
+    const t = q / p;
+    if (p < 0) t0 = Math.max(t0, t); else t1 = Math.min(t1, t);
+    if (t0 > t1) return false;
   }
-  stationsLayer.addTo(map);
+  return true;
+}
+
+// Apply one station's route contribution change: subtract what it added
+// before (if that snapshot was inside our window) and add the new one.
+// Only routes the last fetch would have returned for its bbox are kept.
+async function applyFlowEvent(ev){
+  // Cluster totals can't be patched from airport-level rows; refetch instead
+  if (flowsClustered){ refreshSoon(); return; }
+  if (!flowsBbox) return;  // nothing fetched yet
+  const windowSec = parseFloat($('hours')?.value || '24') * 3600;
+  const inWindow = (iso) => iso && ageSeconds(iso) <= windowSec;
+  const added = inWindow(ev.generated_at) ? ev.flows || [] : [];
+  if (added.some(([o, d]) => !airports.has(o) || !airports.has(d))) await ensureAirports();
+  let unplaced = false;
+  const patch = (rows, sign) => {
+    for (const [o, d, dir, legs, w] of rows || []){
+      const k = `${o}|${d}|${dir}`;
+      let r = flowRowsByKey.get(k);
+      if (!r){
+        // Nothing drawn to subtract from; a new route must be in the fetched bbox
+        if (sign < 0) continue;
+        const a = airports.get(o), b = airports.get(d);
+        if (!a || !b){ unplaced = true; continue; }
+        if (!routeInBbox(a, b, flowsBbox)) continue;
+        r = { origin:o, dest:d, direction:dir, legs:0, weight_lbs:0 };
+        flowRowsByKey.set(k, r);
+      }
+      r.legs += sign * legs;
+      r.weight_lbs += sign * w;
+      if (r.legs <= 0 && Math.abs(r.weight_lbs) < 1e-6) flowRowsByKey.delete(k);
+    }
+  };
+  if (inWindow(ev.prev_generated_at)) patch(ev.prev, -1);
+  patch(added, +1);
+  // An end outside the airports we know: let the server place the route
+  if (unplaced) refreshSoon();
+  renderFlows(pairsFromRows(Array.from(flowRowsByKey.values())));
+}
+
+function startLiveStream(){
+  if (!window.EventSource || liveStream) return;
+  liveStream = new EventSource('/api/stream');
+  liveStream.addEventListener('station', (e) => upsertStationMarker(JSON.parse(e.data)));
+  liveStream.addEventListener('flows', (e) => applyFlowEvent(JSON.parse(e.data)));
+  // Missed events (first connect, restart or buffer overrun): one full fetch
+  liveStream.addEventListener('resync', async () => {
+    await drawStations(true);
+    await refresh(true);
+  });
 }
 
 function updateMarkerSizes(){
   const z = map.getZoom();
   const r = markerRadiusForZoom(z);
-  for (const m of stationMarkers){
-    m.setRadius(r);
+  for (const e of stationEntries.values()){
+    e.marker.setRadius(r);
   }
-  // Redraw flows to keep offset measured in pixels correct for the new zoom.
-  if (lastFlowRows.length) drawFlows(lastFlowRows);
+  // Redraw flows to keep offset measured in pixels correct for the new zoom
+  // (the canvas renderer reprojects itself on zoomend).
+  if (lastFlowRows.length && !useCanvas()) drawFlows(lastFlowRows);
 }
 
 function renderLegendHtml(){
@@ -410,21 +868,31 @@ window.addEventListener('DOMContentLoaded', async () => {
   }).addTo(map);
 
   addLegendControl();
-  document.getElementById('refresh').addEventListener('click', refresh);
+  document.getElementById('refresh').addEventListener('click', () => refresh(true));
   // React to control changes without full page reload
-  ['axisFilter','colorMode','animateDots','ballsMax','weightAtMax','direction','hours'].forEach(id => {
+  ['axisFilter','colorMode','animateDots','ballsMax','weightAtMax','direction','hours','renderer'].forEach(id => {
     const el = $(id);
     if (el){
       el.addEventListener('change', async () => {
         if (map._legendDiv) map._legendDiv.innerHTML = renderLegendHtml();
-        await refresh();
+        await refresh(true);
       });
     }
   });
+  // Wall displays: /?auto=1 starts with auto-refresh on
+  if ($('autoRefresh') && new URLSearchParams(location.search).get('auto') === '1') $('autoRefresh').checked = true;
+  $('autoRefresh')?.addEventListener('change', scheduleAutoRefresh);
 
+  await refresh();  // fills airports for every routed code first
   await drawStations();
-  await refresh();
+  startLiveStream();
+  scheduleAutoRefresh();
+  setInterval(ageStations, STATUS_AGE_MS);
   map.on('zoomend', () => {
     updateMarkerSizes();
   });
+  // Fetch what came into view (or the new zoom's clusters) once the map settles
+  map.on('moveend', () => {
+    if (viewBbox() !== flowsBbox || map.getZoom() !== flowsZoom) refreshSoon();
+  });
 });
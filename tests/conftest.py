@@ -0,0 +1,35 @@
+# tests/conftest.py
+from __future__ import annotations
+import os
+import sys
+import tempfile
+
+# Config is read at import time: point the app at a throwaway database first
+_tmp = tempfile.mkdtemp(prefix="netops-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/netops.db")
+os.environ.setdefault("RETENTION_INTERVAL_MINUTES", "0")
+os.environ.setdefault("METRICS_ENABLED", "0")
+os.environ.setdefault("LOGIN_RATE", "10000 per hour")
+os.environ.setdefault("INGEST_RATE", "10000 per hour")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+@pytest.fixture(scope="session")
+def app():
+    from netops.app import app
+    app.config.update(TESTING=True)
+    return app
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+@pytest.fixture()
+def station(app):
+    """-> (name, password) of a fresh station."""
+    import secrets
+    from netops.cli import add_station
+    name, password = f"T{secrets.token_hex(3).upper()}", "pw-" + secrets.token_hex(4)
+    add_station(name, password)
+    return name.upper(), password
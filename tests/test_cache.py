@@ -0,0 +1,24 @@
+# tests/test_cache.py
+from __future__ import annotations
+
+from netops.config import config
+
+def test_streamed_list_cached_after_first_send(client):
+    assert client.post("/api/airports", json={"code": "KCCH", "lat": 47.0, "lon": -122.0}).status_code == 200
+    miss = client.get("/api/airports")
+    # Streamed straight out: no ETag until the body has been sent once
+    assert miss.status_code == 200 and "ETag" not in miss.headers
+    assert b"KCCH" in miss.data  # reads the body to the end
+    hit = client.get("/api/airports")
+    assert hit.data == miss.data and hit.headers["ETag"]
+    again = client.get("/api/airports", headers={"If-None-Match": hit.headers["ETag"]})
+    assert again.status_code == 304
+
+def test_large_streamed_body_not_cached(client, monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_CACHE_MAX_BODY", 16)
+    assert client.post("/api/airports", json={"code": "KCCX", "lat": 46.0, "lon": -121.0}).status_code == 200
+    first = client.get("/api/airports")
+    assert b"KCCX" in first.data
+    second = client.get("/api/airports")
+    assert second.data == first.data
+    assert "ETag" not in second.headers
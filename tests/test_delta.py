@@ -0,0 +1,40 @@
+# tests/test_delta.py
+from __future__ import annotations
+from sqlalchemy import select
+
+from netops.db import ReadSession
+from netops.models import Flow, Snapshot, Station
+
+def _login(client, station) -> dict:
+    name, password = station
+    token = client.post("/api/login", json={"station": name, "password": password}).get_json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_delta_with_offset_timestamps(client, station):
+    # A feeder on local time: every timestamp carries +05:00
+    name, _ = station
+    auth = _login(client, station)
+    r = client.post("/api/ingest", headers=auth, json={
+        "station": name, "generated_at": "2025-03-01T17:00:00+05:00",
+        "flows": [{"origin": "KSEA", "dest": "KBFI", "direction": "outbound", "legs": 2, "weight_lbs": 100}],
+    })
+    assert r.status_code == 200
+    r = client.post("/api/ingest", headers=auth, json={
+        "station": name, "generated_at": "2025-03-01T17:05:00+05:00",
+        "base_generated_at": "2025-03-01T17:00:00+05:00",
+        "flows": {"upsert": [{"origin": "KSEA", "dest": "KPAE", "direction": "outbound", "legs": 1}]},
+    })
+    assert r.status_code == 200, r.get_json()
+    with ReadSession() as s:
+        st = s.execute(select(Station).where(Station.name == name)).scalar_one()
+        # Stored as naive UTC
+        assert st.last_snapshot_at.isoformat() == "2025-03-01T12:05:00"
+        routes = s.execute(select(Flow.dest).where(Flow.snapshot_id == st.last_snapshot_id)).scalars().all()
+        assert sorted(routes) == ["KBFI", "KPAE"]
+        assert s.execute(select(Snapshot.generated_at).where(Snapshot.station_id == st.id)
+                         .order_by(Snapshot.generated_at)).scalars().first().isoformat() == "2025-03-01T12:00:00"
+    # The same base written as UTC is the same snapshot
+    r = client.post("/api/ingest", headers=auth, json={
+        "station": name, "generated_at": "2025-03-01T12:10:00Z", "base_generated_at": "2025-03-01T12:05:00Z",
+    })
+    assert r.status_code == 200, r.get_json()
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from netops.config import config
+from netops.events import EventHub
+
+
+def test_held_stream_pushes_events_until_hold_ends(monkeypatch):
+    monkeypatch.setattr(config, "STREAM_HOLD_SECONDS", 1.0)
+    monkeypatch.setattr(config, "STREAM_MAX_HOLDERS", 1)
+    hub = EventHub(16)
+    hub.publish("station", {"n": 0})
+    last_id = f"{hub.epoch}-1"
+
+    def publish_later():
+        for n in (1, 2):
+            time.sleep(0.1)
+            hub.publish("station", {"n": n})
+
+    threading.Thread(target=publish_later).start()
+    started = time.monotonic()
+    frames = list(hub.stream(last_id))
+    assert time.monotonic() - started >= 0.9
+    data = [f for f in frames if f.startswith("id:")]
+    assert [f.split("data: ")[1].strip() for f in data] == ['{"n":1}', '{"n":2}']
+    assert hub._holders == 0
+
+
+def test_streams_over_holder_limit_replay_and_close(monkeypatch):
+    monkeypatch.setattr(config, "STREAM_HOLD_SECONDS", 5.0)
+    monkeypatch.setattr(config, "STREAM_MAX_HOLDERS", 1)
+    hub = EventHub(16)
+    hub.publish("station", {"n": 0})
+    held = hub.stream(f"{hub.epoch}-0")
+    next(held), next(held)  # retry line, replayed event; now holding
+    started = time.monotonic()
+    frames = list(hub.stream(f"{hub.epoch}-0"))
+    assert time.monotonic() - started < 0.5
+    assert len(frames) == 2
+    held.close()
+    assert hub._holders == 0
+
+
+def test_close_ends_held_streams(monkeypatch):
+    monkeypatch.setattr(config, "STREAM_HOLD_SECONDS", 30.0)
+    monkeypatch.setattr(config, "STREAM_MAX_HOLDERS", 1)
+    hub = EventHub(16)
+    threading.Timer(0.2, hub.close).start()
+    started = time.monotonic()
+    list(hub.stream(None))
+    assert time.monotonic() - started < 2
+    assert hub._holders == 0
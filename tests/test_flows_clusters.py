@@ -0,0 +1,32 @@
+# tests/test_flows_clusters.py
+from __future__ import annotations
+from datetime import datetime, timezone
+
+def _setup(client, station):
+    for code, lat, lon in (("ZCA1", 40.01, -100.01), ("ZCA2", 40.02, -100.02), ("ZCB1", 30.0, -80.0)):
+        assert client.post("/api/airports", json={"code": code, "lat": lat, "lon": lon}).status_code == 200
+    name, password = station
+    token = client.post("/api/login", json={"station": name, "password": password}).get_json()["token"]
+    r = client.post("/api/ingest", headers={"Authorization": f"Bearer {token}"}, json={
+        "station": name, "generated_at": datetime.now(timezone.utc).isoformat(),
+        "flows": [{"origin": "ZCA1", "dest": "ZCB1", "direction": "outbound", "legs": 2},
+                  {"origin": "ZCA2", "dest": "ZCB1", "direction": "outbound", "legs": 3},
+                  {"origin": "ZCA1", "dest": "ZCA2", "direction": "outbound", "legs": 1}],
+    })
+    assert r.status_code == 200
+
+def test_clustered_json_rows_are_drawable(client, station):
+    _setup(client, station)
+    rows = [r for r in client.get("/api/flows?zoom=3").get_json() if "ZCB1" in r["dest_cluster"]["airports"]]
+    (row,) = rows  # ZCA1/ZCA2 merged; their route to each other is inside one cluster
+    assert row["legs"] == 5 and row["origin"].startswith("@3/")
+    oc, dc = row["origin_cluster"], row["dest_cluster"]
+    assert oc["airports"] == ["ZCA1", "ZCA2"] and oc["size"] == 2 and oc["label"] == "ZCA1 +1"
+    assert abs(oc["lat"] - 40.015) < 1e-9 and abs(oc["lon"] + 100.015) < 1e-9
+    assert dc["label"] == "ZCB1" and (dc["lat"], dc["lon"]) == (30.0, -80.0)
+
+def test_default_map_zoom_is_unclustered(client, station):
+    _setup(client, station)
+    rows = client.get("/api/flows?zoom=7&origin=ZCA1").get_json()
+    assert sorted((r["origin"], r["dest"]) for r in rows) == [("ZCA1", "ZCA2"), ("ZCA1", "ZCB1")]
+    assert all("origin_cluster" not in r for r in rows)
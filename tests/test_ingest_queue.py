@@ -0,0 +1,54 @@
+# tests/test_ingest_queue.py
+from __future__ import annotations
+from datetime import datetime, timedelta
+import pytest
+
+from netops.config import config
+from netops.ingest import IngestQueue
+from netops.schemas import IngestDelta, IngestSnapshot
+
+T0 = datetime(2025, 1, 1)
+
+@pytest.fixture()
+def queue(monkeypatch):
+    monkeypatch.setattr(config, "INGEST_QUEUE_MAX", 3)
+    q = IngestQueue()
+    monkeypatch.setattr(q, "_ensure_writer", lambda: None)  # keep everything queued
+    return q
+
+def _snap(minutes: int) -> IngestSnapshot:
+    return IngestSnapshot(station="A", generated_at=T0 + timedelta(minutes=minutes))
+
+def _delta(base: int, minutes: int) -> IngestDelta:
+    return IngestDelta(station="A", generated_at=T0 + timedelta(minutes=minutes),
+                       base_generated_at=T0 + timedelta(minutes=base))
+
+def test_deltas_count_against_queue_max(queue):
+    assert queue.submit(1, _snap(0), T0) == "queued"
+    assert queue.submit(1, _delta(0, 1), T0) == "queued"
+    assert queue.submit(1, _delta(1, 2), T0) == "queued"
+    assert queue.depth() == 3
+    # One station's delta chain can't grow past the bound
+    assert queue.submit(1, _delta(2, 3), T0) == "full"
+    assert queue.submit(2, _snap(0), T0) == "full"
+    # A newer snapshot from the same station replaces its chain
+    assert queue.submit(1, _snap(10), T0) == "queued"
+    assert queue.depth() == 1
+    assert queue.submit(2, _snap(0), T0) == "queued"
+    assert queue.depth() == 2
+
+def test_stop_writes_queued_snapshots(monkeypatch, station):
+    from netops.db import ReadSession
+    from netops.models import Snapshot, Station
+    with ReadSession() as s:
+        station_id = s.query(Station.id).filter(Station.name == station[0]).scalar()
+    q = IngestQueue()
+    monkeypatch.setattr(q, "_ensure_writer", lambda: None)
+    snap = IngestSnapshot(station=station[0], generated_at=T0)
+    assert q.submit(station_id, snap, T0) == "queued"
+    monkeypatch.undo()  # queued but no writer yet, as if shut down right after a 202
+    q.stop()
+    assert q.depth() == 0
+    with ReadSession() as s:
+        stored = s.query(Snapshot.generated_at).filter(Snapshot.station_id == station_id).all()
+    assert stored == [(T0,)]
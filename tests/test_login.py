@@ -0,0 +1,74 @@
+# tests/test_login.py
+from __future__ import annotations
+import sqlite3
+import time
+from sqlalchemy import select
+
+from netops.config import config
+from netops.db import ReadSession
+from netops.models import Station
+
+def test_login(client, station):
+    name, password = station
+    r = client.post("/api/login", json={"station": name.lower(), "password": password})
+    assert r.status_code == 200 and r.get_json()["token"]
+    with ReadSession() as s:
+        assert s.execute(select(Station.last_seen_at).where(Station.name == name)).scalar() is not None
+    assert client.post("/api/login", json={"station": name, "password": "wrong"}).status_code == 401
+    assert client.post("/api/login", json={"station": "NOPE", "password": "x"}).status_code == 401
+
+def test_failed_login_skips_write_lock(client, station):
+    # Another process holds the database write lock: a failed login is
+    # checked on the reader and answers without waiting on it
+    name, _password = station
+    other = sqlite3.connect(config.DATABASE_URL.split("///", 1)[1], isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        t0 = time.monotonic()
+        r = client.post("/api/login", json={"station": name, "password": "wrong"})
+        assert r.status_code == 401
+        assert time.monotonic() - t0 < config.SQLITE_BUSY_TIMEOUT_MS / 1000
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+def test_reset_revokes_after_ttl(client, station, monkeypatch):
+    from netops.auth import token_cache
+    from netops.cli import reset_station_password
+    name, password = station
+    token = client.post("/api/login", json={"station": name, "password": password}).get_json()["token"]
+    auth = {"Authorization": f"Bearer {token}"}
+    body = {"station": name, "generated_at": "2025-05-01T00:00:00Z"}
+    assert client.post("/api/ingest", headers=auth, json=body).status_code == 200
+    reset_station_password(name, "new-" + password)
+    # The server only sees the new salt once its cached station entry expires
+    monkeypatch.setattr(token_cache, "ttl", 0)
+    r = client.post("/api/ingest", headers=auth, json=body)
+    assert r.status_code == 401
+
+def _login(client, name, password):
+    return {"Authorization": "Bearer " + client.post("/api/login", json={"station": name, "password": password}).get_json()["token"]}
+
+def test_reset_then_new_token(client, station):
+    # Default AUTH_CACHE_TTL: the cached (old) salt must not reject the new token
+    from netops.cli import reset_station_password
+    name, password = station
+    old = _login(client, name, password)
+    body = {"station": name, "generated_at": "2025-05-01T00:00:00Z"}
+    assert client.post("/api/ingest", headers=old, json=body).status_code == 200
+    reset_station_password(name, "new-" + password)
+    new = _login(client, name, "new-" + password)
+    body["generated_at"] = "2025-05-01T00:05:00Z"
+    assert client.post("/api/ingest", headers=new, json=body).status_code == 200
+    assert client.post("/api/ingest", headers=old, json=body).status_code == 401
+
+def test_reset_revokes_cached_token_on_poll(client, station, monkeypatch):
+    # The CLI's revocation row reaches the server's cache without waiting for the TTL
+    from netops.cli import reset_station_password
+    name, password = station
+    old = _login(client, name, password)
+    body = {"station": name, "generated_at": "2025-05-01T00:00:00Z"}
+    assert client.post("/api/ingest", headers=old, json=body).status_code == 200
+    monkeypatch.setattr(config, "AUTH_REVOKE_POLL", 0)
+    reset_station_password(name, "new-" + password)
+    assert client.post("/api/ingest", headers=old, json=body).status_code == 401
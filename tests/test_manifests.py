@@ -0,0 +1,133 @@
+# tests/test_manifests.py
+from __future__ import annotations
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.orm import sessionmaker
+
+from netops.db import Base
+from netops.ingest import _now_utc, _upsert_manifests
+from netops.models import Flight, Station
+from netops.schemas import ManifestRow
+
+def _baseline_upsert(s, station_id, manifests):
+    # The per-row SELECT loop _upsert_manifests replaced (baseline api.ingest)
+    for mf in manifests:
+        aoct_id = None
+        if mf.flight_id is not None:
+            aoct_id = int(mf.flight_id)
+        rec = None
+        if mf.flight_code:
+            rec = s.execute(select(Flight).where(Flight.flight_code == mf.flight_code)).scalar_one_or_none()
+        if not rec and aoct_id is not None:
+            rec = s.execute(select(Flight).where(Flight.station_id == station_id,
+                                                 Flight.aoct_flight_id == aoct_id)).scalar_one_or_none()
+        if not rec and (mf.tail and mf.origin and mf.dest and mf.takeoff_hhmm):
+            rec = s.execute(select(Flight).where(
+                Flight.station_id == station_id,
+                Flight.tail == mf.tail.strip().upper(),
+                Flight.origin == mf.origin.strip().upper(),
+                Flight.dest == mf.dest.strip().upper(),
+                Flight.takeoff_hhmm == mf.takeoff_hhmm.zfill(4),
+                Flight.complete == 0
+            ).order_by(Flight.last_seen_at.desc())).scalar_one_or_none()
+        if not rec:
+            rec = Flight(station_id=station_id, first_seen_at=_now_utc())
+            s.add(rec)
+        rec.aoct_flight_id = aoct_id if aoct_id is not None else rec.aoct_flight_id
+        rec.flight_code = mf.flight_code or rec.flight_code
+        rec.tail = (mf.tail or rec.tail or "").upper() or None
+        rec.direction = mf.direction or rec.direction
+        rec.origin = (mf.origin or rec.origin or "").upper() or None
+        rec.dest = (mf.dest or rec.dest or "").upper() or None
+        rec.cargo_type = mf.cargo_type or rec.cargo_type
+        rec.cargo_weight_lbs = mf.cargo_weight_lbs if mf.cargo_weight_lbs is not None else rec.cargo_weight_lbs
+        rec.takeoff_hhmm = mf.takeoff_hhmm or rec.takeoff_hhmm
+        rec.eta_hhmm = mf.eta_hhmm or rec.eta_hhmm
+        rec.is_ramp_entry = int(mf.is_ramp_entry or rec.is_ramp_entry or 0)
+        rec.complete = int(mf.complete or rec.complete or 0)
+        rec.remarks = mf.remarks or rec.remarks
+        rec.last_seen_at = mf.updated_at or _now_utc()
+
+def _db():
+    e = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autoflush=False, future=True)  # as SessionLocal
+    with S() as s:
+        s.add_all([Station(id=1, name="A", password_hash="x"), Station(id=2, name="B", password_hash="x")])
+        s.commit()
+    return S
+
+def _rows(S):
+    cols = [c for c in Flight.__table__.columns if c.name != "first_seen_at"]
+    with S() as s:
+        return [tuple(r) for r in s.execute(select(*cols).order_by(Flight.id))]
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def _payload(rnd, t):
+    # Keys are distinct within one payload: repeating a new flight_code fails
+    # the unique index in both versions alike
+    rows, seen = [], set()
+    for _ in range(rnd.randint(0, 25)):
+        code = rnd.choice([None, f"FC{rnd.randint(0, 30)}"])
+        fid = rnd.choice([None, rnd.randint(0, 30)])
+        route = (rnd.choice([None, f"n{rnd.randint(0, 6)}"]), rnd.choice(["ksea", "KBFI", None]),
+                 rnd.choice(["KGEG", "kpae"]), rnd.choice([None, "930", "1015"]))
+        keys = {("c", code) if code else None, ("a", fid) if fid is not None else None,
+                ("r", route) if all(route) else None} - {None}
+        if keys & seen:
+            continue
+        seen |= keys
+        rows.append(ManifestRow(
+            flight_code=code, flight_id=fid, tail=route[0], origin=route[1], dest=route[2], takeoff_hhmm=route[3],
+            eta_hhmm=rnd.choice([None, "1200"]), cargo_type=rnd.choice([None, "Mixed"]),
+            cargo_weight_lbs=rnd.choice([None, 12.5]), complete=rnd.choice([0, 0, 0, 1]),
+            is_ramp_entry=rnd.choice([0, 1]), remarks=rnd.choice([None, "r"]),
+            updated_at=T0 + timedelta(minutes=t * 10 + rnd.randint(0, 9)),
+        ))
+    return rows
+
+@pytest.mark.parametrize("seed", range(20))
+def test_flights_match_baseline(seed):
+    rnd = random.Random(seed)
+    old, new = _db(), _db()
+    for t in range(60):
+        station, payload = rnd.choice([1, 2]), _payload(rnd, t)
+        try:
+            with old() as s:
+                _baseline_upsert(s, station, payload)
+                s.commit()
+        except MultipleResultsFound:
+            # Baseline rejected the ingest (500) on an ambiguous match; the
+            # new code picks one row instead (see test_ambiguous_matches)
+            with new() as s:
+                _upsert_manifests(s, station, payload)
+                s.commit()
+            return
+        with new() as s:
+            _upsert_manifests(s, station, payload)
+            s.commit()
+        assert _rows(new) == _rows(old), f"diverged at payload {t}"
+
+def test_ambiguous_matches():
+    S = _db()
+    with S() as s:
+        s.add_all([
+            Flight(id=1, station_id=1, aoct_flight_id=7, tail="N1", origin="KSEA", dest="KBFI", takeoff_hhmm="0930",
+                   last_seen_at=T0),
+            Flight(id=2, station_id=1, aoct_flight_id=7, tail="N1", origin="KSEA", dest="KBFI", takeoff_hhmm="0930",
+                   last_seen_at=T0 + timedelta(hours=1)),
+        ])
+        s.commit()
+    with S() as s:
+        # Same (station, aoct_flight_id) twice: the lowest id wins
+        _upsert_manifests(s, 1, [ManifestRow(flight_id=7, remarks="by-aoct", updated_at=T0)])
+        # Same open tail/route/takeoff twice: the newest last_seen_at wins
+        _upsert_manifests(s, 1, [ManifestRow(tail="n1", origin="ksea", dest="kbfi", takeoff_hhmm="930",
+                                             remarks="by-route", updated_at=T0)])
+        s.commit()
+        assert {i: r for i, r in s.execute(select(Flight.id, Flight.remarks))} == {1: "by-aoct", 2: "by-route"}
+        assert s.execute(select(Flight).where(Flight.id > 2)).first() is None
@@ -0,0 +1,32 @@
+# tests/test_metrics.py
+from __future__ import annotations
+import json
+import pytest
+
+from netops import metrics, shared
+from netops.config import config
+
+@pytest.fixture()
+def state(monkeypatch, tmp_path):
+    path = str(tmp_path / "state.db")
+    monkeypatch.setattr(config, "SHARED_STATE_PATH", path)
+    monkeypatch.setattr(config, "WORKER_INDEX", 0)
+    shared.init_store(path)
+    yield
+    c = getattr(shared._local, "conn", None)
+    if c is not None:
+        c.close()
+        del shared._local.conn
+
+def test_render_labels_and_merges_workers(state):
+    metrics.sql_statements.inc("test-engine")
+    other = {"netops_sql_statements_total": ['netops_sql_statements_total{worker="1",engine="reader"} 7']}
+    shared.put_metrics(1, json.dumps(other))
+    lines = metrics.render().splitlines()
+    family = lines[lines.index("# TYPE netops_sql_statements_total counter") + 1:]
+    family = family[:next(i for i, l in enumerate(family) if l.startswith("#"))]
+    assert any(l.startswith('netops_sql_statements_total{worker="0",engine="test-engine"} ') for l in family)
+    assert family[-1] == 'netops_sql_statements_total{worker="1",engine="reader"} 7'
+    assert lines.count("# TYPE netops_sql_statements_total counter") == 1
+    # The scraping worker published its own samples for the others to serve
+    assert {w for w, _ in shared.worker_metrics()} == {0, 1}
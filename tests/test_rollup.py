@@ -0,0 +1,38 @@
+# tests/test_rollup.py
+from __future__ import annotations
+from datetime import datetime, timezone
+
+from netops import rollup
+
+def _login(client, station) -> dict:
+    name, password = station
+    token = client.post("/api/login", json={"station": name, "password": password}).get_json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def _snapshot(name: str, generated_at: str, legs: int) -> dict:
+    return {"station": name, "generated_at": generated_at,
+            "flows": [{"origin": "KOFS", "dest": "KRLP", "direction": "outbound", "legs": legs}]}
+
+def _history(client) -> dict:
+    r = client.get("/api/flows/history?bucket=5m&origin=KOFS&dest=KRLP"
+                   "&since=2025-04-01T11:00:00Z&until=2025-04-01T12:59:00Z")
+    assert r.status_code == 200
+    return r.get_json()
+
+def test_rollup_with_offset_timestamps(client, station):
+    name, _ = station
+    auth = _login(client, station)
+    # 17:02+05:00 = 12:02 UTC; the backfill's history rows take the other path
+    r = client.post("/api/ingest/batch", headers=auth, json=[
+        _snapshot(name, "2025-04-01T16:31:00+05:00", 1),
+        _snapshot(name, "2025-04-01T16:47:00+05:00", 2),
+    ])
+    assert r.get_json()["accepted"] == 2
+    assert client.post("/api/ingest", headers=auth, json=_snapshot(name, "2025-04-01T17:02:00+05:00", 3)).status_code == 200
+
+    out = _history(client)
+    (series,) = out["series"]
+    got = {t: legs for t, legs in zip(out["t"], series["legs"]) if legs is not None}
+    ts = lambda h, m: int(datetime(2025, 4, 1, h, m, tzinfo=timezone.utc).timestamp())  # noqa: E731
+    assert got == {ts(11, 30): 1, ts(11, 45): 2, ts(12, 0): 3}
+    assert rollup.bucket_of(datetime(2025, 4, 1, 12, 2)) == ts(12, 0)